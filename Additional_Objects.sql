@@ -31,3 +31,26 @@ FROM [dbo].[Ticket] t
 LEFT JOIN [dbo].[Violation] v ON t.violation_code = v.Code
 LEFT JOIN [dbo].[TicketQueue] q ON t.ticket_queue_id = q.ID
 LEFT JOIN [dbo].[HearingDisposition] d ON t.hearing_dispo_id = d.ID;
+
+
+-- computed time columns for the heatmap, statistics and location-detail queries
+--  DATEDIFF from day 0 (1900-01-01, a Monday) gives Monday = 0 regardless of SET DATEFIRST.
+--  PERSISTED makes them indexable; the app falls back to the expressions if they are missing.
+ALTER TABLE [dbo].[Ticket]
+ADD [issue_weekday] AS (CONVERT(TINYINT, DATEDIFF(DAY, 0, [issue_date]) % 7)) PERSISTED,
+	[issue_hour] AS (CONVERT(TINYINT, DATEPART(HOUR, [issue_date]))) PERSISTED;
+GO
+
+
+-- covering index for location details: seek on one location, group by weekday/hour
+CREATE NONCLUSTERED INDEX [IX_Ticket_location_weekday_hour]
+ON [dbo].[Ticket] ([violation_location], [issue_weekday], [issue_hour])
+INCLUDE ([violation_code])
+ON [Data_FG];
+
+
+-- covering index for heatmap slices: seek on weekday/hour, group by location
+CREATE NONCLUSTERED INDEX [IX_Ticket_weekday_hour_location]
+ON [dbo].[Ticket] ([issue_weekday], [issue_hour], [violation_location])
+INCLUDE ([violation_code])
+ON [Data_FG];
@@ -1,16 +1,33 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request, stream_with_context
 from flask_cors import CORS
-import pyodbc
+try:
+    import pyodbc
+except ImportError:
+    pyodbc = None
 import pandas as pd
+import numpy as np
 import json
-from datetime import datetime
+from datetime import datetime, date, timedelta
 from pathlib import Path
 import math
+import os
 import hashlib
 import random
 import time
 import sys
-from collections import OrderedDict
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from time_partitions import TimePartitionIndex, PARTITION_QUERY, PARTITION_DAYS_QUERY, date_to_day_number, day_number_to_date
+from trends import TrendIndex, GRANULARITIES as TREND_GRANULARITIES
+from location_dictionary import LocationDictionary, normalize_location_key
+import local_db
+import queries
+from spatial_index import RiskQuadtree
+from profiler import SamplingProfiler, ProfilerBusyError, to_collapsed, to_speedscope
+import hmac
+import artifacts
+import memory
 
 app = Flask(__name__)
 CORS(app)
@@ -19,91 +36,347 @@ BASE_DIR = Path(__file__).resolve().parent
 NATIVE_DIR = BASE_DIR / 'native'
 if NATIVE_DIR.exists():
     sys.path.insert(0, str(NATIVE_DIR))
-DATA_DIR = BASE_DIR / 'data'
+DATA_DIR = Path(os.environ.get('PARKWISE_DATA_DIR', BASE_DIR / 'data'))
+
+
+def _env_limit(name, default):
+    """Positive integer from the environment; 'none' or 0 means unlimited (None)."""
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    if value.strip().lower() in ('none', 'unlimited'):
+        return None
+    limit = int(value)
+    return limit if limit > 0 else None
+
+
+# Path to a SQLite file from local_db.py; when set, it replaces SQL Server.
+LOCAL_DB_PATH = os.environ.get('PARKWISE_LOCAL_DB')
 HEATMAP_OVERALL_PATH = DATA_DIR / 'heatmap_overall.pkl'
-HEATMAP_DB_LIMIT = 1000
+# Row caps on cached frames.  Unlimited by default: nearest searches need every
+# location, and payloads are bounded by thinning (below) instead.
+HEATMAP_DB_LIMIT = _env_limit('PARKWISE_OVERALL_LIMIT', None)
 _heatmap_overall_cache = None
 HEATMAP_SUMMARY_PATH = DATA_DIR / 'heatmap_overall_summary.pkl'
 HEATMAP_OVERALL_PAYLOAD_PATH = DATA_DIR / 'heatmap_overall_payload.json'
+# Digest of the thinning configuration and source frame the cached payload was built from.
+HEATMAP_OVERALL_PAYLOAD_KEY_PATH = DATA_DIR / 'heatmap_overall_payload.key'
 HEATMAP_QUERY_CACHE_LIMIT = 32
-HEATMAP_QUERY_RESULT_LIMIT = 2000
+HEATMAP_QUERY_RESULT_LIMIT = _env_limit('PARKWISE_SLICE_LIMIT', None)
+# Heatmap payload thinning: keep the busiest locations until they cover
+# HEATMAP_COVERAGE of the slice's tickets, but never more than maxPoints.
+HEATMAP_MAX_POINTS = _env_limit('PARKWISE_HEATMAP_MAX_POINTS', 2000)
+HEATMAP_MAX_POINTS_LIMIT = _env_limit('PARKWISE_HEATMAP_MAX_POINTS_LIMIT', 20000)
+HEATMAP_COVERAGE = float(os.environ.get('PARKWISE_HEATMAP_COVERAGE', 0.99))
 _heatmap_overall_payload_cache = None
 _heatmap_query_cache = OrderedDict()
-_geocode_cache = {}
+_heatmap_cache_lock = threading.Lock()
+_heatmap_inflight = {}
+# 'lookups' counts request-path lookups, each ending as a hit, miss or
+# coalesced wait; prefetch loads are counted only in 'prefetched'.
+# 'prefetchHits' are hits served from a prefetched frame (also counted in 'hits').
+_heatmap_cache_stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'coalesced': 0, 'prefetched': 0, 'prefetchHits': 0}
+HEATMAP_PREFETCH_WORKERS = 2
+HEATMAP_PREFETCH_QUEUE_LIMIT = 4
+# Prefetched frames wait here until a request asks for them, so speculative
+# loads never push requested slices out of _heatmap_query_cache.
+HEATMAP_PREFETCH_CACHE_LIMIT = 16
+_heatmap_prefetch_cache = OrderedDict()
+_heatmap_prefetch_executor = ThreadPoolExecutor(max_workers=HEATMAP_PREFETCH_WORKERS, thread_name_prefix='heatmap-prefetch')
+_heatmap_prefetch_slots = threading.BoundedSemaphore(HEATMAP_PREFETCH_QUEUE_LIMIT)
+WEEKDAY_NAMES = queries.WEEKDAY_NAMES
+WEEKDAY_ALIASES = {
+    'weekdays': WEEKDAY_NAMES[:5],
+    'weekends': WEEKDAY_NAMES[5:],
+    'weekend': WEEKDAY_NAMES[5:]
+}
+HEATMAP_PARTITIONS_PATH = DATA_DIR / 'heatmap_time_partitions.pkl'
+# Rebuild partitions from the database after this many seconds (never by default).
+# A partitions file replaced on disk, e.g. by `python parkwise.py build`, is
+# picked up within TIME_PARTITIONS_CHECK_INTERVAL_SECONDS regardless.
+TIME_PARTITIONS_TTL_SECONDS = _env_limit('PARKWISE_PARTITIONS_TTL', None)
+TIME_PARTITIONS_CHECK_INTERVAL_SECONDS = 5.0
+_time_partition_index = None
+_time_partition_lock = threading.Lock()
+_time_partition_source = None
+_time_partition_loaded_at = 0.0
+_time_partition_checked_at = 0.0
+# (first_day, last_day, monotonic time) of the partitions, for resolving window=.
+_time_partition_days = None
+TimeFilter = namedtuple('TimeFilter', ['days', 'hours', 'start', 'end'])
+_trend_index = None
+_trend_lock = threading.Lock()
+# Every cached frame, the geocode store and the nearest columns carry IDs from
+# this dictionary; location strings are looked up only at serialization.
+_location_dictionary = LocationDictionary()
+_geocode_cache_stats = {'hits': 0, 'misses': 0}
+GEOCODE_BULK_LIMIT = 50000
+GEOCODE_BULK_BATCH_SIZE = 500
+# Addresses that are not dataset locations are cached here, not in the
+# location dictionary, which never shrinks.
+GEOCODE_ADHOC_CACHE_LIMIT = _env_limit('PARKWISE_GEOCODE_CACHE_LIMIT', 10000)
+_adhoc_geocode_cache = OrderedDict()
+_adhoc_geocode_lock = threading.Lock()
+STREAM_FORMATS = ('json', 'ndjson', 'chunked')
+STREAM_CHUNK_RECORDS = 256
+# Exact by default: clients apply each delta to state built from earlier deltas,
+# so any change left out would accumulate.  A positive tolerance (a fraction of
+# the target maxCount) is only safe when the base slice is exactly what the
+# client shows.
+HEATMAP_DELTA_TOLERANCE = 0.0
+# Admin endpoints (profiling) are disabled unless a token is configured.
+ADMIN_TOKEN = os.environ.get('PARKWISE_ADMIN_TOKEN')
+PROFILE_FORMATS = ('collapsed', 'speedscope')
+_profiler = SamplingProfiler()
 _nearest_latency_samples = []
 NEAREST_METRICS_FILE = BASE_DIR / 'nearest_metrics.txt'
 MAX_LATENCY_SAMPLES = 512
 
+# Per-request overrides use the same names as query parameters.
+RISK_WEIGHT_DEFAULTS = OrderedDict([
+    ('countWeight', 1.0),
+    ('fineWeight', 0.0),
+    ('timeWeight', 0.0),
+    ('distanceWeight', 0.0),
+    ('distanceDecay', 0.25)
+])
+_candidate_column_cache = OrderedDict()
+_candidate_column_lock = threading.Lock()
+_time_likelihood_cache = OrderedDict()
+_time_likelihood_lock = threading.Lock()
+TIME_LIKELIHOOD_CACHE_LIMIT = 32
+# mode=adaptive: best-first quadtree search for the lowest-risk spots within walking distance
+NEAREST_MODES = ('radius', 'adaptive')
+ADAPTIVE_MAX_RADIUS_MILES = 1.0
+ADAPTIVE_MAX_RISK = 0.33
+# Soft cap on the memory accounted to caches (PARKWISE_MEMORY_BUDGET_MB); unlimited by default.
+MEMORY_BUDGET_MB = _env_limit('PARKWISE_MEMORY_BUDGET_MB', None)
+MEMORY_BUDGET_BYTES = MEMORY_BUDGET_MB * 1024 * 1024 if MEMORY_BUDGET_MB is not None else None
+MEMORY_CHECK_INTERVAL_SECONDS = 5.0
+_memory_lock = threading.Lock()
+_memory_stats = {'checks': 0, 'evictions': 0, 'downcastBytes': 0, 'droppedDerived': 0, 'nativeReleasedBytes': 0,
+                 'lastCheck': None, 'lastAccountedBytes': None}
+_memory_last_check = 0.0
+# Checks walk every cache, so they run on this thread rather than the request's.
+_memory_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='memory-budget')
+_memory_check_lock = threading.Lock()
+_memory_check_pending = False
+# Artifacts from `python parkwise.py build`, keyed by manifest name; loaded at startup.
+_build_artifacts = {}
+_build_manifest_built_at = None
+_statistics_snapshot = None
+# id(frame) -> (frame, quadtree path) for frames loaded from build artifacts
+_prebuilt_quadtrees = OrderedDict()
+
 try:
-    from c_nearest import filter_rank as c_filter_rank, hot_path_stats as c_hot_path_stats
+    from c_nearest import score_rank as c_score_rank, hot_path_stats as c_hot_path_stats
     HAS_NATIVE_NEAREST = True
 except ImportError:
-    c_filter_rank = None
+    c_score_rank = None
     c_hot_path_stats = None
     HAS_NATIVE_NEAREST = False
+try:
+    from c_nearest import trim_buffers as c_trim_buffers
+except ImportError:
+    c_trim_buffers = None
+
+
+def _intern_location_column(df):
+    """Replace a frame's violation_location strings with int32 location_id codes."""
+    if df is None or 'violation_location' not in df.columns:
+        return df
+    location_ids = _location_dictionary.encode(df['violation_location'].to_numpy())
+    df = df.drop(columns=['violation_location'])
+    df.insert(0, 'location_id', location_ids)
+    if len(np.unique(location_ids)) < len(location_ids):
+        df = _merge_duplicate_locations(df)
+    return df
 
 
+def _merge_duplicate_locations(df):
+    """Collapse rows whose location strings differ only in case or padding onto one row per ID.
+
+    Counts add up and the average fine is weighted by count.  Distinct
+    violation types cannot be recovered from per-string aggregates, so the
+    larger count is kept.  Rows stay ordered by count, busiest first.
+    """
+    counts = pd.to_numeric(df['violation_count'], errors='coerce').fillna(0)
+    working = pd.DataFrame({
+        'location_id': df['location_id'],
+        'violation_count': counts,
+        'fine_total': pd.to_numeric(df['avg_fine'], errors='coerce').fillna(0.0) * counts,
+        'violation_types': pd.to_numeric(df['violation_types'], errors='coerce').fillna(0)
+    })
+    merged = working.groupby('location_id', sort=False).agg(
+        violation_count=('violation_count', 'sum'),
+        fine_total=('fine_total', 'sum'),
+        violation_types=('violation_types', 'max')
+    )
+    merged['avg_fine'] = merged['fine_total'] / merged['violation_count'].where(merged['violation_count'] > 0, 1)
+    merged = merged.sort_values('violation_count', ascending=False, kind='stable').reset_index()
+    return pd.DataFrame({
+        'location_id': merged['location_id'].to_numpy(dtype=np.int32),
+        'violation_count': merged['violation_count'].astype(df['violation_count'].dtype),
+        'avg_fine': merged['avg_fine'].astype(df['avg_fine'].dtype),
+        'violation_types': merged['violation_types'].astype(df['violation_types'].dtype)
+    })
+
+
+def _frame_location_ids(df):
+    """Location IDs for a heatmap frame, interning on the fly for frames that still hold strings."""
+    if 'location_id' in df.columns:
+        return df['location_id'].to_numpy(dtype=np.int32)
+    return _location_dictionary.encode(df['violation_location'].to_numpy())
 
 
-def build_heatmap_payload(df):
+def iter_heatmap_payload(df, max_count=None):
+    """Yield heatmap records one at a time, geocoding lazily as rows are consumed.
+
+    Intensity is relative to max_count, which defaults to the frame's busiest
+    location; pass the full slice's maximum when df is a thinned subset.
+    """
     if df is None:
-        return []
+        return
 
     if not isinstance(df, pd.DataFrame):
         df = pd.DataFrame(df)
 
     if df.empty:
-        return []
+        return
 
-    working_df = df[['violation_location', 'violation_count', 'avg_fine', 'violation_types']].copy()
-    working_df['violation_location'] = working_df['violation_location'].fillna('').astype(str)
+    working_df = df[['violation_count', 'avg_fine', 'violation_types']].copy()
+    working_df['location_id'] = _frame_location_ids(df)
 
     working_df['violation_count'] = pd.to_numeric(working_df['violation_count'], errors='coerce').fillna(0).astype(int)
     working_df['avg_fine'] = pd.to_numeric(working_df['avg_fine'], errors='coerce').fillna(0.0)
     working_df['violation_types'] = pd.to_numeric(working_df['violation_types'], errors='coerce').fillna(0).astype(int)
 
-    max_count = working_df['violation_count'].max()
+    if max_count is None:
+        max_count = working_df['violation_count'].max()
     if pd.isna(max_count) or max_count <= 0:
         max_count = 1
     else:
         max_count = float(max_count)
 
-    coords = working_df['violation_location'].map(geocode_location)
-    working_df['lat'] = [safe_float(coord[0], default=None) if coord else None for coord in coords]
-    working_df['lng'] = [safe_float(coord[1], default=None) if coord else None for coord in coords]
-
-    valid_df = working_df[working_df['lat'].notna() & working_df['lng'].notna()].copy()
-    if valid_df.empty:
-        return []
+    for row in working_df.itertuples(index=False):
+        coord = geocode_location_id(row.location_id)
+        lat = safe_float(coord[0], default=None) if coord else None
+        lng = safe_float(coord[1], default=None) if coord else None
+        if lat is None or lng is None:
+            continue
 
-    payload = []
-    for row in valid_df.itertuples(index=False):
         intensity = float(min(row.violation_count / max_count, 1.0))
-        payload.append({
-            'location': row.violation_location,
+        yield {
+            'location': _location_dictionary.label(row.location_id),
             'count': int(row.violation_count),
             'avgFine': float(row.avg_fine),
             'violationTypes': int(row.violation_types),
             'intensity': intensity,
-            'lat': float(row.lat),
-            'lng': float(row.lng)
-        })
+            'lat': float(lat),
+            'lng': float(lng)
+        }
+
+
+def build_heatmap_payload(df, max_count=None):
+    return list(iter_heatmap_payload(df, max_count))
+
+
+def thin_heatmap_frame(df, max_points=HEATMAP_MAX_POINTS, coverage=HEATMAP_COVERAGE, viewport=None):
+    """Bound a heatmap frame for display without truncating the cached frame.
+
+    Locations outside viewport (south, west, north, east) are dropped first.
+    The rest are taken busiest first until they hold `coverage` of the
+    remaining tickets, capped at max_points (None for no cap); the long tail
+    of single tickets adds little to a heatmap.  Returns a new frame.
+    """
+    if df is None or df.empty:
+        return df
+
+    if viewport is not None:
+        south, west, north, east = viewport
+        coords = geocode_location_ids(_frame_location_ids(df))
+        inside = (coords[:, 0] >= south) & (coords[:, 0] <= north) & (coords[:, 1] >= west) & (coords[:, 1] <= east)
+        df = df[inside]
+        if df.empty:
+            return df
+
+    counts = pd.to_numeric(df['violation_count'], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    order = np.argsort(-counts, kind='stable')
+    keep = len(order)
+    total = counts.sum()
+    if coverage < 1 and total > 0:
+        keep = min(keep, int(np.searchsorted(np.cumsum(counts[order]), coverage * total, side='left')) + 1)
+    if max_points is not None:
+        keep = min(keep, max_points)
+    return df.iloc[order[:keep]]
+
+
+def _parse_heatmap_thinning(args):
+    """(max_points, viewport) from the maxPoints and bbox=south,west,north,east arguments."""
+    max_points = args.get('maxPoints', default=HEATMAP_MAX_POINTS, type=int)
+    if max_points is not None:
+        if max_points < 1 or (HEATMAP_MAX_POINTS_LIMIT is not None and max_points > HEATMAP_MAX_POINTS_LIMIT):
+            raise ValueError(f"maxPoints must be between 1 and {HEATMAP_MAX_POINTS_LIMIT}")
+
+    viewport = None
+    bbox = args.get('bbox')
+    if bbox is not None and bbox.strip():
+        try:
+            viewport = tuple(float(value) for value in bbox.split(','))
+        except ValueError:
+            viewport = ()
+        if len(viewport) != 4 or any(math.isnan(value) for value in viewport):
+            raise ValueError('bbox must be south,west,north,east')
+        if viewport[0] > viewport[2] or viewport[1] > viewport[3]:
+            raise ValueError('bbox south/west must not exceed north/east')
+    return max_points, viewport
+
+
+def _heatmap_max_count(df):
+    if df is None or df.empty:
+        return None
+    return float(pd.to_numeric(df['violation_count'], errors='coerce').max())
+
+
+def _overall_frame_source():
+    """Pickle the overall frame is read from, or None if there is none."""
+    # The summary is the capped copy of the full aggregate; only prefer it when a cap is configured.
+    if HEATMAP_DB_LIMIT is not None and HEATMAP_SUMMARY_PATH.exists():
+        return HEATMAP_SUMMARY_PATH
+    if HEATMAP_OVERALL_PATH.exists():
+        return HEATMAP_OVERALL_PATH
+    if HEATMAP_SUMMARY_PATH.exists():
+        return HEATMAP_SUMMARY_PATH
+    return None
 
-    return payload
 
 def get_overall_heatmap_df():
     global _heatmap_overall_cache
     if _heatmap_overall_cache is not None:
         return _heatmap_overall_cache
 
-    source_path = None
-    if HEATMAP_SUMMARY_PATH.exists():
-        source_path = HEATMAP_SUMMARY_PATH
-    elif HEATMAP_OVERALL_PATH.exists():
-        source_path = HEATMAP_OVERALL_PATH
-
+    source_path = _overall_frame_source()
+    overall_artifact = _build_artifacts.get(artifacts.heatmap_artifact_name(None, None))
+    prebuilt_frame = overall_artifact is not None and source_path == DATA_DIR / overall_artifact['files']['frame']['path']
+    if prebuilt_frame and not _prebuilt_limit_matches(overall_artifact, overall=True):
+        print("[WARN] The prebuilt overall frame was built with a different PARKWISE_OVERALL_LIMIT; querying instead")
+        source_path = None
+        prebuilt_frame = False
     if source_path is None:
-        return None
+        # No build or earlier run left the aggregate on disk; query it once and keep it.
+        try:
+            conn = get_db_connection()
+            try:
+                query_name, query, params = queries.heatmap_query(conn, None, None, HEATMAP_DB_LIMIT)
+                overall_df = queries.read_sql(conn, query_name, query, params)
+            finally:
+                conn.close()
+            HEATMAP_OVERALL_PATH.parent.mkdir(parents=True, exist_ok=True)
+            overall_df.to_pickle(HEATMAP_OVERALL_PATH)
+        except Exception as query_err:
+            print(f"[WARN] Unable to load the overall heatmap aggregate: {query_err}")
+            return None
+        source_path = HEATMAP_OVERALL_PATH
 
     df = pd.read_pickle(source_path)
     try:
@@ -113,25 +386,59 @@ def get_overall_heatmap_df():
     except Exception:
         pass
 
-    if source_path == HEATMAP_OVERALL_PATH:
+    if HEATMAP_DB_LIMIT is not None and source_path == HEATMAP_OVERALL_PATH:
         summary_df = df.nlargest(HEATMAP_DB_LIMIT, 'violation_count').reset_index(drop=True)
         try:
             summary_df.to_pickle(HEATMAP_SUMMARY_PATH)
         except Exception:
             pass
         df = summary_df
-    elif len(df) > HEATMAP_DB_LIMIT:
+    elif HEATMAP_DB_LIMIT is not None and len(df) > HEATMAP_DB_LIMIT:
         df = df.nlargest(HEATMAP_DB_LIMIT, 'violation_count').reset_index(drop=True)
 
-    _heatmap_overall_cache = df
+    # Interned after the summary pickle is written: IDs are only stable per process.
+    _heatmap_overall_cache = _intern_location_column(df)
+    if prebuilt_frame:
+        _register_prebuilt_quadtree(_heatmap_overall_cache, overall_artifact)
     return _heatmap_overall_cache
 
+def _overall_payload_key():
+    """Digest of what the overall payload depends on: thinning, the overall cap and the source frame.
+
+    None when there is no overall frame to build it from.
+    """
+    source_path = _overall_frame_source()
+    if source_path is None:
+        return None
+    source = source_path.stat()
+    return artifacts.digest(HEATMAP_MAX_POINTS, HEATMAP_COVERAGE, HEATMAP_DB_LIMIT,
+                            source_path.name, source.st_size, source.st_mtime_ns)
+
+
 def get_overall_heatmap_payload():
     global _heatmap_overall_payload_cache
     if _heatmap_overall_payload_cache is not None:
         return _heatmap_overall_payload_cache
 
-    if HEATMAP_OVERALL_PAYLOAD_PATH.exists():
+    overall_artifact = _build_artifacts.get(artifacts.heatmap_artifact_name(None, None))
+    prebuilt = (
+        overall_artifact is not None
+        and _prebuilt_thinning_matches(overall_artifact)
+        and _prebuilt_limit_matches(overall_artifact, overall=True)
+    )
+    payload_key = _overall_payload_key()
+    if payload_key is None and not prebuilt:
+        if get_overall_heatmap_df() is None:
+            _heatmap_overall_payload_cache = []
+            return []
+        payload_key = _overall_payload_key()
+
+    # A payload from `parkwise.py build` or an earlier run is reused only if it
+    # was thinned the same way from the same frame.
+    cached_key = None
+    if HEATMAP_OVERALL_PAYLOAD_KEY_PATH.exists():
+        cached_key = HEATMAP_OVERALL_PAYLOAD_KEY_PATH.read_text(encoding='utf-8').strip()
+    if HEATMAP_OVERALL_PAYLOAD_PATH.exists() and (prebuilt or cached_key == payload_key):
         try:
             with HEATMAP_OVERALL_PAYLOAD_PATH.open('r', encoding='utf-8') as fp:
                 cached_payload = json.load(fp)
@@ -145,15 +452,13 @@ def get_overall_heatmap_payload():
         _heatmap_overall_payload_cache = []
         return []
 
-    if len(df) > HEATMAP_DB_LIMIT:
-        df = df.nlargest(HEATMAP_DB_LIMIT, 'violation_count').reset_index(drop=True)
-
-    payload = build_heatmap_payload(df)
+    payload = build_heatmap_payload(thin_heatmap_frame(df), _heatmap_max_count(df))
 
     try:
         HEATMAP_OVERALL_PAYLOAD_PATH.parent.mkdir(parents=True, exist_ok=True)
         with HEATMAP_OVERALL_PAYLOAD_PATH.open('w', encoding='utf-8') as fp:
             json.dump(payload, fp)
+        HEATMAP_OVERALL_PAYLOAD_KEY_PATH.write_text(payload_key, encoding='utf-8')
     except Exception:
         pass
 
@@ -211,30 +516,15 @@ def safe_int(value, default=0):
 # Database connection string
 DB_CONNECTION = 'DRIVER={SQL Server};SERVER=.\SQLEXPRESS;DATABASE=ParkingTickets;Trusted_Connection=yes;'
 
-def _fetch_heatmap_dataframe(day_filter, hour_filter):
-    cache_key = (day_filter or 'ALL', hour_filter if hour_filter is not None else 'ALL')
-    if cache_key in _heatmap_query_cache:
-        _heatmap_query_cache.move_to_end(cache_key)
-        return _heatmap_query_cache[cache_key]
+def _heatmap_cache_key(day_filter, hour_filter):
+    return (day_filter or 'ALL', hour_filter if hour_filter is not None else 'ALL')
+
 
+def _query_heatmap_dataframe(day_filter, hour_filter):
     conn = get_db_connection()
     try:
-        query = f"""
-        SELECT TOP {HEATMAP_QUERY_RESULT_LIMIT}
-            t.violation_location,
-            COUNT(*) as violation_count,
-            AVG(CAST(v.Cost as FLOAT)) as avg_fine,
-            COUNT(DISTINCT t.violation_code) as violation_types
-        FROM Ticket t
-        JOIN Violation v ON t.violation_code = v.Code
-        WHERE t.violation_location IS NOT NULL
-            AND (? IS NULL OR DATENAME(WEEKDAY, t.issue_date) = ?)
-            AND (? IS NULL OR DATEPART(HOUR, t.issue_date) = ?)
-        GROUP BY t.violation_location
-        ORDER BY COUNT(*) DESC
-        """
-        params = [day_filter, day_filter, hour_filter, hour_filter]
-        df = pd.read_sql(query, conn, params=params)
+        query_name, query, params = queries.heatmap_query(conn, day_filter, hour_filter, HEATMAP_QUERY_RESULT_LIMIT)
+        df = _intern_location_column(queries.read_sql(conn, query_name, query, params))
     finally:
         conn.close()
 
@@ -245,17 +535,478 @@ def _fetch_heatmap_dataframe(day_filter, hour_filter):
     except Exception:
         pass
 
+    return df
+
+
+def _store_heatmap_frame(cache_key, df):
+    """Insert a requested frame as most recently used.  Caller holds _heatmap_cache_lock."""
     _heatmap_query_cache[cache_key] = df
     _heatmap_query_cache.move_to_end(cache_key)
     if len(_heatmap_query_cache) > HEATMAP_QUERY_CACHE_LIMIT:
         _heatmap_query_cache.popitem(last=False)
+
+
+def _load_cached_heatmap_frame(cache_key, loader, prefetch=False):
+    """Return the cached frame for cache_key, coalescing concurrent misses.
+
+    The first caller for an uncached key runs loader(); callers arriving while
+    it is in flight wait on the same future instead of issuing their own.
+    Prefetch loads go into the separate prefetch cache and are not counted as
+    request lookups; a request that finds its slice there promotes it.
+    """
+    with _heatmap_cache_lock:
+        if not prefetch:
+            _heatmap_cache_stats['lookups'] += 1
+        cached = _heatmap_query_cache.get(cache_key)
+        if cached is not None:
+            _heatmap_query_cache.move_to_end(cache_key)
+            if not prefetch:
+                _heatmap_cache_stats['hits'] += 1
+            return cached
+
+        cached = _heatmap_prefetch_cache.get(cache_key)
+        if cached is not None:
+            if prefetch:
+                return cached
+            del _heatmap_prefetch_cache[cache_key]
+            _store_heatmap_frame(cache_key, cached)
+            _heatmap_cache_stats['hits'] += 1
+            _heatmap_cache_stats['prefetchHits'] += 1
+            return cached
+
+        pending = _heatmap_inflight.get(cache_key)
+        is_leader = pending is None
+        if is_leader:
+            pending = Future()
+            _heatmap_inflight[cache_key] = pending
+            if not prefetch:
+                _heatmap_cache_stats['misses'] += 1
+        elif not prefetch:
+            _heatmap_cache_stats['coalesced'] += 1
+
+    if not is_leader:
+        return pending.result()
+
+    try:
+        df = loader()
+    except BaseException as exc:
+        with _heatmap_cache_lock:
+            _heatmap_inflight.pop(cache_key, None)
+        pending.set_exception(exc)
+        raise
+
+    with _heatmap_cache_lock:
+        if prefetch:
+            _heatmap_prefetch_cache[cache_key] = df
+            if len(_heatmap_prefetch_cache) > HEATMAP_PREFETCH_CACHE_LIMIT:
+                _heatmap_prefetch_cache.popitem(last=False)
+        else:
+            _store_heatmap_frame(cache_key, df)
+        _heatmap_inflight.pop(cache_key, None)
+    pending.set_result(df)
+    maybe_enforce_memory_budget()
     return df
 
 
+def _register_prebuilt_quadtree(df, artifact):
+    quadtree_file = artifact['files'].get('quadtree')
+    if quadtree_file is None:
+        return
+    with _candidate_column_lock:
+        _prebuilt_quadtrees[id(df)] = (df, DATA_DIR / quadtree_file['path'])
+        if len(_prebuilt_quadtrees) > HEATMAP_QUERY_CACHE_LIMIT + 1:
+            _prebuilt_quadtrees.popitem(last=False)
+
+
+def _load_heatmap_artifact(artifact):
+    """Frame for a slice precomputed by `parkwise.py build`, read instead of querying the database."""
+    df = _intern_location_column(pd.read_pickle(DATA_DIR / artifact['files']['frame']['path']))
+    _register_prebuilt_quadtree(df, artifact)
+    return df
+
+
+def _fetch_heatmap_dataframe(day_filter, hour_filter, prefetch=False):
+    artifact = _build_artifacts.get(artifacts.heatmap_artifact_name(day_filter, hour_filter))
+    if artifact is not None and _prebuilt_limit_matches(artifact):
+        loader = lambda: _load_heatmap_artifact(artifact)
+    else:
+        loader = lambda: _query_heatmap_dataframe(day_filter, hour_filter)
+    return _load_cached_heatmap_frame(_heatmap_cache_key(day_filter, hour_filter), loader, prefetch)
+
+
+def _partition_file_signature():
+    try:
+        stat = HEATMAP_PARTITIONS_PATH.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _time_partitions_expired():
+    """Whether the TTL has run out (the index is then rebuilt from the database)."""
+    return (
+        TIME_PARTITIONS_TTL_SECONDS is not None
+        and 'partitions' not in _build_artifacts
+        and time.monotonic() - _time_partition_loaded_at >= TIME_PARTITIONS_TTL_SECONDS
+    )
+
+
+def _time_partitions_stale():
+    """Whether the loaded index should be replaced: TTL expired or partitions file changed on disk."""
+    global _time_partition_checked_at
+    if _time_partitions_expired():
+        return True
+    now = time.monotonic()
+    if now - _time_partition_checked_at < TIME_PARTITIONS_CHECK_INTERVAL_SECONDS:
+        return False
+    _time_partition_checked_at = now
+    return _partition_file_signature() != _time_partition_source
+
+
+def _invalidate_time_partition_derived():
+    """Drop everything computed from the previous partition index."""
+    global _trend_index
+    with _time_likelihood_lock:
+        _time_likelihood_cache.clear()
+    with _heatmap_cache_lock:
+        for cache_key in [key for key in _heatmap_query_cache if key[0] == 'RANGE']:
+            del _heatmap_query_cache[cache_key]
+    # Not under _trend_lock: get_trend_index holds it while loading the partitions.
+    _trend_index = None
+
+
+def get_time_partition_index():
+    """Load the day-partitioned aggregate index, building it from the database on first use.
+
+    The index is reloaded when the partitions file changes on disk and rebuilt
+    from the database once PARKWISE_PARTITIONS_TTL seconds have passed.
+    """
+    global _time_partition_index, _time_partition_source, _time_partition_loaded_at, _time_partition_days
+    index = _time_partition_index
+    if index is not None and not _time_partitions_stale():
+        return index
+
+    with _time_partition_lock:
+        if _time_partition_index is not None and _time_partition_index is not index:
+            return _time_partition_index
+
+        partitions_df = None
+        if HEATMAP_PARTITIONS_PATH.exists() and not (index is not None and _time_partitions_expired()):
+            try:
+                source = _partition_file_signature()
+                partitions_df = pd.read_pickle(HEATMAP_PARTITIONS_PATH)
+            except Exception as load_err:
+                print(f"[WARN] Unable to load time partitions, rebuilding: {load_err}")
+
+        if partitions_df is None:
+            conn = get_db_connection()
+            try:
+                partitions_df = queries.read_sql(conn, 'time_partitions', PARTITION_QUERY)
+            finally:
+                conn.close()
+            try:
+                HEATMAP_PARTITIONS_PATH.parent.mkdir(parents=True, exist_ok=True)
+                partitions_df.to_pickle(HEATMAP_PARTITIONS_PATH)
+            except Exception:
+                pass
+            source = _partition_file_signature()
+
+        refreshed = TimePartitionIndex(partitions_df, _location_dictionary)
+        _time_partition_source = source
+        _time_partition_loaded_at = _time_partition_checked_at = time.monotonic()
+        _time_partition_days = (refreshed.first_day, refreshed.last_day, _time_partition_loaded_at) if len(refreshed) else None
+        _time_partition_index = refreshed
+        if index is not None:
+            _invalidate_time_partition_derived()
+            print(f"[DEBUG] Reloaded time partitions: {len(refreshed)} rows")
+        return refreshed
+
+
+def _partition_day_bounds():
+    """(first_day, last_day) of the ticket history without building the partition index.
+
+    Uses the loaded index or the build manifest when available, otherwise a
+    MIN/MAX query whose result is kept until the partitions TTL runs out.
+    """
+    global _time_partition_days
+    if _time_partition_index is not None and len(_time_partition_index):
+        return _time_partition_index.first_day, _time_partition_index.last_day
+
+    days = _build_artifacts.get('partitions', {}).get('days')
+    if days is not None:
+        return int(days[0]), int(days[1])
+
+    cached = _time_partition_days
+    if cached is not None and (
+        TIME_PARTITIONS_TTL_SECONDS is None or time.monotonic() - cached[2] < TIME_PARTITIONS_TTL_SECONDS
+    ):
+        return cached[0], cached[1]
+
+    conn = get_db_connection()
+    try:
+        bounds = queries.read_sql(conn, 'time_partition_days', PARTITION_DAYS_QUERY)
+    finally:
+        conn.close()
+    first_day, last_day = bounds['first_day'].iloc[0], bounds['last_day'].iloc[0]
+    if pd.isna(first_day) or pd.isna(last_day):
+        return None
+    _time_partition_days = (int(first_day), int(last_day), time.monotonic())
+    return _time_partition_days[0], _time_partition_days[1]
+
+
+def get_trend_index():
+    """Load the trend series from the build artifact, or condense them from the time partitions on first use."""
+    global _trend_index
+    if _trend_index is not None:
+        return _trend_index
+
+    with _trend_lock:
+        if _trend_index is not None:
+            return _trend_index
+
+        artifact = _build_artifacts.get('trends')
+        if artifact is not None:
+            try:
+                _trend_index = TrendIndex.load(DATA_DIR / artifact['files']['series']['path'], _location_dictionary)
+                return _trend_index
+            except Exception as load_err:
+                print(f"[WARN] Unable to load prebuilt trends, rebuilding: {load_err}")
+
+        start = time.perf_counter()
+        _trend_index = TrendIndex.from_partitions(get_time_partition_index())
+        print(f"[DEBUG] Built trend series for {len(_trend_index)} locations in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return _trend_index
+
+
+def _is_range_filter(time_filter):
+    return (
+        time_filter.start is not None
+        or time_filter.end is not None
+        or (time_filter.days is not None and len(time_filter.days) > 1)
+        or (time_filter.hours is not None and len(time_filter.hours) > 1)
+    )
+
+
+def _fetch_range_heatmap_dataframe(time_filter):
+    """Aggregate a date/hour/weekday range by summing day partitions."""
+    cache_key = ('RANGE', time_filter.days, time_filter.hours, time_filter.start, time_filter.end)
+
+    def load():
+        index = get_time_partition_index()
+        weekdays = None
+        if time_filter.days is not None:
+            weekdays = [WEEKDAY_NAMES.index(name) for name in time_filter.days]
+        return index.aggregate(
+            start_day=date_to_day_number(time_filter.start) if time_filter.start else None,
+            end_day=date_to_day_number(time_filter.end) if time_filter.end else None,
+            weekdays=weekdays,
+            hours=time_filter.hours,
+            limit=HEATMAP_QUERY_RESULT_LIMIT
+        )
+
+    return _load_cached_heatmap_frame(cache_key, load)
+
+
+def _fetch_filtered_heatmap_dataframe(time_filter):
+    """Frame for any non-empty time filter; None when nothing constrains the data."""
+    if _is_range_filter(time_filter):
+        return _fetch_range_heatmap_dataframe(time_filter)
+
+    day_filter = time_filter.days[0] if time_filter.days else None
+    hour_filter = time_filter.hours[0] if time_filter.hours else None
+    if day_filter is None and hour_filter is None:
+        return None
+    return _fetch_heatmap_dataframe(day_filter, hour_filter)
+
+
+def _parse_day_values(value):
+    """Parse the day parameter: 'all', one weekday, a comma list, or weekdays/weekends."""
+    text = str(value).strip() if value is not None else ''
+    if not text or text.lower() == 'all':
+        return None
+
+    lookup = {name.lower(): name for name in WEEKDAY_NAMES}
+    tokens = [token.strip() for token in text.split(',') if token.strip()]
+    if len(tokens) == 1 and tokens[0].lower() not in WEEKDAY_ALIASES:
+        # Single values keep their historical pass-through behaviour.
+        return (lookup.get(tokens[0].lower(), tokens[0]),)
+
+    days = []
+    for token in tokens:
+        key = token.lower()
+        if key in WEEKDAY_ALIASES:
+            days.extend(WEEKDAY_ALIASES[key])
+        elif key in lookup:
+            days.append(lookup[key])
+        else:
+            raise ValueError(f"Unknown day '{token}'")
+    return tuple(name for name in WEEKDAY_NAMES if name in days)
+
+
+def _parse_hour_values(value):
+    """Parse the hour parameter: 'all', one hour, a comma list, or inclusive ranges like 7-10 or 22-2."""
+    text = str(value).strip() if value is not None else ''
+    if not text or text.lower() == 'all':
+        return None
+
+    if ',' not in text and '-' not in text:
+        hour_value = safe_int(text, default=None)
+        return None if hour_value is None else (hour_value,)
+
+    hours = set()
+    for token in text.split(','):
+        token = token.strip()
+        if not token:
+            continue
+        if '-' in token:
+            start_text, end_text = token.split('-', 1)
+            start_hour = safe_int(start_text, default=None)
+            end_hour = safe_int(end_text, default=None)
+            if start_hour is None or end_hour is None:
+                raise ValueError(f"Invalid hour range '{token}'")
+            span = (end_hour - start_hour) % 24
+            hours.update((start_hour + offset) % 24 for offset in range(span + 1))
+        else:
+            hour_value = safe_int(token, default=None)
+            if hour_value is None:
+                raise ValueError(f"Invalid hour '{token}'")
+            hours.add(hour_value)
+
+    if any(hour_value < 0 or hour_value > 23 for hour_value in hours):
+        raise ValueError('Hours must be between 0 and 23')
+    return tuple(sorted(hours))
+
+
+def _parse_date_value(value, name):
+    if value is None or not str(value).strip():
+        return None
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ValueError(f"{name} must be a date in YYYY-MM-DD format")
+
+
+def _window_end_date():
+    """Last day of ticket history, so window=N means the N most recent days with data."""
+    try:
+        bounds = _partition_day_bounds()
+    except Exception as bounds_err:
+        print(f"[WARN] Unable to resolve the last ticket day, anchoring window on today: {bounds_err}")
+        bounds = None
+    return day_number_to_date(bounds[1]) if bounds is not None else date.today()
+
+
+def _parse_time_filters(day, hour, args):
+    """Build a TimeFilter from day/hour values plus the start, end and window (days) arguments."""
+    start = _parse_date_value(args.get('start'), 'start')
+    end = _parse_date_value(args.get('end'), 'end')
+
+    window = args.get('window')
+    if window is not None and str(window).strip():
+        window_days = safe_int(window, default=None)
+        if window_days is None or window_days < 1:
+            raise ValueError('window must be a positive number of days')
+        if end is None:
+            end = _window_end_date()
+        start = end - timedelta(days=window_days - 1)
+
+    if start is not None and end is not None and start > end:
+        raise ValueError('start must not be after end')
+
+    days = _parse_day_values(day)
+    hours = _parse_hour_values(hour)
+    time_filter = TimeFilter(days, hours, start, end)
+    if _is_range_filter(time_filter) and days is not None and any(name not in WEEKDAY_NAMES for name in days):
+        raise ValueError(f"Unknown day '{days[0]}'")
+    return time_filter
+
+
+def _time_filter_metadata(time_filter):
+    metadata = {}
+    if time_filter.start is not None:
+        metadata['start'] = time_filter.start.isoformat()
+    if time_filter.end is not None:
+        metadata['end'] = time_filter.end.isoformat()
+    return metadata
+
+
+def _adjacent_heatmap_slices(day_filter, hour_filter, include_days=True):
+    """Neighbouring (day, hour) slices, nearest first: next/previous hour, then next/previous day."""
+    neighbours = []
+    if hour_filter is not None and 0 <= hour_filter <= 23:
+        neighbours.append((day_filter, (hour_filter + 1) % 24))
+        neighbours.append((day_filter, (hour_filter - 1) % 24))
+
+    if include_days and day_filter is not None:
+        lowered = [name.lower() for name in WEEKDAY_NAMES]
+        day_key = str(day_filter).strip().lower()
+        if day_key in lowered:
+            day_index = lowered.index(day_key)
+            neighbours.append((WEEKDAY_NAMES[(day_index + 1) % 7], hour_filter))
+            neighbours.append((WEEKDAY_NAMES[(day_index - 1) % 7], hour_filter))
+
+    return neighbours
+
+
+def _prefetch_heatmap_slice(day_filter, hour_filter):
+    try:
+        _fetch_heatmap_dataframe(day_filter, hour_filter, prefetch=True)
+        with _heatmap_cache_lock:
+            _heatmap_cache_stats['prefetched'] += 1
+    except Exception as prefetch_err:
+        print(f"[WARN] Heatmap prefetch failed for day={day_filter}, hour={hour_filter}: {prefetch_err}")
+    finally:
+        _heatmap_prefetch_slots.release()
+
+
+def _schedule_heatmap_prefetch(day_filter, hour_filter, include_days=True):
+    """Warm neighbouring slices in the background without competing with live requests.
+
+    At most HEATMAP_PREFETCH_QUEUE_LIMIT prefetches are queued or running at once;
+    once that budget is used, further neighbours are simply skipped.  Only
+    canonical weekday names and hours 0-23 are prefetched.  Slider steps
+    usually move the hour, so delta requests pass include_days=False unless
+    the step changed the day.
+    """
+    if day_filter is not None and day_filter not in WEEKDAY_NAMES:
+        return
+    if hour_filter is not None and not 0 <= hour_filter <= 23:
+        return
+
+    for neighbour_day, neighbour_hour in _adjacent_heatmap_slices(day_filter, hour_filter, include_days):
+        cache_key = _heatmap_cache_key(neighbour_day, neighbour_hour)
+        with _heatmap_cache_lock:
+            if cache_key in _heatmap_query_cache or cache_key in _heatmap_prefetch_cache or cache_key in _heatmap_inflight:
+                continue
+
+        if not _heatmap_prefetch_slots.acquire(blocking=False):
+            return
+
+        try:
+            _heatmap_prefetch_executor.submit(_prefetch_heatmap_slice, neighbour_day, neighbour_hour)
+        except RuntimeError:
+            _heatmap_prefetch_slots.release()
+            return
+
+
 def get_db_connection():
     """Create and return a database connection"""
+    if LOCAL_DB_PATH:
+        return local_db.connect(LOCAL_DB_PATH)
+    if pyodbc is None:
+        raise RuntimeError('pyodbc is not installed; set PARKWISE_LOCAL_DB to use the local database stand-in')
     return pyodbc.connect(DB_CONNECTION)
 
+@app.before_request
+def _profile_request_start():
+    _profiler.request_started(request.method, request.path)
+
+
+@app.teardown_request
+def _profile_request_end(exc):
+    _profiler.request_finished()
+
+
 @app.route('/')
 def index():
     """Render the main page"""
@@ -269,18 +1020,38 @@ def get_heatmap_data():
     day_of_week = request.args.get('day', datetime.now().strftime('%A'))
     hour = request.args.get('hour', datetime.now().hour)
 
-    day_filter = None if str(day_of_week).lower() == 'all' else day_of_week
-    hour_filter = None
-    if str(hour).lower() != 'all':
-        try:
-            hour_filter = safe_int(hour, default=None)
-        except Exception:
-            hour_filter = None
+    try:
+        time_filter = _parse_time_filters(day_of_week, hour, request.args)
+        stream_format = _parse_stream_format(request.args)
+        max_points, viewport = _parse_heatmap_thinning(request.args)
+    except ValueError as parse_err:
+        return jsonify({
+            'status': 'error',
+            'message': str(parse_err)
+        }), 400
 
+    # Precomputed payloads were thinned with the deployment defaults.
+    default_thinning = viewport is None and max_points == HEATMAP_MAX_POINTS
     try:
+        payload_artifact = _prebuilt_payload_artifact(time_filter) if default_thinning and not stream_format else None
+        if payload_artifact is not None:
+            print(f"[DEBUG] /api/heatmap-data => day={day_of_week}, hour={hour}, records={payload_artifact['records']} (prebuilt)")
+            return _prebuilt_payload_response(payload_artifact, {
+                'day': day_of_week,
+                'hour': hour,
+                'availableLocations': payload_artifact['rows'],
+                'totalLocations': payload_artifact['records']
+            })
+
+        df = _fetch_filtered_heatmap_dataframe(time_filter)
+
         # Reuse precomputed payload when no filters constrain the dataset
-        if day_filter is None and hour_filter is None:
+        if df is None and default_thinning:
             heatmap_data = get_overall_heatmap_payload()
+            if stream_format:
+                return _streamed_payload_response(
+                    heatmap_data, {'day': day_of_week, 'hour': hour}, 'totalLocations', stream_format
+                )
             return jsonify({
                 'status': 'success',
                 'data': heatmap_data,
@@ -291,21 +1062,45 @@ def get_heatmap_data():
                 }
             })
 
-        df = _fetch_heatmap_dataframe(day_filter, hour_filter)
-        print(f"[DEBUG] /api/heatmap-data => day={day_of_week}, hour={hour}, records={len(df)}")
-
-        if df.empty:
+        if df is None:
+            df = get_overall_heatmap_df()
+            if df is None:
+                df = pd.DataFrame(columns=['violation_location', 'violation_count', 'avg_fine', 'violation_types'])
+        elif not _is_range_filter(time_filter):
+            _schedule_heatmap_prefetch(
+                time_filter.days[0] if time_filter.days else None,
+                time_filter.hours[0] if time_filter.hours else None
+            )
+
+        shown = thin_heatmap_frame(df, max_points, HEATMAP_COVERAGE, viewport)
+        max_count = _heatmap_max_count(df)
+        thinning_metadata = {'availableLocations': len(df), 'maxPoints': max_points}
+        if viewport is not None:
+            thinning_metadata['bbox'] = list(viewport)
+        print(f"[DEBUG] /api/heatmap-data => day={day_of_week}, hour={hour}, records={len(df)}, shown={len(shown)}")
+
+        if stream_format:
+            return _streamed_payload_response(
+                iter_heatmap_payload(shown, max_count),
+                {'day': day_of_week, 'hour': hour, **_time_filter_metadata(time_filter), **thinning_metadata},
+                'totalLocations',
+                stream_format
+            )
+
+        if shown.empty:
             return jsonify({
                 'status': 'success',
                 'data': [],
                 'metadata': {
                     'day': day_of_week,
                     'hour': hour,
+                    **_time_filter_metadata(time_filter),
+                    **thinning_metadata,
                     'totalLocations': 0
                 }
             })
 
-        heatmap_data = build_heatmap_payload(df)
+        heatmap_data = build_heatmap_payload(shown, max_count)
 
         return jsonify({
             'status': 'success',
@@ -313,6 +1108,8 @@ def get_heatmap_data():
             'metadata': {
                 'day': day_of_week,
                 'hour': hour,
+                **_time_filter_metadata(time_filter),
+                **thinning_metadata,
                 'totalLocations': len(heatmap_data)
             }
         })
@@ -322,77 +1119,257 @@ def get_heatmap_data():
             'status': 'error',
             'message': str(e)
         }), 500
-@app.route('/api/statistics')
-def get_statistics():
-    """Get overall parking violation statistics"""
+
+def _prebuilt_thinning_matches(artifact):
+    """Whether a prebuilt payload was thinned with this deployment's maxPoints and coverage."""
+    return artifact.get('thinning') == [HEATMAP_MAX_POINTS, HEATMAP_COVERAGE]
+
+
+def _prebuilt_limit_matches(artifact, overall=False):
+    """Whether a prebuilt frame was capped at this deployment's PARKWISE_OVERALL_LIMIT or PARKWISE_SLICE_LIMIT."""
+    return 'limit' in artifact and artifact['limit'] == (HEATMAP_DB_LIMIT if overall else HEATMAP_QUERY_RESULT_LIMIT)
+
+
+def _prebuilt_payload_artifact(time_filter):
+    """Build artifact holding the serialized payload of a single day/hour slice, if there is one."""
+    if _is_range_filter(time_filter) or (time_filter.days is None and time_filter.hours is None):
+        return None
+    artifact = _build_artifacts.get(artifacts.heatmap_artifact_name(
+        time_filter.days[0] if time_filter.days else None,
+        time_filter.hours[0] if time_filter.hours else None
+    ))
+    if artifact is None or not _prebuilt_thinning_matches(artifact) or not _prebuilt_limit_matches(artifact):
+        return None
+    return artifact
+
+
+def _prebuilt_payload_response(artifact, metadata):
+    """Splice a pre-serialized data array into the usual response envelope without re-encoding it."""
+    with open(DATA_DIR / artifact['files']['payload']['path'], 'rb') as fp:
+        payload = fp.read()
+    body = b''.join([
+        b'{"data":', payload,
+        b',"metadata":', json.dumps(metadata, sort_keys=True).encode('utf-8'),
+        b',"status":"success"}'
+    ])
+    return Response(body, mimetype='application/json')
+
+
+def _delta_frame(df):
+    """Index a heatmap frame by location for diffing."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=['count', 'avg_fine', 'types'], index=pd.Index([], dtype=np.int32))
+
+    frame = pd.DataFrame({
+        'count': pd.to_numeric(df['violation_count'], errors='coerce').fillna(0).astype(int).to_numpy(),
+        'avg_fine': pd.to_numeric(df['avg_fine'], errors='coerce').fillna(0.0).astype(float).to_numpy(),
+        'types': pd.to_numeric(df['violation_types'], errors='coerce').fillna(0).astype(int).to_numpy()
+    }, index=_frame_location_ids(df))
+    return frame[~frame.index.duplicated(keep='first')]
+
+
+def _delta_record(location_id, row, coords=None):
+    record = {
+        'location': _location_dictionary.label(location_id),
+        'count': int(row['count']),
+        'avgFine': float(row['avg_fine']),
+        'violationTypes': int(row['types'])
+    }
+    if coords is not None:
+        record['lat'] = float(coords[0])
+        record['lng'] = float(coords[1])
+    return record
+
+
+def _changed_delta_record(location_id, row, base_row):
+    """Delta entry for a location in both slices: its label plus only the fields that differ."""
+    record = {'location': _location_dictionary.label(location_id)}
+    if row['count'] != base_row['count']:
+        record['count'] = int(row['count'])
+    if row['avg_fine'] != base_row['avg_fine']:
+        record['avgFine'] = float(row['avg_fine'])
+    if row['types'] != base_row['types']:
+        record['violationTypes'] = int(row['types'])
+    return record
+
+
+def compute_heatmap_delta(base_df, target_df, tolerance=0.0, target_max_count=None):
+    """Diff two heatmap slices into added, removed and changed locations.
+
+    Only count, average fine and violation types are compared.  Intensity is
+    not sent per point: it is count / maxCount, and maxCount is returned once
+    so the client rescales every point itself.  With a positive tolerance, a
+    location counts as changed only when its count moved by more than
+    tolerance * maxCount.  Changed entries carry only the fields that differ
+    and omit coordinates because the client already has them.
+    """
+    base = _delta_frame(base_df)
+    target = _delta_frame(target_df)
+    if target_max_count is None:
+        target_max_count = int(target['count'].max()) if len(target) else 0
+
+    removed = base.index.difference(target.index, sort=False)
+    added = target.index.difference(base.index, sort=False)
+    common = target.index.intersection(base.index, sort=False)
+
+    target_common = target.loc[common]
+    base_common = base.loc[common]
+    if tolerance > 0:
+        changed_mask = (target_common['count'] - base_common['count']).abs() > tolerance * max(target_max_count, 1)
+    else:
+        changed_mask = (
+            (target_common['count'] != base_common['count'])
+            | (target_common['avg_fine'] != base_common['avg_fine'])
+            | (target_common['types'] != base_common['types'])
+        )
+    changed = common[changed_mask.to_numpy()]
+
+    added_coords = geocode_location_ids(added.to_numpy())
+    added_records = [
+        _delta_record(location_id, target.loc[location_id], coords)
+        for location_id, coords in zip(added, added_coords)
+        if not np.isnan(coords).any()
+    ]
+
+    return {
+        'added': added_records,
+        'removed': _location_dictionary.labels(removed),
+        'changed': [
+            _changed_delta_record(location_id, target.loc[location_id], base.loc[location_id])
+            for location_id in changed
+        ],
+        'unchanged': int(len(common) - len(changed)),
+        'maxCount': int(target_max_count) if len(target) else 0,
+        'totalLocations': int(len(target))
+    }
+
+
+def _slice_heatmap_dataframe(time_filter):
+    df = _fetch_filtered_heatmap_dataframe(time_filter)
+    if df is None:
+        df = get_overall_heatmap_df()
+    return df
+
+
+@app.route('/api/heatmap-delta')
+def get_heatmap_delta():
+    """Return only the points that differ between a base slice and a target slice."""
+    base_day = request.args.get('baseDay', 'all')
+    base_hour = request.args.get('baseHour', 'all')
+    day_of_week = request.args.get('day', 'all')
+    hour = request.args.get('hour', 'all')
+    tolerance = request.args.get('tolerance', default=HEATMAP_DELTA_TOLERANCE, type=float)
+
     try:
-        conn = get_db_connection()
+        base_filter = _parse_time_filters(base_day, base_hour, request.args)
+        target_filter = _parse_time_filters(day_of_week, hour, request.args)
+        max_points, viewport = _parse_heatmap_thinning(request.args)
+        if tolerance is None or math.isnan(tolerance) or tolerance < 0:
+            raise ValueError('tolerance must be a non-negative number')
+    except ValueError as parse_err:
+        return jsonify({
+            'status': 'error',
+            'message': str(parse_err)
+        }), 400
 
-        # Get various statistics
-        stats = {}
+    try:
+        base_df = _slice_heatmap_dataframe(base_filter)
+        target_df = _slice_heatmap_dataframe(target_filter)
+        if not _is_range_filter(target_filter):
+            _schedule_heatmap_prefetch(
+                target_filter.days[0] if target_filter.days else None,
+                target_filter.hours[0] if target_filter.hours else None,
+                include_days=target_filter.days != base_filter.days
+            )
+
+        # Diff what /api/heatmap-data would have shown for each slice.
+        delta = compute_heatmap_delta(
+            thin_heatmap_frame(base_df, max_points, HEATMAP_COVERAGE, viewport),
+            thin_heatmap_frame(target_df, max_points, HEATMAP_COVERAGE, viewport),
+            tolerance,
+            _heatmap_max_count(target_df)
+        )
+        print(f"[DEBUG] /api/heatmap-delta => {base_day}/{base_hour} -> {day_of_week}/{hour}, "
+              f"added={len(delta['added'])}, removed={len(delta['removed'])}, changed={len(delta['changed'])}")
 
-        # Total violations
-        total_query = "SELECT COUNT(*) as total FROM Ticket"
-        total_df = pd.read_sql(total_query, conn)
-        stats['totalViolations'] = safe_int(total_df.iloc[0]['total'])
-        print(f"[DEBUG] /api/statistics => totalViolations={stats['totalViolations']}")
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'added': delta['added'],
+                'removed': delta['removed'],
+                'changed': delta['changed']
+            },
+            'metadata': {
+                'base': {'day': base_day, 'hour': base_hour},
+                'day': day_of_week,
+                'hour': hour,
+                **_time_filter_metadata(target_filter),
+                'tolerance': tolerance,
+                'unchanged': delta['unchanged'],
+                'maxCount': delta['maxCount'],
+                'totalLocations': delta['totalLocations']
+            }
+        })
 
-        # Most common violations
-        violations_query = """
-        SELECT TOP 5
-            v.Description as violation_type,
-            COUNT(*) as count,
-            v.Cost as fine
-        FROM Ticket t
-        JOIN Violation v ON t.violation_code = v.Code
-        GROUP BY v.Description, v.Cost
-        ORDER BY COUNT(*) DESC
-        """
-        top_violations_df = pd.read_sql(violations_query, conn)
-        stats['topViolations'] = []
-        for record in top_violations_df.to_dict('records'):
-            stats['topViolations'].append({
-                'violation_type': record['violation_type'],
-                'count': safe_int(record['count']),
-                'fine': safe_float(record['fine'])
-            })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
 
-        # Peak hours
-        peak_hours_query = """
-        SELECT TOP 5
-            DATEPART(HOUR, issue_date) as hour,
-            COUNT(*) as count
-        FROM Ticket
-        WHERE issue_date IS NOT NULL
-        GROUP BY DATEPART(HOUR, issue_date)
-        ORDER BY COUNT(*) DESC
-        """
-        peak_hours_df = pd.read_sql(peak_hours_query, conn)
-        stats['peakHours'] = []
-        for record in peak_hours_df.to_dict('records'):
-            stats['peakHours'].append({
-                'hour': safe_int(record['hour']),
-                'count': safe_int(record['count'])
-            })
 
-        # Hottest locations
-        hot_locations_query = """
-            SELECT TOP 10
-                violation_location,
-                COUNT(*) as count
-            FROM Ticket
-            WHERE violation_location IS NOT NULL
-            GROUP BY violation_location
-            ORDER BY COUNT(*) DESC
-        """
-        hot_locations_df = pd.read_sql(hot_locations_query, conn)
-        stats['hotLocations'] = []
-        for record in hot_locations_df.to_dict('records'):
-            stats['hotLocations'].append({
-                'violation_location': record['violation_location'],
-                'count': safe_int(record['count'])
-            })
+def query_statistics(conn):
+    """Totals, top violations, peak hours and hot locations; also snapshotted by `parkwise.py build`."""
+    stats = {}
+
+    # Total violations
+    total_df = queries.read_sql(conn, 'statistics.total', queries.TOTAL_TICKETS_QUERY)
+    stats['totalViolations'] = safe_int(total_df.iloc[0]['total'])
+
+    # Most common violations
+    top_violations_df = queries.read_sql(conn, 'statistics.top_violations', queries.TOP_VIOLATIONS_QUERY)
+    stats['topViolations'] = []
+    for record in top_violations_df.to_dict('records'):
+        stats['topViolations'].append({
+            'violation_type': record['violation_type'],
+            'count': safe_int(record['count']),
+            'fine': safe_float(record['fine'])
+        })
+
+    # Peak hours
+    peak_hours_df = queries.read_sql(conn, 'statistics.peak_hours', queries.peak_hours_query(conn))
+    stats['peakHours'] = []
+    for record in peak_hours_df.to_dict('records'):
+        stats['peakHours'].append({
+            'hour': safe_int(record['hour']),
+            'count': safe_int(record['count'])
+        })
+
+    # Hottest locations
+    hot_locations_df = queries.read_sql(conn, 'statistics.hot_locations', queries.HOT_LOCATIONS_QUERY)
+    stats['hotLocations'] = []
+    for record in hot_locations_df.to_dict('records'):
+        stats['hotLocations'].append({
+            'violation_location': record['violation_location'],
+            'count': safe_int(record['count'])
+        })
+    return stats
 
+
+@app.route('/api/statistics')
+def get_statistics():
+    """Get overall parking violation statistics"""
+    if _statistics_snapshot is not None:
+        return jsonify({
+            'status': 'success',
+            'data': _statistics_snapshot,
+            'metadata': {'source': 'snapshot', 'builtAt': _build_manifest_built_at}
+        })
+
+    try:
+        conn = get_db_connection()
+        stats = query_statistics(conn)
+        print(f"[DEBUG] /api/statistics => totalViolations={stats['totalViolations']}")
         conn.close()
 
         return jsonify({
@@ -413,36 +1390,14 @@ def get_location_details(location):
         conn = get_db_connection()
 
         # Get violation patterns for this location
-        query = """
-        SELECT
-            DATENAME(WEEKDAY, t.issue_date) as day_of_week,
-            DATEPART(HOUR, t.issue_date) as hour,
-            COUNT(*) as count,
-            AVG(CAST(v.Cost as FLOAT)) as avg_fine
-        FROM Ticket t
-        JOIN Violation v ON t.violation_code = v.Code
-        WHERE t.violation_location = ?
-            AND t.issue_date IS NOT NULL
-        GROUP BY DATENAME(WEEKDAY, t.issue_date), DATEPART(HOUR, t.issue_date)
-        ORDER BY COUNT(*) DESC
-        """
-
-        df = pd.read_sql(query, conn, params=[location])
+        df = queries.read_sql(conn, 'location.patterns', queries.location_patterns_query(conn), [location])
+        df.insert(0, 'day_of_week', [
+            WEEKDAY_NAMES[weekday] if 0 <= weekday < 7 else None
+            for weekday in pd.to_numeric(df.pop('weekday'), errors='coerce').fillna(-1).astype(int)
+        ])
 
         # Get violation types for this location
-        types_query = """
-        SELECT
-            v.Description as violation_type,
-            COUNT(*) as count,
-            v.Cost as fine
-        FROM Ticket t
-        JOIN Violation v ON t.violation_code = v.Code
-        WHERE t.violation_location = ?
-        GROUP BY v.Description, v.Cost
-        ORDER BY COUNT(*) DESC
-        """
-
-        types_df = pd.read_sql(types_query, conn, params=[location])
+        types_df = queries.read_sql(conn, 'location.violation_types', queries.LOCATION_TYPES_QUERY, [location])
 
         conn.close()
 
@@ -461,69 +1416,383 @@ def get_location_details(location):
             'message': str(e)
         }), 500
 
-def _python_filter_rank(user_lat, user_lng, radius, limit, candidate_records):
-    """Fallback Python implementation mirroring the native nearest calculation."""
-    if radius <= 0:
-        radius = 0.5
+def _parse_trend_granularities(value):
+    text = str(value).strip() if value is not None else ''
+    if not text or text.lower() == 'all':
+        return TREND_GRANULARITIES
+    granularities = [token.strip().lower() for token in text.split(',') if token.strip()]
+    for granularity in granularities:
+        if granularity not in TREND_GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(TREND_GRANULARITIES)}")
+    return tuple(name for name in TREND_GRANULARITIES if name in granularities)
+
+
+def _forecast_target(day, hour, now=None):
+    """(weekday, hour, date) of the next occurrence of day/hour, or of the coming hour when neither is given."""
+    now = now or datetime.now()
+    days = _parse_day_values(day)
+    hours = _parse_hour_values(hour)
+    if days is not None and (len(days) != 1 or days[0] not in WEEKDAY_NAMES):
+        raise ValueError('day must be a single weekday for a forecast')
+    if hours is not None and (len(hours) != 1 or not 0 <= hours[0] <= 23):
+        raise ValueError('hour must be a single hour between 0 and 23 for a forecast')
+
+    upcoming = (now + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+    if days is None and hours is None:
+        return upcoming.weekday(), upcoming.hour, upcoming.date()
+
+    target_hour = hours[0] if hours is not None else upcoming.hour
+    if days is not None:
+        # Earliest date on that weekday whose target hour has not started yet.
+        offset = (WEEKDAY_NAMES.index(days[0]) - now.weekday()) % 7
+        if offset == 0 and target_hour <= now.hour:
+            offset = 7
+    else:
+        offset = 0 if target_hour > now.hour else 1
+    target_date = now.date() + timedelta(days=offset)
+    return target_date.weekday(), target_hour, target_date
 
-    results = []
-    for lat, lng, violation_count, avg_fine, violation_types, location in candidate_records:
-        distance = calculate_distance(user_lat, user_lng, lat, lng)
-        if distance > radius:
-            continue
 
-        results.append({
-            'location': location,
-            'lat': float(lat),
-            'lng': float(lng),
-            'distance': round(distance, 2),
-            'violationCount': safe_int(violation_count, default=0),
-            'avgFine': round(float(avg_fine), 2),
-            'violationTypes': safe_int(violation_types, default=0)
+@app.route('/api/trends')
+def get_trends():
+    """Monthly, weekly and hourly ticket series for a location or the city, plus a forecast for an upcoming hour."""
+    location = request.args.get('location', '').strip() or None
+    try:
+        granularities = _parse_trend_granularities(request.args.get('granularity'))
+        weekday, hour, target_date = _forecast_target(request.args.get('day'), request.args.get('hour'))
+        # The hour series follows the forecast's weekday only when a weekday was named (not day=all).
+        days = _parse_day_values(request.args.get('day'))
+        hour_weekdays = [WEEKDAY_NAMES.index(days[0])] if days is not None else None
+    except ValueError as parse_err:
+        return jsonify({
+            'status': 'error',
+            'message': str(parse_err)
+        }), 400
+
+    try:
+        trend_index = get_trend_index()
+        location_id = None
+        if location is not None:
+            location_id = _location_dictionary.lookup(location)
+            if not trend_index.has_location(location_id):
+                return jsonify({
+                    'status': 'error',
+                    'message': f"No tickets recorded at '{location}'"
+                }), 404
+
+        series = {}
+        for granularity in granularities:
+            labels, days = trend_index.periods(granularity)
+            counts = trend_index.counts(granularity, location_id, hour_weekdays)
+            if granularity == 'hour':
+                day_total = trend_index.weekday_days(hour_weekdays)
+                series['hour'] = [
+                    {'hour': label, 'count': int(count), 'average': float(count) / day_total if day_total else 0.0}
+                    for label, count in zip(labels, counts)
+                ]
+            else:
+                series[granularity] = [
+                    {'period': label, 'count': int(count), 'days': int(day_count)}
+                    for label, count, day_count in zip(labels, counts, days)
+                ]
+
+        forecast = trend_index.forecast(weekday, hour, location_id)
+        print(f"[DEBUG] /api/trends => location={location}, forecast {WEEKDAY_NAMES[weekday]} {hour}:00 = {forecast.expected:.2f}")
+
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'location': _location_dictionary.label(location_id) if location_id is not None else None,
+                'series': series,
+                'forecast': {
+                    'day': WEEKDAY_NAMES[weekday],
+                    'hour': hour,
+                    'date': target_date.isoformat(),
+                    'expected': forecast.expected,
+                    'recentAverage': forecast.recent_average,
+                    'historicalAverage': forecast.historical_average,
+                    'recentWeeks': forecast.recent_weeks,
+                    'historyWeeks': forecast.history_weeks,
+                    # Poisson chance of at least one ticket in the hour.
+                    'probabilityOfAny': 1.0 - math.exp(-forecast.expected)
+                }
+            },
+            'metadata': {
+                'scope': 'location' if location_id is not None else 'city',
+                'granularity': list(granularities),
+                'firstDate': day_number_to_date(trend_index.first_day).isoformat() if len(trend_index) else None,
+                'lastDate': day_number_to_date(trend_index.last_day).isoformat() if len(trend_index) else None,
+                'recentWindowWeeks': trend_index.recent_weeks,
+                'locations': len(trend_index)
+            }
         })
 
-    if not results:
-        return []
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
 
-    counts = [entry['violationCount'] for entry in results]
-    min_count = min(counts)
-    max_count = max(counts) or 1
 
-    for entry in results:
-        if max_count == min_count:
-            percentile = 0.0
-        else:
-            percentile = (entry['violationCount'] - min_count) / max(1, (max_count - min_count))
+def _candidate_columns(df):
+    """Geocoded, columnar view of a heatmap frame for the nearest-violation kernels.
+
+    Built once per cached frame; every column is a numpy array aligned with
+    the 'location_id' column.
+    """
+    cache_key = id(df)
+    with _candidate_column_lock:
+        entry = _candidate_column_cache.get(cache_key)
+        if entry is not None and entry[0] is df:
+            _candidate_column_cache.move_to_end(cache_key)
+            return entry[1]
+
+    location_ids = _frame_location_ids(df)
+    coords = geocode_location_ids(location_ids)
+    lats = coords[:, 0]
+    lngs = coords[:, 1]
+    valid = ~(np.isnan(lats) | np.isnan(lngs))
+
+    lats = lats[valid]
+    lngs = lngs[valid]
+    lat_rad = np.radians(lats)
+    lat_order = np.argsort(lats, kind='stable')
+    columns = {
+        'location_id': location_ids[valid],
+        'lat': lats,
+        'lng': lngs,
+        # Kernel geometry, computed once per dataset instead of per request
+        'lat_rad': lat_rad,
+        'lng_rad': np.radians(lngs),
+        'cos_lat': np.cos(lat_rad),
+        'count': pd.to_numeric(df['violation_count'], errors='coerce').fillna(0).to_numpy(dtype=np.float64)[valid],
+        'avg_fine': pd.to_numeric(df['avg_fine'], errors='coerce').fillna(0.0).to_numpy(dtype=np.float64)[valid],
+        'violation_types': pd.to_numeric(df['violation_types'], errors='coerce').fillna(0).to_numpy(dtype=np.int64)[valid],
+        # Latitude index: a radius search only scans the band of rows within radius of the user's latitude.
+        'lat_order': lat_order,
+        'sorted_lat': lats[lat_order]
+    }
+
+    with _candidate_column_lock:
+        prebuilt = _prebuilt_quadtrees.get(cache_key)
+        if prebuilt is not None and prebuilt[0] is df:
+            columns['quadtree_path'] = prebuilt[1]
+        _candidate_column_cache[cache_key] = (df, columns)
+        _candidate_column_cache.move_to_end(cache_key)
+        if len(_candidate_column_cache) > HEATMAP_QUERY_CACHE_LIMIT + 1:
+            _candidate_column_cache.popitem(last=False)
+    maybe_enforce_memory_budget()
+    return columns
+
+
+def _time_weighted(time_filter, weights):
+    """Whether the time component affects the ranking; otherwise the partitions are never loaded."""
+    return weights[2] > 0 and (time_filter.days is not None or time_filter.hours is not None)
+
+
+def _candidate_time_likelihood(columns, time_filter, weights):
+    """Share of each candidate's historical tickets inside the requested weekday/hour window.
+
+    All ones when the time weight is 0 or no day/hour is given.
+    """
+    neutral = np.ones(len(columns['location_id']), dtype=np.float64)
+    if not _time_weighted(time_filter, weights):
+        return neutral
+
+    lowered = [name.lower() for name in WEEKDAY_NAMES]
+    weekdays = None
+    if time_filter.days is not None:
+        if any(str(name).lower() not in lowered for name in time_filter.days):
+            return neutral
+        weekdays = tuple(lowered.index(str(name).lower()) for name in time_filter.days)
+    hours = None
+    if time_filter.hours is not None:
+        hours = tuple(hour_value for hour_value in time_filter.hours if 0 <= hour_value <= 23)
+        if not hours:
+            return neutral
+
+    try:
+        index = get_time_partition_index()
+    except Exception as index_err:
+        print(f"[WARN] Time partitions unavailable, using neutral time likelihood: {index_err}")
+        return neutral
+
+    cache_key = (weekdays, hours)
+    with _time_likelihood_lock:
+        likelihood = _time_likelihood_cache.get(cache_key)
+        if likelihood is not None:
+            _time_likelihood_cache.move_to_end(cache_key)
+    if likelihood is None:
+        likelihood = index.time_likelihood(weekdays, hours)
+        with _time_likelihood_lock:
+            _time_likelihood_cache[cache_key] = likelihood
+            if len(_time_likelihood_cache) > TIME_LIKELIHOOD_CACHE_LIMIT:
+                _time_likelihood_cache.popitem(last=False)
+
+    # The index shares the app's location dictionary; IDs interned after it was built have no history.
+    location_ids = columns['location_id']
+    if not len(likelihood):
+        return np.zeros(len(location_ids), dtype=np.float64)
+    known = location_ids < len(likelihood)
+    return np.where(known, likelihood[np.minimum(location_ids, len(likelihood) - 1)], 0.0)
+
+
+def _parse_risk_weights(args):
+    weights = []
+    for name, default in RISK_WEIGHT_DEFAULTS.items():
+        value = args.get(name, default=default, type=float)
+        if value is None or math.isnan(value) or value < 0:
+            raise ValueError(f"{name} must be a non-negative number")
+        weights.append(value)
+    return tuple(weights)
+
+
+def _parse_nearest_mode(args):
+    mode = str(args.get('mode', 'radius')).strip().lower()
+    if mode not in NEAREST_MODES:
+        raise ValueError(f"mode must be one of: {', '.join(NEAREST_MODES)}")
+    max_radius = args.get('maxRadius', default=ADAPTIVE_MAX_RADIUS_MILES, type=float)
+    if max_radius is None or math.isnan(max_radius) or max_radius <= 0:
+        raise ValueError('maxRadius must be a positive number of miles')
+    max_risk = args.get('maxRisk', default=ADAPTIVE_MAX_RISK, type=float)
+    if max_risk is None or math.isnan(max_risk) or not 0 <= max_risk <= 1:
+        raise ValueError('maxRisk must be between 0 and 1')
+    return mode, max_radius, max_risk
+
+
+def _candidate_quadtree(columns):
+    """Quadtree for adaptive searches, built on first use and kept with the cached columns."""
+    tree = columns.get('quadtree')
+    if tree is None:
+        tree = _load_prebuilt_quadtree(columns.get('quadtree_path'), len(columns['lat']))
+        if tree is None:
+            tree = RiskQuadtree(columns['lat'], columns['lng'], columns['count'], columns['avg_fine'])
+        with _candidate_column_lock:
+            tree = columns.setdefault('quadtree', tree)
+    return tree
+
+
+def _load_prebuilt_quadtree(path, size):
+    """Quadtree pickled by `parkwise.py build` for the same frame; None if missing or mismatched."""
+    if path is None:
+        return None
+    try:
+        tree = pd.read_pickle(path)
+    except Exception as load_err:
+        print(f"[WARN] Unable to load prebuilt quadtree {path}: {load_err}")
+        return None
+    if not isinstance(tree, RiskQuadtree) or len(tree) != size:
+        print(f"[WARN] Prebuilt quadtree {path} does not match its frame; rebuilding")
+        return None
+    return tree
 
-        if percentile <= 0.33:
-            level = 'Low'
-        elif percentile <= 0.66:
-            level = 'Medium'
-        else:
-            level = 'High'
 
-        entry['riskScore'] = round(percentile, 4)
-        entry['riskLevel'] = level
+def _latitude_band(columns, user_lat, radius):
+    """Sorted column indices whose latitude is within radius miles of user_lat.
+
+    Great-circle distance is never less than the latitude difference, so no
+    location inside the radius falls outside the band.
+    """
+    span = math.degrees(radius / 3959) + 1e-9
+    lo = np.searchsorted(columns['sorted_lat'], user_lat - span, side='left')
+    hi = np.searchsorted(columns['sorted_lat'], user_lat + span, side='right')
+    return np.sort(columns['lat_order'][lo:hi])
+
+
+def _python_score_rank(user_lat, user_lng, radius, limit, lat_rad, lng_rad, cos_lat, counts, fines, likelihoods, weights):
+    """Vectorized fallback mirroring c_nearest.score_rank.
+
+    Returns (index, distance, risk_score, rank_score) tuples ordered by rank
+    score, then distance.
+    """
+    count_weight, fine_weight, time_weight, distance_weight, distance_decay = weights
+    if distance_decay <= 0:
+        distance_decay = 0.25
+
+    user_lat_rad = math.radians(user_lat)
+    sin_dlat = np.sin((lat_rad - user_lat_rad) * 0.5)
+    sin_dlng = np.sin((lng_rad - math.radians(user_lng)) * 0.5)
+    a = sin_dlat * sin_dlat + math.cos(user_lat_rad) * cos_lat * sin_dlng * sin_dlng
+    distances = 3959 * 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    kept = np.flatnonzero(distances <= radius)
+    if not len(kept):
+        return []
+
+    kept_counts = counts[kept]
+    expected_fines = kept_counts * fines[kept]
+    kept_likelihoods = likelihoods[kept]
+
+    count_span = kept_counts.max() - kept_counts.min()
+    if count_span < 1e-9:
+        count_span = 1.0
+    max_expected_fine = expected_fines.max()
+    max_likelihood = kept_likelihoods.max()
+    weight_total = count_weight + fine_weight + time_weight
+
+    if weight_total > 0:
+        count_component = (kept_counts - kept_counts.min()) / count_span
+        fine_component = expected_fines / max_expected_fine if max_expected_fine > 0 else np.zeros(len(kept))
+        time_component = kept_likelihoods / max_likelihood if max_likelihood > 0 else np.zeros(len(kept))
+        risk_scores = (count_weight * count_component + fine_weight * fine_component + time_weight * time_component) / weight_total
+    else:
+        risk_scores = np.zeros(len(kept))
+
+    kept_distances = distances[kept]
+    rank_scores = risk_scores + distance_weight * (1.0 - np.exp(-kept_distances / distance_decay))
+    order = np.lexsort((kept_distances, rank_scores))[:max(limit, 1)]
+    return [
+        (int(kept[i]), float(kept_distances[i]), float(risk_scores[i]), float(rank_scores[i]))
+        for i in order
+    ]
+
+
+def _risk_level(risk_score):
+    if risk_score <= 0.33:
+        return 'Low'
+    if risk_score <= 0.66:
+        return 'Medium'
+    return 'High'
+
+
+def _iter_nearest_results(columns, likelihoods, ranked):
+    """Result records; timeLikelihood is included only when likelihoods is given."""
+    for index, distance, risk_score, rank_score in ranked:
+        record = {
+            'location': _location_dictionary.label(columns['location_id'][index]),
+            'lat': float(columns['lat'][index]),
+            'lng': float(columns['lng'][index]),
+            'distance': round(distance, 2),
+            'violationCount': int(columns['count'][index]),
+            'avgFine': round(float(columns['avg_fine'][index]), 2),
+            'violationTypes': int(columns['violation_types'][index]),
+            'riskScore': round(risk_score, 4),
+            'score': round(rank_score, 4),
+            'riskLevel': _risk_level(risk_score)
+        }
+        if likelihoods is not None:
+            record['timeLikelihood'] = round(float(likelihoods[index]), 4)
+        yield record
 
-    results.sort(key=lambda x: (x['riskScore'], x['distance']))
-    return results[:max(limit, 1)]
+
+def _build_nearest_results(columns, likelihoods, ranked):
+    return list(_iter_nearest_results(columns, likelihoods, ranked))
 
 
 def calculate_distance(lat1, lng1, lat2, lng2):
     """
     Calculate distance in miles between two coordinates using Haversine formula
     """
-    # Convert decimal degrees to radians
-    lat1_rad = math.radians(lat1)
-    lng1_rad = math.radians(lng1)
-    lat2_rad = math.radians(lat2)
-    lng2_rad = math.radians(lng2)
+    # Convert decimal degrees to radians (scalars or numpy arrays)
+    lat1_rad = np.radians(lat1)
+    lng1_rad = np.radians(lng1)
+    lat2_rad = np.radians(lat2)
+    lng2_rad = np.radians(lng2)
 
     # Haversine formula
     dlat = lat2_rad - lat1_rad
     dlng = lng2_rad - lng1_rad
-    a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlng/2)**2
-    c = 2 * math.asin(math.sqrt(a))
+    a = np.sin(dlat/2)**2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlng/2)**2
+    c = 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
 
     # Radius of Earth in miles
     radius_miles = 3959
@@ -557,6 +1826,144 @@ def geocode_address():
     })
 
 
+def _ndjson_response(records):
+    """Stream an iterable of dicts as newline-delimited JSON."""
+    def generate():
+        for record in records:
+            yield json.dumps(record, separators=(',', ':')) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def _parse_stream_format(args):
+    stream_format = str(args.get('format', 'json')).strip().lower()
+    if stream_format not in STREAM_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(STREAM_FORMATS)}")
+    return None if stream_format == 'json' else stream_format
+
+
+def _streamed_payload_response(records, metadata, count_key, stream_format):
+    """Stream records as NDJSON or a chunked JSON document, with metadata as a trailer.
+
+    Payload building, serialization and transmission overlap because records
+    are pulled from the iterable only as chunks are written.  The record count
+    is only known at the end, so metadata (and, for chunked JSON, the status)
+    comes after the data.  A failure mid-stream is reported in that trailer.
+    """
+    def generate_ndjson():
+        total = 0
+        try:
+            for record in records:
+                total += 1
+                yield json.dumps(record, separators=(',', ':')) + '\n'
+        except Exception as stream_err:
+            yield json.dumps({'type': 'error', 'message': str(stream_err)}) + '\n'
+            return
+        yield json.dumps({'type': 'metadata', 'status': 'success', **metadata, count_key: total}) + '\n'
+
+    def generate_chunked():
+        total = 0
+        chunk = []
+        yield '{"data":['
+        try:
+            for record in records:
+                chunk.append(json.dumps(record, separators=(',', ':')))
+                total += 1
+                if len(chunk) >= STREAM_CHUNK_RECORDS:
+                    yield (',' if total > len(chunk) else '') + ','.join(chunk)
+                    chunk = []
+            if chunk:
+                yield (',' if total > len(chunk) else '') + ','.join(chunk)
+        except Exception as stream_err:
+            yield '],"status":"error","message":' + json.dumps(str(stream_err)) + '}'
+            return
+        yield '],"metadata":' + json.dumps({**metadata, count_key: total}) + ',"status":"success"}'
+
+    if stream_format == 'ndjson':
+        return Response(stream_with_context(generate_ndjson()), mimetype='application/x-ndjson')
+    return Response(stream_with_context(generate_chunked()), mimetype='application/json')
+
+
+def _read_bulk_addresses():
+    """Accept a JSON list, {"addresses": [...]}, or newline-separated plain text."""
+    if request.is_json:
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            body = body.get('addresses')
+        if not isinstance(body, list):
+            raise ValueError('Expected a JSON list of addresses or {"addresses": [...]}')
+        return ['' if address is None else str(address) for address in body]
+
+    text = request.get_data(as_text=True) or ''
+    return text.splitlines()
+
+
+@app.route('/api/geocode/bulk', methods=['POST'])
+def geocode_bulk():
+    """Geocode many addresses in one request, streaming one NDJSON record per input.
+
+    Inputs are normalized and de-duplicated, resolved in batches through the
+    shared geocode cache, and followed by a summary record with hit rates.
+    """
+    try:
+        addresses = _read_bulk_addresses()
+    except ValueError as parse_err:
+        return jsonify({
+            'status': 'error',
+            'message': str(parse_err)
+        }), 400
+
+    if len(addresses) > GEOCODE_BULK_LIMIT:
+        return jsonify({
+            'status': 'error',
+            'message': f'At most {GEOCODE_BULK_LIMIT} addresses are accepted per request'
+        }), 413
+
+    def records():
+        resolved = {}
+        cache_hits = 0
+        for batch_start in range(0, len(addresses), GEOCODE_BULK_BATCH_SIZE):
+            batch = addresses[batch_start:batch_start + GEOCODE_BULK_BATCH_SIZE]
+            keys = [normalize_location_key(address) for address in batch]
+            pending = list(dict.fromkeys(key for key in keys if key and key not in resolved))
+            if pending:
+                batch_coords, batch_hits = geocode_batch(pending)
+                resolved.update(batch_coords)
+                cache_hits += batch_hits
+
+            for offset, (address, key) in enumerate(zip(batch, keys)):
+                record = {'index': batch_start + offset, 'address': address}
+                coords = resolved.get(key) if key else None
+                if coords is None:
+                    record['status'] = 'error'
+                    record['message'] = 'address is empty'
+                else:
+                    record['status'] = 'success'
+                    record['lat'] = float(coords[0])
+                    record['lng'] = float(coords[1])
+                    record['normalizedAddress'] = key
+                yield record
+
+        unique_count = len(resolved)
+        total_lookups = _geocode_cache_stats['hits'] + _geocode_cache_stats['misses']
+        yield {
+            'type': 'summary',
+            'total': len(addresses),
+            'unique': unique_count,
+            'cacheHits': cache_hits,
+            'cacheMisses': unique_count - cache_hits,
+            'hitRate': round(cache_hits / unique_count, 4) if unique_count else 0.0,
+            'cache': {
+                'entries': _location_dictionary.geocoded_count() + len(_adhoc_geocode_cache),
+                'hits': _geocode_cache_stats['hits'],
+                'misses': _geocode_cache_stats['misses'],
+                'hitRate': round(_geocode_cache_stats['hits'] / total_lookups, 4) if total_lookups else 0.0
+            }
+        }
+
+    return _ndjson_response(records())
+
+
 @app.route('/api/nearest-violations')
 def get_nearest_violations():
     """Find nearby parking options ranked by relative risk."""
@@ -578,15 +1985,19 @@ def get_nearest_violations():
                 'message': 'lat and lng parameters are required'
             }), 400
 
-        day_filter = None if not day or str(day).lower() == 'all' else day
-        hour_filter = None
-        if hour is not None and str(hour).lower() != 'all':
-            try:
-                hour_filter = safe_int(hour, default=None)
-            except Exception:
-                hour_filter = None
+        try:
+            time_filter = _parse_time_filters(day, hour, request.args)
+            weights = _parse_risk_weights(request.args)
+            stream_format = _parse_stream_format(request.args)
+            mode, max_radius, max_risk = _parse_nearest_mode(request.args)
+        except ValueError as parse_err:
+            return jsonify({
+                'status': 'error',
+                'message': str(parse_err)
+            }), 400
 
-        if day_filter is None and hour_filter is None:
+        df = _fetch_filtered_heatmap_dataframe(time_filter)
+        if df is None:
             df = get_overall_heatmap_df()
             if df is None:
                 df = pd.DataFrame(columns=[
@@ -595,66 +2006,90 @@ def get_nearest_violations():
                     'avg_fine',
                     'violation_types'
                 ])
-        else:
-            df = _fetch_heatmap_dataframe(day_filter, hour_filter)
 
-        if df.empty:
+        columns = _candidate_columns(df) if not df.empty else None
+        if columns is None or not len(columns['location_id']):
+            empty_metadata = {
+                'userLat': lat,
+                'userLng': lng,
+                'radius': radius,
+                'day': day,
+                'hour': hour,
+                **_time_filter_metadata(time_filter),
+                'mode': mode
+            }
+            if stream_format:
+                return _streamed_payload_response(iter(()), empty_metadata, 'totalFound', stream_format)
             return jsonify({
                 'status': 'success',
                 'data': [],
-                'metadata': {
-                    'userLat': lat,
-                    'userLng': lng,
-                    'radius': radius,
-                    'day': day,
-                    'hour': hour,
-                    'totalFound': 0
-                }
+                'metadata': {**empty_metadata, 'totalFound': 0}
             })
 
-        candidate_records = []
-        for _, row in df.iterrows():
-            location_lat, location_lng = geocode_location(row['violation_location'])
-            if location_lat is None or location_lng is None:
-                continue
-
-            candidate_records.append((
-                float(location_lat),
-                float(location_lng),
-                safe_int(row['violation_count'], default=0),
-                safe_float(row['avg_fine'], default=0.0),
-                safe_int(row['violation_types'], default=0),
-                str(row['violation_location'])
-            ))
+        limit = max(limit, 1)
+        if radius is None or radius <= 0:
+            radius = 0.5
 
-        if not candidate_records:
-            return jsonify({
-                'status': 'success',
-                'data': [],
-                'metadata': {
+        time_weighted = _time_weighted(time_filter, weights)
+        likelihoods = _candidate_time_likelihood(columns, time_filter, weights)
+        band = _latitude_band(columns, lat, radius) if mode == 'radius' else None
+        if band is not None:
+            kernel_args = (
+                lat, lng, radius, limit,
+                columns['lat_rad'][band], columns['lng_rad'][band], columns['cos_lat'][band],
+                columns['count'][band], columns['avg_fine'][band], likelihoods[band],
+                weights
+            )
+
+        search_metadata = {'mode': mode}
+        use_native = HAS_NATIVE_NEAREST and c_score_rank is not None
+        ranked = []
+        if mode == 'adaptive':
+            ranked, search_stats = _candidate_quadtree(columns).search(
+                lat, lng, limit, weights, likelihoods,
+                time_key=(time_filter.days, time_filter.hours) if time_weighted else (None, None),
+                max_radius=max_radius,
+                max_risk=max_risk
+            )
+            search_metadata.update({
+                'maxRadius': max_radius,
+                'maxRisk': max_risk,
+                'searchRadius': round(max((entry[1] for entry in ranked), default=0.0), 2),
+                **search_stats
+            })
+        elif len(band):
+            if use_native:
+                try:
+                    with _profiler.native_section('c_nearest.score_rank'):
+                        ranked = c_score_rank(*kernel_args)
+                except Exception as native_err:
+                    print(f"[WARN] Native nearest filter failed, falling back to Python: {native_err}")
+                    ranked = _python_score_rank(*kernel_args)
+            else:
+                ranked = _python_score_rank(*kernel_args)
+            # Kernel indices are positions in the band; map them back to the columns.
+            ranked = [(int(band[index]), distance, risk_score, rank_score) for index, distance, risk_score, rank_score in ranked]
+        if band is not None:
+            search_metadata.update({'candidatesScanned': int(len(band)), 'totalCandidates': int(len(columns['location_id']))})
+
+        if stream_format:
+            return _streamed_payload_response(
+                _iter_nearest_results(columns, likelihoods if time_weighted else None, ranked),
+                {
                     'userLat': lat,
                     'userLng': lng,
                     'radius': radius,
                     'day': day,
                     'hour': hour,
-                    'totalFound': 0
-                }
-            })
+                    **_time_filter_metadata(time_filter),
+                    'weights': dict(zip(RISK_WEIGHT_DEFAULTS, weights)),
+                    **search_metadata
+                },
+                'totalFound',
+                stream_format
+            )
 
-        limit = max(limit, 1)
-        if radius is None or radius <= 0:
-            radius = 0.5
-
-        use_native = HAS_NATIVE_NEAREST and c_filter_rank is not None
-        results = []
-        if use_native:
-            try:
-                results = c_filter_rank(lat, lng, radius, candidate_records, limit)
-            except Exception as native_err:
-                print(f"[WARN] Native nearest filter failed, falling back to Python: {native_err}")
-                results = _python_filter_rank(lat, lng, radius, limit, candidate_records)
-        else:
-            results = _python_filter_rank(lat, lng, radius, limit, candidate_records)
+        results = _build_nearest_results(columns, likelihoods if time_weighted else None, ranked)
 
         return jsonify({
             'status': 'success',
@@ -665,6 +2100,9 @@ def get_nearest_violations():
                 'radius': radius,
                 'day': day,
                 'hour': hour,
+                **_time_filter_metadata(time_filter),
+                'weights': dict(zip(RISK_WEIGHT_DEFAULTS, weights)),
+                **search_metadata,
                 'totalFound': len(results)
             }
         })
@@ -695,6 +2133,329 @@ def get_nearest_violations():
         latency_seconds = time.perf_counter() - request_start
         _record_nearest_metrics(latency_seconds, allocation_delta, native_allocation_count)
 
+def _admin_authorized():
+    if not ADMIN_TOKEN:
+        return False
+    supplied = request.headers.get('X-Admin-Token', '')
+    authorization = request.headers.get('Authorization', '')
+    if authorization.startswith('Bearer '):
+        supplied = authorization[len('Bearer '):]
+    return hmac.compare_digest(supplied.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+
+def _admin_denied():
+    # Without a configured token the admin surface does not exist.
+    if not ADMIN_TOKEN:
+        return jsonify({'status': 'error', 'message': 'Not found'}), 404
+    return jsonify({'status': 'error', 'message': 'Invalid admin token'}), 403
+
+
+@app.route('/api/admin/profile', methods=['POST'])
+def start_profile_capture():
+    """Start a sampling capture for N seconds, or for the next K requests to a route prefix."""
+    if not _admin_authorized():
+        return _admin_denied()
+
+    seconds = request.args.get('seconds', type=float)
+    route = request.args.get('route') or None
+    request_limit = request.args.get('requests', type=int)
+    interval_ms = request.args.get('interval', default=5.0, type=float)
+    scope = request.args.get('scope', 'requests')
+
+    try:
+        capture = _profiler.start(
+            seconds=seconds,
+            route=route,
+            request_limit=request_limit,
+            interval=interval_ms / 1000.0,
+            scope=scope
+        )
+    except ValueError as parse_err:
+        return jsonify({'status': 'error', 'message': str(parse_err)}), 400
+    except ProfilerBusyError as busy_err:
+        return jsonify({'status': 'error', 'message': str(busy_err)}), 409
+
+    print(f"[DEBUG] /api/admin/profile => started capture {capture.id} (seconds={seconds}, route={route}, requests={request_limit})")
+    return jsonify({'status': 'success', 'data': capture.describe()}), 202
+
+
+@app.route('/api/admin/profile/<int:capture_id>', methods=['GET', 'DELETE'])
+def get_profile_capture(capture_id):
+    """Fetch a finished capture as collapsed stacks or speedscope JSON; DELETE stops it early."""
+    if not _admin_authorized():
+        return _admin_denied()
+
+    capture = _profiler.get(capture_id)
+    if capture is None:
+        return jsonify({'status': 'error', 'message': f'No capture with id {capture_id}'}), 404
+
+    if request.method == 'DELETE':
+        if capture.state == 'running':
+            _profiler.stop()
+        return jsonify({'status': 'success', 'data': capture.describe()})
+
+    if capture.state == 'running':
+        return jsonify({'status': 'success', 'data': capture.describe()}), 202
+
+    output_format = request.args.get('format', 'collapsed')
+    if output_format not in PROFILE_FORMATS:
+        return jsonify({
+            'status': 'error',
+            'message': f"format must be one of: {', '.join(PROFILE_FORMATS)}"
+        }), 400
+
+    if output_format == 'speedscope':
+        response = jsonify(to_speedscope(capture))
+        response.headers['Content-Disposition'] = f'attachment; filename=parkwise-profile-{capture.id}.speedscope.json'
+        return response
+    return Response(to_collapsed(capture), mimetype='text/plain')
+
+
+def _describe_cache_key(cache_key):
+    return '/'.join('all' if part is None else str(part) for part in cache_key)
+
+
+def _memory_components():
+    """Deep size of every cache and long-lived structure, plus the native extension's stats.
+
+    Objects shared between components are counted once, under the first one
+    that reaches them.
+    """
+    seen = set()
+    with _heatmap_cache_lock:
+        heatmap_items = list(_heatmap_query_cache.items())
+        prefetched_items = list(_heatmap_prefetch_cache.items())
+    with _candidate_column_lock:
+        candidate_columns = [entry[1] for entry in _candidate_column_cache.values()]
+    with _time_likelihood_lock:
+        likelihoods = list(_time_likelihood_cache.values())
+    overall_df = _heatmap_overall_cache
+    overall_payload = _heatmap_overall_payload_cache
+
+    components = OrderedDict()
+    components['overallFrame'] = {
+        'bytes': memory.deep_size(overall_df, seen),
+        'rows': len(overall_df) if overall_df is not None else 0
+    }
+    components['overallPayload'] = {
+        'bytes': memory.deep_size(overall_payload, seen),
+        'records': len(overall_payload) if overall_payload is not None else 0
+    }
+    # Oldest (next to be evicted) first.
+    frames = [
+        {'key': _describe_cache_key(cache_key), 'rows': len(df), 'bytes': memory.deep_size(df, seen)}
+        for cache_key, df in heatmap_items
+    ]
+    components['heatmapFrames'] = {
+        'bytes': sum(frame['bytes'] for frame in frames),
+        'entries': len(frames),
+        'limit': HEATMAP_QUERY_CACHE_LIMIT,
+        'items': frames
+    }
+    prefetched = [
+        {'key': _describe_cache_key(cache_key), 'rows': len(df), 'bytes': memory.deep_size(df, seen)}
+        for cache_key, df in prefetched_items
+    ]
+    components['prefetchedFrames'] = {
+        'bytes': sum(frame['bytes'] for frame in prefetched),
+        'entries': len(prefetched),
+        'limit': HEATMAP_PREFETCH_CACHE_LIMIT,
+        'items': prefetched
+    }
+    components['candidateColumns'] = {
+        'bytes': sum(memory.deep_size(columns, seen) for columns in candidate_columns),
+        'entries': len(candidate_columns),
+        'quadtrees': sum(1 for columns in candidate_columns if 'quadtree' in columns)
+    }
+    components['timeLikelihoods'] = {
+        'bytes': sum(memory.deep_size(likelihood, seen) for likelihood in likelihoods),
+        'entries': len(likelihoods)
+    }
+    components['locationDictionary'] = {
+        'bytes': memory.deep_size(_location_dictionary, seen),
+        'entries': len(_location_dictionary),
+        'geocoded': _location_dictionary.geocoded_count()
+    }
+    with _adhoc_geocode_lock:
+        adhoc_geocodes = dict(_adhoc_geocode_cache)
+    components['adhocGeocodes'] = {
+        'bytes': memory.deep_size(adhoc_geocodes, seen),
+        'entries': len(adhoc_geocodes),
+        'limit': GEOCODE_ADHOC_CACHE_LIMIT
+    }
+    components['timePartitions'] = {
+        'bytes': memory.deep_size(_time_partition_index, seen),
+        'rows': len(_time_partition_index) if _time_partition_index is not None else 0
+    }
+    components['trends'] = {
+        'bytes': memory.deep_size(_trend_index, seen),
+        'locations': len(_trend_index) if _trend_index is not None else 0
+    }
+
+    native = None
+    if c_hot_path_stats is not None:
+        try:
+            native = c_hot_path_stats()
+        except Exception as native_stats_err:
+            print(f"[WARN] Unable to read native hot-path stats: {native_stats_err}")
+    components['nativeBuffers'] = {'bytes': int(native.get('buffer_bytes', 0)) if native else 0}
+    return components, native
+
+
+def enforce_memory_budget():
+    """Bring the accounted memory under MEMORY_BUDGET_BYTES, cheapest step first.
+
+    1. free idle native scratch buffers;
+    2. downcast candidate columns and the time partition index to compact dtypes;
+    3. drop derived data that is rebuilt on demand (time likelihoods, quadtrees,
+       trend series, ad-hoc geocodes, and the overall payload when it is cached
+       on disk);
+    4. evict least recently used slice frames with their candidate columns,
+       always keeping the most recent one.
+
+    Returns (accounted_bytes, actions).
+    """
+    global _memory_last_check, _heatmap_overall_payload_cache, _trend_index
+    actions = []
+    with _memory_lock:
+        _memory_last_check = time.monotonic()
+        components, _ = _memory_components()
+        total = sum(component['bytes'] for component in components.values())
+        _memory_stats['checks'] += 1
+        budget = MEMORY_BUDGET_BYTES
+
+        if budget is not None and total > budget and c_trim_buffers is not None:
+            released = c_trim_buffers()
+            total -= released
+            _memory_stats['nativeReleasedBytes'] += released
+            actions.append({'action': 'trimNativeBuffers', 'bytes': released})
+
+        with _candidate_column_lock:
+            candidate_columns = [entry[1] for entry in _candidate_column_cache.values()]
+
+        if budget is not None and total > budget:
+            saved = sum(memory.compact_arrays(columns, ('violation_types', 'lat_order')) for columns in candidate_columns)
+            if _time_partition_index is not None:
+                saved += memory.compact_arrays(_time_partition_index, ('violation_count', 'fine_total'))
+            total -= saved
+            _memory_stats['downcastBytes'] += saved
+            actions.append({'action': 'downcast', 'bytes': saved})
+
+        if budget is not None and total > budget:
+            with _time_likelihood_lock:
+                freed = sum(memory.deep_size(likelihood) for likelihood in _time_likelihood_cache.values())
+                _time_likelihood_cache.clear()
+            for columns in candidate_columns:
+                freed += memory.deep_size(columns.pop('quadtree', None))
+            if _trend_index is not None:
+                freed += memory.deep_size(_trend_index)
+                _trend_index = None
+            if _time_partition_index is not None:
+                freed += _time_partition_index.release_range_sums()
+            with _adhoc_geocode_lock:
+                freed += memory.deep_size(dict(_adhoc_geocode_cache))
+                _adhoc_geocode_cache.clear()
+            if _heatmap_overall_payload_cache is not None and HEATMAP_OVERALL_PAYLOAD_PATH.exists():
+                freed += memory.deep_size(_heatmap_overall_payload_cache)
+                _heatmap_overall_payload_cache = None
+            total -= freed
+            _memory_stats['droppedDerived'] += 1
+            actions.append({'action': 'dropDerived', 'bytes': freed})
+
+        evicted = []
+        while budget is not None and total > budget:
+            # Prefetched frames nobody has asked for yet go first.
+            with _heatmap_cache_lock:
+                if not _heatmap_prefetch_cache:
+                    break
+                cache_key, df = _heatmap_prefetch_cache.popitem(last=False)
+            total -= memory.deep_size(df)
+            evicted.append(_describe_cache_key(cache_key))
+        while budget is not None and total > budget:
+            with _heatmap_cache_lock:
+                if len(_heatmap_query_cache) <= 1:
+                    break
+                cache_key, df = _heatmap_query_cache.popitem(last=False)
+            freed = memory.deep_size(df)
+            with _candidate_column_lock:
+                entry = _candidate_column_cache.get(id(df))
+                if entry is not None and entry[0] is df:
+                    del _candidate_column_cache[id(df)]
+                    freed += memory.deep_size(entry[1])
+                _prebuilt_quadtrees.pop(id(df), None)
+            total -= freed
+            evicted.append(_describe_cache_key(cache_key))
+        while budget is not None and total > budget:
+            # Columns of frames no longer in the slice cache, e.g. the overall frame's.
+            with _candidate_column_lock:
+                if len(_candidate_column_cache) <= 1:
+                    break
+                _, (_, columns) = _candidate_column_cache.popitem(last=False)
+            total -= memory.deep_size(columns)
+            evicted.append('candidateColumns')
+        if evicted:
+            _memory_stats['evictions'] += len(evicted)
+            actions.append({'action': 'evict', 'entries': evicted})
+
+        _memory_stats['lastCheck'] = time.time()
+        _memory_stats['lastAccountedBytes'] = total
+    if actions:
+        print(f"[WARN] Memory budget {budget} bytes exceeded; {', '.join(action['action'] for action in actions)} -> {total} bytes")
+    return total, actions
+
+
+def _run_memory_check():
+    global _memory_check_pending
+    try:
+        enforce_memory_budget()
+    except Exception as budget_err:
+        print(f"[WARN] Memory budget check failed: {budget_err}")
+    finally:
+        with _memory_check_lock:
+            _memory_check_pending = False
+
+
+def maybe_enforce_memory_budget():
+    """Schedule a background budget check at most every MEMORY_CHECK_INTERVAL_SECONDS.
+
+    Returns immediately; a no-op without a budget or while a check is queued or running.
+    """
+    global _memory_check_pending
+    if MEMORY_BUDGET_BYTES is None:
+        return
+    with _memory_check_lock:
+        if _memory_check_pending or time.monotonic() - _memory_last_check < MEMORY_CHECK_INTERVAL_SECONDS:
+            return
+        _memory_check_pending = True
+    _memory_executor.submit(_run_memory_check)
+
+
+@app.route('/api/admin/memory', methods=['GET', 'POST'])
+def get_memory_report():
+    """Deep size of every cache, native scratch buffers and process RSS; POST enforces the budget first."""
+    if not _admin_authorized():
+        return _admin_denied()
+
+    actions = []
+    if request.method == 'POST':
+        _, actions = enforce_memory_budget()
+    components, native = _memory_components()
+    accounted = sum(component['bytes'] for component in components.values())
+
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'budgetBytes': MEMORY_BUDGET_BYTES,
+            'accountedBytes': accounted,
+            'overBudget': MEMORY_BUDGET_BYTES is not None and accounted > MEMORY_BUDGET_BYTES,
+            'process': memory.process_memory(),
+            'components': components,
+            'native': native,
+            'enforcement': {**_memory_stats, 'actions': actions}
+        }
+    })
+
+
 def _deterministic_offsets(location_key, scale):
     digest = hashlib.sha1(location_key.encode('utf-8')).hexdigest()
     seed = int(digest[:16], 16)
@@ -702,26 +2463,11 @@ def _deterministic_offsets(location_key, scale):
     return rng.uniform(-scale, scale), rng.uniform(-scale, scale)
 
 
-def geocode_location(location_str):
-    """
-    Convert location string to lat/lng coordinates
-    This is a simplified version - in production, use Google Geocoding API
-    """
+def _resolve_location_key(location_key):
     chicago_lat = 41.8781
     chicago_lng = -87.6298
-
-    if location_str is None:
-        location_str = ''
-
-    location_text = str(location_str).strip()
-    if not location_text:
-        return chicago_lat, chicago_lng
-
-    location_key = location_text.upper()
-
-    cached = _geocode_cache.get(location_key)
-    if cached is not None:
-        return cached
+    if not location_key:
+        return (chicago_lat, chicago_lng)
 
     street_coords = {
         'MICHIGAN': (41.8755, -87.6244),
@@ -739,14 +2485,146 @@ def geocode_location(location_str):
     for street, coords in street_coords.items():
         if street in location_key:
             lat_offset, lng_offset = _deterministic_offsets(location_key, 0.005)
-            result = (float(coords[0] + lat_offset), float(coords[1] + lng_offset))
-            _geocode_cache[location_key] = result
-            return result
+            return (float(coords[0] + lat_offset), float(coords[1] + lng_offset))
 
     lat_offset, lng_offset = _deterministic_offsets(location_key, 0.1)
-    result = (float(chicago_lat + lat_offset), float(chicago_lng + lng_offset))
-    _geocode_cache[location_key] = result
-    return result
+    return (float(chicago_lat + lat_offset), float(chicago_lng + lng_offset))
+
+
+def geocode_location_ids(location_ids):
+    """(n, 2) lat/lng array for location IDs.
+
+    Coordinates are stored per ID in the location dictionary, so each
+    location is hashed and resolved once per process.
+    """
+    coords, resolved = _location_dictionary.coordinates(location_ids, _resolve_location_key)
+    _geocode_cache_stats['hits'] += len(coords) - resolved
+    _geocode_cache_stats['misses'] += resolved
+    return coords
+
+
+def geocode_location_id(location_id):
+    coords = geocode_location_ids([location_id])[0]
+    return float(coords[0]), float(coords[1])
+
+
+def _geocode_adhoc(location_keys):
+    """Coordinates for normalized keys that are not dataset locations, through the bounded LRU cache.
+
+    Returns (coords_by_key, cache_hits).
+    """
+    coords_by_key = {}
+    with _adhoc_geocode_lock:
+        for location_key in location_keys:
+            coords = _adhoc_geocode_cache.get(location_key)
+            if coords is not None:
+                _adhoc_geocode_cache.move_to_end(location_key)
+                coords_by_key[location_key] = coords
+    hits = len(coords_by_key)
+
+    missing = [location_key for location_key in location_keys if location_key not in coords_by_key]
+    resolved = {location_key: _resolve_location_key(location_key) for location_key in missing}
+    with _adhoc_geocode_lock:
+        for location_key, coords in resolved.items():
+            _adhoc_geocode_cache[location_key] = coords
+        while len(_adhoc_geocode_cache) > GEOCODE_ADHOC_CACHE_LIMIT:
+            _adhoc_geocode_cache.popitem(last=False)
+    coords_by_key.update(resolved)
+
+    _geocode_cache_stats['hits'] += hits
+    _geocode_cache_stats['misses'] += len(missing)
+    return coords_by_key, hits
+
+
+def geocode_location(location_str):
+    """
+    Convert location string to lat/lng coordinates
+    This is a simplified version - in production, use Google Geocoding API
+    """
+    location_id = _location_dictionary.lookup(location_str)
+    if location_id is not None:
+        return geocode_location_id(location_id)
+    location_key = normalize_location_key(location_str)
+    return _geocode_adhoc([location_key])[0][location_key]
+
+
+def geocode_batch(location_keys):
+    """Resolve already-normalized, de-duplicated keys.
+
+    Dataset locations use the coordinates stored in the location dictionary;
+    anything else goes through the bounded ad-hoc cache, so request input
+    never grows the dictionary.  Returns (coords_by_key, cache_hits).
+    """
+    known_keys = []
+    known_ids = []
+    adhoc_keys = []
+    for location_key in location_keys:
+        location_id = _location_dictionary.lookup(location_key)
+        if location_id is None:
+            adhoc_keys.append(location_key)
+        else:
+            known_keys.append(location_key)
+            known_ids.append(location_id)
+
+    coords_by_key, hits = _geocode_adhoc(adhoc_keys) if adhoc_keys else ({}, 0)
+    if known_ids:
+        coords, resolved = _location_dictionary.coordinates(known_ids, _resolve_location_key)
+        hits += len(known_ids) - resolved
+        _geocode_cache_stats['hits'] += len(known_ids) - resolved
+        _geocode_cache_stats['misses'] += resolved
+        coords_by_key.update(
+            (location_key, (float(lat), float(lng)))
+            for location_key, (lat, lng) in zip(known_keys, coords)
+        )
+    return coords_by_key, hits
+
+
+def load_build_manifest():
+    """Register the artifacts from the last `python parkwise.py build`, if any.
+
+    Slices listed here are read from their pickles instead of queried, their
+    payloads are served as stored, and the geocoded coordinates and statistics
+    snapshot are loaded up front.  Entries whose files are gone are ignored.
+    """
+    global _build_artifacts, _build_manifest_built_at, _statistics_snapshot
+    manifest = artifacts.load_manifest(DATA_DIR)
+    if manifest is None:
+        return 0
+
+    available = {}
+    for name, entry in manifest.get('artifacts', {}).items():
+        if artifacts.files_present(DATA_DIR, entry):
+            available[name] = entry
+        else:
+            print(f"[WARN] Build artifact {name} is missing files; falling back to live queries")
+
+    locations = available.get('locations')
+    if locations is not None:
+        try:
+            coords_df = pd.read_pickle(DATA_DIR / locations['files']['coordinates']['path'])
+            _location_dictionary.set_coordinates(
+                _location_dictionary.encode(coords_df['violation_location'].to_numpy()),
+                coords_df[['lat', 'lng']].to_numpy(dtype=np.float64)
+            )
+        except Exception as load_err:
+            print(f"[WARN] Unable to load prebuilt coordinates: {load_err}")
+
+    statistics = available.get('statistics')
+    if statistics is not None:
+        try:
+            with (DATA_DIR / statistics['files']['snapshot']['path']).open('r', encoding='utf-8') as fp:
+                _statistics_snapshot = json.load(fp)
+        except Exception as load_err:
+            print(f"[WARN] Unable to load statistics snapshot: {load_err}")
+
+    _build_artifacts = available
+    _build_manifest_built_at = manifest.get('builtAt')
+    print(f"[DEBUG] Loaded build manifest from {manifest.get('builtAt')}: {len(available)} artifacts")
+    return len(available)
+
+
+load_build_manifest()
+
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000) 
@@ -0,0 +1,94 @@
+"""Build manifest shared by ``parkwise.py build`` and the server.
+
+The builder writes every serving artifact under the data directory and then
+records them in build_manifest.json: for each artifact, the hash of the
+inputs it was computed from and the path, size and SHA-256 of each file.
+The next build skips artifacts whose input hash is unchanged, and the server
+reads the manifest at startup to find the precomputed frames, payloads,
+quadtrees and snapshots.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MANIFEST_NAME = 'build_manifest.json'
+# Bump when the layout of any artifact changes; older manifests are ignored.
+MANIFEST_VERSION = 1
+
+
+def heatmap_artifact_name(day_filter, hour_filter):
+    """Manifest key of a single day/hour slice, e.g. 'heatmap/Monday/9' or 'heatmap/all/all'."""
+    day = 'all' if day_filter is None else str(day_filter).strip().capitalize()
+    hour = 'all' if hour_filter is None else str(hour_filter)
+    return f"heatmap/{day}/{hour}"
+
+
+def digest(*parts):
+    """SHA-256 hex digest of the string forms of parts."""
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(str(part).encode('utf-8'))
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+
+def file_digest(path, chunk_size=1 << 20):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def write_file(data_dir, relative_path, writer):
+    """Write one artifact file atomically and describe it for the manifest.
+
+    writer(temp_path) produces the file; it is renamed into place only once
+    complete, so a running server never reads a partial artifact.
+    """
+    path = Path(data_dir) / relative_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(path.name + f'.{os.getpid()}.tmp')
+    try:
+        writer(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+    return {'path': Path(relative_path).as_posix(), 'sha256': file_digest(path), 'bytes': path.stat().st_size}
+
+
+def files_present(data_dir, entry):
+    """Whether every file of a manifest entry still exists with its recorded size."""
+    for file_entry in entry.get('files', {}).values():
+        path = Path(data_dir) / file_entry['path']
+        if not path.exists() or path.stat().st_size != file_entry.get('bytes'):
+            return False
+    return True
+
+
+def load_manifest(data_dir):
+    """The manifest in data_dir, or None if it is missing, unreadable or from another version."""
+    path = Path(data_dir) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    try:
+        with path.open('r', encoding='utf-8') as fp:
+            manifest = json.load(fp)
+    except (OSError, ValueError) as load_err:
+        print(f"[WARN] Unable to read {path}: {load_err}")
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        print(f"[WARN] Ignoring {path}: version {manifest.get('version')} != {MANIFEST_VERSION}; rerun `python parkwise.py build`")
+        return None
+    return manifest
+
+
+def write_manifest(data_dir, manifest):
+    def writer(temp_path):
+        with open(temp_path, 'w', encoding='utf-8') as fp:
+            json.dump(manifest, fp, indent=2, sort_keys=True)
+
+    write_file(data_dir, MANIFEST_NAME, writer)
+    return Path(data_dir) / MANIFEST_NAME
@@ -0,0 +1,400 @@
+#!/usr/bin/env python
+"""
+ParkWise load-test harness
+
+Virtual users replay the traffic the front end generates:
+  page     - statistics plus a heatmap slice, as on page load
+  scrub    - a run of heatmap slider moves, each fetched as a delta
+  nearest  - safer-spot lookups around hot spots of the current slice
+  details  - clicks on a location's detail panel
+
+By default the app is started in-process on an ephemeral port, backed by a
+seeded SQLite stand-in (see local_db.py), so runs are reproducible without
+SQL Server.  Pass --base-url to drive an already running server instead.
+
+Reports throughput, p50/p95/p99 latency and error rate per endpoint, plus
+cache hit ratios for in-process runs, and exits with status 1 when an SLO is
+breached:
+
+    python loadtest.py --users 16 --duration 60
+    python loadtest.py --slo heatmap-delta.p95=150 --slo error_rate=0 --json report.json
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+import requests
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+DEFAULT_MIX = 'scrub=5,nearest=3,details=1,page=1'
+# Latencies in milliseconds, error rates as fractions, throughput in requests/second.
+DEFAULT_SLOS = [
+    '*.p95=1000',
+    '*.p99=2500',
+    'error_rate=0.01'
+]
+SLO_METRICS = ('p50', 'p95', 'p99', 'error_rate')
+REQUEST_TIMEOUT_SECONDS = 30
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile, the same definition the app uses for its p99 metrics."""
+    if not sorted_samples:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(sorted_samples)) - 1)
+    return sorted_samples[index]
+
+
+class LoadStats:
+    """Thread-safe latency and error samples per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.error_samples = []
+
+    def record(self, endpoint, latency_seconds, error=None):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(latency_seconds * 1000.0)
+            self.errors.setdefault(endpoint, 0)
+            if error is not None:
+                self.errors[endpoint] += 1
+                if len(self.error_samples) < 20:
+                    self.error_samples.append(f"{endpoint}: {error}")
+
+    def summary(self, elapsed_seconds):
+        with self._lock:
+            endpoints = {}
+            for endpoint, samples in sorted(self.latencies.items()):
+                ordered = sorted(samples)
+                endpoints[endpoint] = {
+                    'requests': len(ordered),
+                    'errors': self.errors[endpoint],
+                    'error_rate': self.errors[endpoint] / len(ordered),
+                    'throughput': len(ordered) / elapsed_seconds,
+                    'p50': percentile(ordered, 0.50),
+                    'p95': percentile(ordered, 0.95),
+                    'p99': percentile(ordered, 0.99)
+                }
+
+            all_samples = sorted(sample for samples in self.latencies.values() for sample in samples)
+            total_errors = sum(self.errors.values())
+            overall = {
+                'requests': len(all_samples),
+                'errors': total_errors,
+                'error_rate': total_errors / len(all_samples) if all_samples else 0.0,
+                'throughput': len(all_samples) / elapsed_seconds,
+                'p50': percentile(all_samples, 0.50),
+                'p95': percentile(all_samples, 0.95),
+                'p99': percentile(all_samples, 0.99)
+            }
+            return endpoints, overall, list(self.error_samples)
+
+
+class VirtualUser(threading.Thread):
+    """One simulated browser session issuing requests until the deadline."""
+
+    def __init__(self, base_url, stats, mix, deadline, think_seconds, seed):
+        super().__init__(daemon=True)
+        self.base_url = base_url.rstrip('/')
+        self.stats = stats
+        self.scenarios, self.weights = zip(*mix.items())
+        self.deadline = deadline
+        self.think_seconds = think_seconds
+        self.rng = random.Random(seed)
+        self.session = requests.Session()
+        self.day = self.rng.choice(WEEKDAYS)
+        self.hour = self.rng.choice(range(7, 19))
+        self.points = []
+
+    def run(self):
+        self.page()
+        while time.time() < self.deadline:
+            scenario = self.rng.choices(self.scenarios, self.weights)[0]
+            getattr(self, scenario)()
+
+    def _get(self, endpoint, path, params=None):
+        if time.time() >= self.deadline:
+            return None
+
+        start = time.perf_counter()
+        error = None
+        body = None
+        try:
+            response = self.session.get(self.base_url + path, params=params, timeout=REQUEST_TIMEOUT_SECONDS)
+            if response.status_code != 200:
+                error = f"HTTP {response.status_code}"
+            else:
+                body = response.json()
+                if body.get('status') != 'success':
+                    error = body.get('message', 'status is not success')
+                    body = None
+        except (requests.RequestException, ValueError) as request_err:
+            error = str(request_err)
+        self.stats.record(endpoint, time.perf_counter() - start, error)
+
+        if self.think_seconds > 0:
+            time.sleep(self.rng.uniform(0, 2 * self.think_seconds))
+        return body
+
+    def page(self):
+        self._get('statistics', '/api/statistics')
+        body = self._get('heatmap-data', '/api/heatmap-data', {'day': self.day, 'hour': self.hour})
+        if body is not None:
+            self.points = body.get('data') or []
+
+    def scrub(self):
+        # Slider drags mostly step the hour; now and then the day changes.
+        for _ in range(self.rng.randint(3, 8)):
+            base_day, base_hour = self.day, self.hour
+            if self.rng.random() < 0.2:
+                self.day = self.rng.choice(WEEKDAYS)
+            else:
+                self.hour = (self.hour + self.rng.choice((-1, 1))) % 24
+            body = self._get('heatmap-delta', '/api/heatmap-delta', {
+                'baseDay': base_day,
+                'baseHour': base_hour,
+                'day': self.day,
+                'hour': self.hour
+            })
+            if body is not None:
+                self._apply_delta(body.get('data') or {})
+
+    def _apply_delta(self, delta):
+        by_location = {point['location']: point for point in self.points}
+        for location in delta.get('removed', []):
+            by_location.pop(location, None)
+        for point in delta.get('added', []):
+            by_location[point['location']] = point
+        for point in delta.get('changed', []):
+            if point['location'] in by_location:
+                by_location[point['location']].update(point)
+        self.points = list(by_location.values())
+
+    def _hot_spot(self):
+        if not self.points:
+            return None
+        weights = [max(point.get('count', 1), 1) for point in self.points]
+        return self.rng.choices(self.points, weights)[0]
+
+    def nearest(self):
+        spot = self._hot_spot()
+        lat, lng = (spot['lat'], spot['lng']) if spot else (41.8781, -87.6298)
+        self._get('nearest-violations', '/api/nearest-violations', {
+            'lat': lat + self.rng.uniform(-0.003, 0.003),
+            'lng': lng + self.rng.uniform(-0.003, 0.003),
+            'radius': self.rng.choice((0.25, 0.5, 1.0)),
+            'day': self.day,
+            'hour': self.hour,
+            'limit': 20
+        })
+
+    def details(self):
+        spot = self._hot_spot()
+        if spot is None:
+            self.page()
+            return
+        self._get('location-details', '/api/location-details/' + quote(spot['location'], safe=''))
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ('page', 'scrub', 'nearest', 'details'):
+            raise ValueError(f"unknown scenario '{name}'")
+        mix[name] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError('at least one scenario needs a positive weight')
+    return mix
+
+
+def parse_slo(value):
+    """'endpoint.metric=threshold', '*.metric=threshold', 'error_rate=x' or 'throughput=min_rps'."""
+    target, _, threshold = value.partition('=')
+    if not threshold:
+        raise ValueError(f"SLO '{value}' needs a threshold")
+    if target in ('error_rate', 'throughput'):
+        return ('total', target, float(threshold))
+    scope, _, metric = target.rpartition('.')
+    if not scope or metric not in SLO_METRICS:
+        raise ValueError(f"SLO '{value}' must look like endpoint.p95=300 with a metric in {', '.join(SLO_METRICS)}")
+    return (scope, metric, float(threshold))
+
+
+def evaluate_slos(slos, endpoints, overall):
+    results = []
+    for scope, metric, threshold in slos:
+        if scope == 'total':
+            targets = {'total': overall}
+        elif scope == '*':
+            targets = endpoints
+        else:
+            targets = {scope: endpoints[scope]} if scope in endpoints else {}
+        for name, values in targets.items():
+            actual = values[metric]
+            passed = actual >= threshold if metric == 'throughput' else actual <= threshold
+            results.append({'endpoint': name, 'metric': metric, 'threshold': threshold, 'actual': actual, 'passed': passed})
+    return results
+
+
+def start_local_app(args):
+    """Seed a stand-in database in a scratch directory and serve the app from a background thread."""
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix='parkwise-load-'))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    db_path = work_dir / 'parkwise_local.db'
+
+    import local_db
+
+    print(f"Seeding {args.tickets} tickets into {db_path} (seed={args.seed})...")
+    local_db.create_local_database(db_path, tickets=args.tickets, locations=args.locations, seed=args.seed)
+    local_db.write_overall_heatmap(db_path, work_dir / 'heatmap_overall.pkl')
+
+    # app reads these at import time
+    os.environ['PARKWISE_LOCAL_DB'] = str(db_path)
+    os.environ['PARKWISE_DATA_DIR'] = str(work_dir)
+    import app as parkwise_app
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, parkwise_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return parkwise_app, server, f"http://127.0.0.1:{server.server_port}"
+
+
+def cache_snapshot(parkwise_app):
+    if parkwise_app is None:
+        return None
+    return {
+        'heatmap': dict(parkwise_app._heatmap_cache_stats),
+        'geocode': dict(parkwise_app._geocode_cache_stats)
+    }
+
+
+def cache_ratios(before, after):
+    if before is None or after is None:
+        return None
+
+    heatmap = {key: after['heatmap'][key] - before['heatmap'][key] for key in after['heatmap']}
+    # Request-path lookups only: background prefetch loads are not requests.
+    # Coalesced requests waited on another request's query rather than issuing their own.
+    heatmap_lookups = heatmap['lookups']
+    heatmap['hitRatio'] = (heatmap['hits'] + heatmap['coalesced']) / heatmap_lookups if heatmap_lookups else 0.0
+
+    geocode = {key: after['geocode'][key] - before['geocode'][key] for key in after['geocode']}
+    geocode_lookups = geocode['hits'] + geocode['misses']
+    geocode['hitRatio'] = geocode['hits'] / geocode_lookups if geocode_lookups else 0.0
+    return {'heatmap': heatmap, 'geocode': geocode}
+
+
+def print_report(endpoints, overall, caches, slo_results, error_samples, elapsed_seconds):
+    print("=" * 78)
+    print(f"ParkWise load test - {overall['requests']} requests in {elapsed_seconds:.1f}s")
+    print("=" * 78)
+    header = f"{'endpoint':<20}{'requests':>9}{'errors':>8}{'err%':>7}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, values in list(endpoints.items()) + [('TOTAL', overall)]:
+        print(f"{name:<20}{values['requests']:>9}{values['errors']:>8}{values['error_rate'] * 100:>7.2f}"
+              f"{values['throughput']:>8.1f}{values['p50']:>9.1f}{values['p95']:>9.1f}{values['p99']:>9.1f}")
+
+    if caches is not None:
+        heatmap, geocode = caches['heatmap'], caches['geocode']
+        print(f"\nHeatmap cache: request hit ratio {heatmap['hitRatio']:.1%} (lookups={heatmap['lookups']}, hits={heatmap['hits']}, "
+              f"misses={heatmap['misses']}, coalesced={heatmap['coalesced']}; background prefetched={heatmap['prefetched']}, "
+              f"used={heatmap['prefetchHits']})")
+        print(f"Geocode cache: hit ratio {geocode['hitRatio']:.1%} (hits={geocode['hits']}, misses={geocode['misses']})")
+
+    if error_samples:
+        print("\nSample errors:")
+        for sample in error_samples[:5]:
+            print(f"  {sample}")
+
+    print("\nSLOs:")
+    for result in slo_results:
+        unit = '' if result['metric'] in ('error_rate', 'throughput') else ' ms'
+        status = 'PASS' if result['passed'] else 'FAIL'
+        print(f"  [{status}] {result['endpoint']}.{result['metric']}: {result['actual']:.4g}{unit} "
+              f"(limit {result['threshold']:g}{unit})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay realistic ParkWise traffic and check latency SLOs.')
+    parser.add_argument('--base-url', help='drive a running server instead of an in-process app on a local database')
+    parser.add_argument('--users', type=int, default=8, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to generate load')
+    parser.add_argument('--think-ms', type=float, default=50.0, help='mean pause between a user\'s requests')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'scenario weights (default: {DEFAULT_MIX})')
+    parser.add_argument('--slo', action='append', default=None,
+                        help='e.g. heatmap-delta.p95=200, *.p99=1000, error_rate=0.01, throughput=50 (repeatable)')
+    parser.add_argument('--seed', type=int, default=7, help='seeds both the local database and the traffic')
+    parser.add_argument('--tickets', type=int, default=50000, help='tickets in the local database')
+    parser.add_argument('--locations', type=int, default=400, help='distinct locations in the local database')
+    parser.add_argument('--work-dir', help='where to keep the local database and caches (default: a temp dir)')
+    parser.add_argument('--json', dest='json_path', help='also write the report as JSON')
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+        slos = [parse_slo(value) for value in (args.slo or DEFAULT_SLOS)]
+    except ValueError as parse_err:
+        parser.error(str(parse_err))
+
+    parkwise_app = server = None
+    base_url = args.base_url
+    if not base_url:
+        parkwise_app, server, base_url = start_local_app(args)
+    print(f"Driving {base_url} with {args.users} users for {args.duration:.0f}s (mix: {args.mix})")
+
+    stats = LoadStats()
+    before = cache_snapshot(parkwise_app)
+    started = time.time()
+    deadline = started + args.duration
+    users = [
+        VirtualUser(base_url, stats, mix, deadline, args.think_ms / 1000.0, args.seed * 1000 + index)
+        for index in range(args.users)
+    ]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    elapsed = max(time.time() - started, 1e-9)
+
+    caches = cache_ratios(before, cache_snapshot(parkwise_app))
+    if server is not None:
+        server.shutdown()
+
+    endpoints, overall, error_samples = stats.summary(elapsed)
+    slo_results = evaluate_slos(slos, endpoints, overall)
+    print_report(endpoints, overall, caches, slo_results, error_samples, elapsed)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as fp:
+            json.dump({
+                'baseUrl': base_url,
+                'users': args.users,
+                'durationSeconds': elapsed,
+                'mix': mix,
+                'endpoints': endpoints,
+                'overall': overall,
+                'caches': caches,
+                'slos': slo_results
+            }, fp, indent=2)
+
+    breached = [result for result in slo_results if not result['passed']]
+    print(f"\n{'FAILED' if breached else 'PASSED'}: {len(slo_results) - len(breached)}/{len(slo_results)} SLOs met")
+    return 1 if breached else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
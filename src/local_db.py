@@ -0,0 +1,184 @@
+"""Seeded SQLite stand-in for the ParkingTickets database.
+
+Creates a small Ticket/Violation schema with reproducible synthetic tickets,
+including the issue_weekday/issue_hour columns and indexes from
+Additional_Objects.sql, and hands out connections that translate the T-SQL the app issues (TOP,
+DATENAME/DATEPART/DATEDIFF) into SQLite.  Used by the load-test harness and
+for running the app without SQL Server:
+
+    python local_db.py parkwise_local.db --tickets 100000
+    PARKWISE_LOCAL_DB=parkwise_local.db python app.py
+"""
+import argparse
+import random
+import re
+import sqlite3
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+WEEKDAY_CASE = (
+    "CASE CAST(strftime('%w', {0}) AS INTEGER) "
+    "WHEN 0 THEN 'Sunday' WHEN 1 THEN 'Monday' WHEN 2 THEN 'Tuesday' WHEN 3 THEN 'Wednesday' "
+    "WHEN 4 THEN 'Thursday' WHEN 5 THEN 'Friday' ELSE 'Saturday' END"
+)
+# julianday('1900-01-01'), SQL Server's day 0.
+JULIAN_DAY_ZERO = 2415020.5
+
+TOP_PATTERN = re.compile(r'\bSELECT\s+TOP\s+\(?(\d+)\)?', re.IGNORECASE)
+DATENAME_PATTERN = re.compile(r'DATENAME\(\s*WEEKDAY\s*,\s*([\w.]+)\s*\)', re.IGNORECASE)
+DATEPART_PATTERN = re.compile(r'DATEPART\(\s*HOUR\s*,\s*([\w.]+)\s*\)', re.IGNORECASE)
+DATEDIFF_PATTERN = re.compile(r'DATEDIFF\(\s*DAY\s*,\s*0\s*,\s*([\w.]+)\s*\)', re.IGNORECASE)
+
+STREETS = ['STATE', 'CLARK', 'LASALLE', 'WABASH', 'MICHIGAN', 'DEARBORN', 'WELLS', 'FRANKLIN', 'ADAMS', 'RUSH',
+           'HALSTED', 'ASHLAND', 'WESTERN', 'PULASKI', 'CICERO', 'IRVING PARK', 'BELMONT', 'DIVISION']
+DIRECTIONS = ['N', 'S', 'E', 'W']
+VIOLATIONS = [
+    ('0976160F', 'EXPIRED PLATES OR TEMPORARY REGISTRATION', 60),
+    ('0964190A', 'EXPIRED METER OR OVERSTAY', 50),
+    ('0964040B', 'STREET CLEANING', 60),
+    ('0964090E', 'RESIDENTIAL PERMIT PARKING', 75),
+    ('0976170', 'NO CITY STICKER OR IMPROPER DISPLAY', 200),
+    ('0964150B', 'PARKING/STANDING PROHIBITED ANYTIME', 75),
+    ('0964100A', 'WITHIN 15\' OF FIRE HYDRANT', 100),
+    ('0964110A', 'DOUBLE PARKING OR STANDING', 100),
+    ('0964125B', 'NO STANDING/PARKING TIME RESTRICTED', 60),
+    ('0964070', 'SNOW ROUTE: 2\'\' OF SNOW OR MORE', 60),
+    ('0964080A', 'PARK OR STAND IN BUS/TAXI/CARRIAGE STAND', 100),
+    ('0964170A', 'TRUCK,RV,BUS, OR TAXI RESIDENTIAL STREET', 75)
+]
+# Enforcement follows working hours, with a smaller overnight tail.
+HOUR_WEIGHTS = [2, 1, 1, 1, 1, 2, 4, 8, 11, 12, 12, 11, 10, 10, 10, 9, 8, 7, 6, 5, 4, 3, 3, 2]
+
+
+def translate_tsql(query):
+    """Rewrite the T-SQL constructs used by app.py into SQLite syntax."""
+    limit = None
+    top = TOP_PATTERN.search(query)
+    if top:
+        limit = int(top.group(1))
+        query = TOP_PATTERN.sub('SELECT', query, count=1)
+
+    query = DATENAME_PATTERN.sub(lambda match: WEEKDAY_CASE.format(match.group(1)), query)
+    query = DATEPART_PATTERN.sub(lambda match: f"CAST(strftime('%H', {match.group(1)}) AS INTEGER)", query)
+    query = DATEDIFF_PATTERN.sub(
+        lambda match: f"CAST(julianday(date({match.group(1)})) - {JULIAN_DAY_ZERO} AS INTEGER)", query
+    )
+
+    if limit is not None:
+        query = query.rstrip().rstrip(';') + f'\nLIMIT {limit}'
+    return query
+
+
+class TSqlCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        return super().execute(translate_tsql(sql), parameters)
+
+
+class TSqlConnection(sqlite3.Connection):
+    def cursor(self, factory=TSqlCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return super().execute(translate_tsql(sql), parameters)
+
+
+def connect(path):
+    """Open the stand-in database; safe to call from any request thread."""
+    return sqlite3.connect(str(path), factory=TSqlConnection, check_same_thread=False)
+
+
+def _location_pool(rng, count):
+    locations = set()
+    while len(locations) < count:
+        number = rng.randrange(1, 120) * 100 + rng.randrange(0, 100, 2)
+        locations.add(f"{number} {rng.choice(DIRECTIONS)} {rng.choice(STREETS)}")
+    return sorted(locations)
+
+
+def create_local_database(path, tickets=50000, locations=400, days=120, seed=7, end_date=None):
+    """(Re)create a seeded database at path and return the number of tickets written.
+
+    Location popularity follows a Zipf-like curve so a few hot spots dominate,
+    like the real data.  The same seed always produces the same rows.
+    """
+    rng = random.Random(seed)
+    end_date = end_date or datetime(2024, 6, 30)
+    start_date = end_date - timedelta(days=days)
+    location_names = _location_pool(rng, locations)
+    location_weights = [1.0 / (rank + 1) ** 0.9 for rank in range(len(location_names))]
+    hours = list(range(24))
+
+    conn = connect(path)
+    try:
+        conn.executescript("""
+            DROP TABLE IF EXISTS Ticket;
+            DROP TABLE IF EXISTS Violation;
+            CREATE TABLE Violation (Code TEXT PRIMARY KEY, Description TEXT, Cost INTEGER);
+            CREATE TABLE Ticket (
+                ticket_number INTEGER,
+                issue_date TEXT,
+                violation_location TEXT,
+                violation_code TEXT,
+                issue_weekday INTEGER GENERATED ALWAYS AS (CAST(julianday(date(issue_date)) - 2415020.5 AS INTEGER) % 7) STORED,
+                issue_hour INTEGER GENERATED ALWAYS AS (CAST(strftime('%H', issue_date) AS INTEGER)) STORED
+            );
+        """)
+        conn.executemany("INSERT INTO Violation (Code, Description, Cost) VALUES (?, ?, ?)", VIOLATIONS)
+
+        rows = []
+        for ticket_number in range(tickets):
+            issued = start_date + timedelta(days=rng.randrange(days), hours=rng.choices(hours, HOUR_WEIGHTS)[0],
+                                            minutes=rng.randrange(60))
+            rows.append((
+                ticket_number,
+                issued.strftime('%Y-%m-%d %H:%M:%S'),
+                rng.choices(location_names, location_weights)[0],
+                rng.choice(VIOLATIONS)[0]
+            ))
+        conn.executemany(
+            "INSERT INTO Ticket (ticket_number, issue_date, violation_location, violation_code) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        conn.executescript("""
+            CREATE INDEX IX_Ticket_location_weekday_hour ON Ticket (violation_location, issue_weekday, issue_hour, violation_code);
+            CREATE INDEX IX_Ticket_weekday_hour_location ON Ticket (issue_weekday, issue_hour, violation_location, violation_code);
+        """)
+        conn.commit()
+    finally:
+        conn.close()
+    return tickets
+
+
+def write_overall_heatmap(path, output_path):
+    """Write the all-time per-location aggregate the app reads as heatmap_overall.pkl."""
+    conn = connect(path)
+    try:
+        df = pd.read_sql("""
+            SELECT
+                t.violation_location,
+                COUNT(*) as violation_count,
+                AVG(CAST(v.Cost as FLOAT)) as avg_fine,
+                COUNT(DISTINCT t.violation_code) as violation_types
+            FROM Ticket t
+            JOIN Violation v ON t.violation_code = v.Code
+            WHERE t.violation_location IS NOT NULL
+            GROUP BY t.violation_location
+        """, conn)
+    finally:
+        conn.close()
+    df.to_pickle(output_path)
+    return len(df)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Create a seeded SQLite stand-in for the ParkingTickets database.')
+    parser.add_argument('path')
+    parser.add_argument('--tickets', type=int, default=50000)
+    parser.add_argument('--locations', type=int, default=400)
+    parser.add_argument('--days', type=int, default=120)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    count = create_local_database(args.path, args.tickets, args.locations, args.days, args.seed)
+    print(f"Wrote {count} tickets to {args.path}")
@@ -0,0 +1,128 @@
+"""Process-wide dictionary encoding of violation locations.
+
+Every normalized location string gets a dense integer ID the first time it
+is seen, and keeps it for the life of the process.  Cached frames, the
+geocode store and the nearest kernels carry these IDs; strings are looked up
+again only when a response is serialized.  Because IDs are dense, per-location
+attributes such as coordinates live in arrays indexed by ID rather than in
+dicts keyed by strings.
+"""
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+def normalize_location_key(location_str):
+    """Canonical cache key for an address: trimmed and upper-case, as geocoding has always keyed it."""
+    if location_str is None:
+        return ''
+    return str(location_str).strip().upper()
+
+
+class LocationDictionary:
+    """Append-only, thread-safe mapping between normalized locations and integer IDs.
+
+    The first spelling seen for a location, stripped of surrounding
+    whitespace, is kept as its label and is what responses show, so output
+    (and queries by label) match the strings stored in the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = {}
+        self._keys = []
+        self._labels = []
+        # (lat, lng) per ID; NaN until the location is first geocoded.
+        self._coords = np.full((0, 2), np.nan, dtype=np.float64)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _add(self, key, label):
+        """Return the ID for key, assigning the next one if it is new.  Caller holds the lock."""
+        location_id = self._ids.get(key)
+        if location_id is None:
+            location_id = len(self._keys)
+            key = sys.intern(key)
+            self._keys.append(key)
+            self._labels.append(sys.intern(str(label).strip()) if label is not None else key)
+            self._ids[key] = location_id
+        return location_id
+
+    def intern(self, location_str):
+        """ID for a single location string."""
+        key = normalize_location_key(location_str)
+        location_id = self._ids.get(key)
+        if location_id is not None:
+            return location_id
+        with self._lock:
+            return self._add(key, location_str)
+
+    def encode(self, values):
+        """Map an array-like of location strings to an int32 ID array.
+
+        Values are factorized first so each distinct string is normalized and
+        hashed once, however many rows repeat it.
+        """
+        series = pd.Series(values, dtype=object, copy=False).fillna('').astype(str)
+        codes, uniques = pd.factorize(series, sort=False)
+        unique_ids = np.empty(len(uniques), dtype=np.int32)
+        with self._lock:
+            for position, label in enumerate(uniques):
+                unique_ids[position] = self._add(normalize_location_key(label), label)
+        return unique_ids[codes]
+
+    def lookup(self, location_str):
+        """ID for a location string, or None if it has never been seen."""
+        return self._ids.get(normalize_location_key(location_str))
+
+    def key(self, location_id):
+        return self._keys[location_id]
+
+    def label(self, location_id):
+        return self._labels[location_id]
+
+    def labels(self, location_ids):
+        labels = self._labels
+        return [labels[location_id] for location_id in location_ids]
+
+    def _reserve_coordinates(self):
+        """Grow the coordinate array to cover every ID.  Caller holds the lock."""
+        if len(self._coords) < len(self._keys):
+            grown = np.full((max(len(self._keys), 2 * len(self._coords)), 2), np.nan, dtype=np.float64)
+            grown[:len(self._coords)] = self._coords
+            self._coords = grown
+
+    def set_coordinates(self, location_ids, coords):
+        """Store known (lat, lng) pairs, e.g. coordinates geocoded by a build."""
+        location_ids = np.asarray(location_ids, dtype=np.int64)
+        with self._lock:
+            self._reserve_coordinates()
+            self._coords[location_ids] = np.asarray(coords, dtype=np.float64)
+
+    def coordinates(self, location_ids, resolver):
+        """(n, 2) array of (lat, lng) for location_ids.
+
+        IDs without coordinates yet are resolved once each with
+        resolver(normalized_key) and stored.  Returns (coords, resolved_count).
+        """
+        location_ids = np.asarray(location_ids, dtype=np.int64)
+        with self._lock:
+            self._reserve_coordinates()
+            coords = self._coords[location_ids]
+
+            missing = np.flatnonzero(np.isnan(coords[:, 0]))
+            if not len(missing):
+                return coords, 0
+
+            resolved_ids = np.unique(location_ids[missing])
+            for location_id in resolved_ids:
+                self._coords[location_id] = resolver(self._keys[location_id])
+            coords[missing] = self._coords[location_ids[missing]]
+        return coords, len(resolved_ids)
+
+    def geocoded_count(self):
+        coords = self._coords
+        return int(np.count_nonzero(~np.isnan(coords[:, 0])))
@@ -0,0 +1,113 @@
+"""Memory accounting helpers for the app's in-process caches.
+
+deep_size walks an object graph once, counting shared objects a single time,
+and uses pandas/numpy's own accounting for frames and arrays so large columns
+cost O(1) to measure.  compact_arrays downcasts numeric arrays to the smallest
+dtype that holds their values; the app uses it before evicting anything when
+a memory budget is exceeded.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def deep_size(obj, seen=None):
+    """Approximate bytes reachable from obj; pass the same `seen` set to avoid double counting across calls."""
+    if seen is None:
+        seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+
+        if isinstance(current, pd.DataFrame):
+            total += int(current.memory_usage(index=True, deep=True).sum())
+        elif isinstance(current, (pd.Series, pd.Index)):
+            total += int(current.memory_usage(deep=True))
+        elif isinstance(current, np.ndarray):
+            total += sys.getsizeof(current) + (current.nbytes if current.base is not None else 0)
+            if current.dtype == object:
+                stack.extend(current.ravel().tolist())
+        elif isinstance(current, dict):
+            total += sys.getsizeof(current)
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            total += sys.getsizeof(current)
+            stack.extend(current)
+        elif isinstance(current, (str, bytes, int, float, bool, np.generic)):
+            total += sys.getsizeof(current)
+        else:
+            total += sys.getsizeof(current)
+            attributes = getattr(current, '__dict__', None)
+            if attributes is not None:
+                stack.append(attributes)
+    return total
+
+
+def compact_array(values):
+    """values in the smallest integer dtype holding its range, or float32 for floats; None if already compact."""
+    if not isinstance(values, np.ndarray) or not len(values):
+        return None
+    if np.issubdtype(values.dtype, np.integer) and values.dtype.itemsize > 1:
+        low, high = values.min(), values.max()
+        for dtype in (np.int8, np.int16, np.int32):
+            if np.dtype(dtype).itemsize < values.dtype.itemsize and np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                return values.astype(dtype)
+    elif values.dtype == np.float64:
+        return values.astype(np.float32)
+    return None
+
+
+def compact_arrays(holder, names):
+    """Replace the named arrays of a dict or object with compact copies.  Returns bytes saved.
+
+    Each array is swapped in one assignment, so concurrent readers see either
+    the old or the new array, never a partial one.
+    """
+    saved = 0
+    is_dict = isinstance(holder, dict)
+    for name in names:
+        values = holder.get(name) if is_dict else getattr(holder, name, None)
+        compacted = compact_array(values)
+        if compacted is None:
+            continue
+        saved += values.nbytes - compacted.nbytes
+        if is_dict:
+            holder[name] = compacted
+        else:
+            setattr(holder, name, compacted)
+    return saved
+
+
+def process_memory():
+    """Resident set size and its peak in bytes; None where the platform does not say."""
+    rss = None
+    peak = None
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        rss = info.rss
+        peak = getattr(info, 'peak_wset', None)
+    elif os.path.exists('/proc/self/statm'):
+        with open('/proc/self/statm') as fp:
+            rss = int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    if peak is None and resource is not None:
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak if sys.platform == 'darwin' else peak * 1024
+    return {'rssBytes': rss, 'peakRssBytes': peak}
@@ -1,51 +1,140 @@
 #define PY_SSIZE_T_CLEAN
 #include <Python.h>
 #include <math.h>
+#include <pythread.h>
+#include <stdint.h>
 #include <stdlib.h>
+#include <string.h>
+
+#ifdef _OPENMP
+#include <omp.h>
+#endif
 
 #ifndef M_PI
 #define M_PI 3.14159265358979323846
 #endif
 
+#define EARTH_RADIUS_MILES 3959.0
+/* Below this many candidates the thread start-up cost outweighs the work. */
+#define PARALLEL_MIN_CANDIDATES 16384
+/* The equirectangular screen is only trusted at city scale, with 1% slack. */
+#define PREFILTER_MAX_RADIUS_MILES 100.0
+#define PREFILTER_SLACK 1.01f
+/*
+ * After a spike, an arena whose calls keep needing less than 1/SHRINK_RATIO of
+ * its capacity is shrunk back once SHRINK_AFTER_CALLS such calls have run in
+ * a row.  Arenas below SHRINK_MIN_CAPACITY entries are never shrunk.
+ */
+#define SHRINK_RATIO 8
+#define SHRINK_AFTER_CALLS 32
+#define SHRINK_MIN_CAPACITY 65536
+#define MIN_BUFFER_CAPACITY 1024
+
 typedef struct {
-    double lat;
-    double lng;
+    Py_ssize_t index;
     double distance;
-    double avg_fine;
-    long violation_count;
-    long violation_types;
-    PyObject *location;
     double risk_score;
-} nearest_result_t;
-
-static nearest_result_t *result_buffer = NULL;
-static Py_ssize_t result_capacity = 0;
-static long hot_path_allocs_last = 0;
+    double rank_score;
+} scored_result_t;
+
+/*
+ * Scratch space for one call.  Arenas are checked out of a pool for the
+ * duration of a call, so concurrent calls never share buffers, and returned
+ * afterwards so their capacity is reused by the next call on any thread.
+ * Buffers use the raw allocator because they are touched without the GIL.
+ */
+typedef struct scratch_arena {
+    scored_result_t *scored;
+    Py_ssize_t scored_capacity;
+    double *distances;
+    Py_ssize_t distances_capacity;
+    long allocations;
+    Py_ssize_t call_needed;
+    int small_calls;
+    struct scratch_arena *next_free;
+    struct scratch_arena *next_all;
+} scratch_arena_t;
+
+/* Everything below is protected by arena_lock. */
+static PyThread_type_lock arena_lock = NULL;
+static scratch_arena_t *free_arenas = NULL;
+static scratch_arena_t *all_arenas = NULL;
+static Py_ssize_t arena_count = 0;
 static long hot_path_allocs_total = 0;
+static long shrink_total = 0;
+static size_t released_bytes_total = 0;
+
+/* Per-thread allocation count of that thread's most recent call. */
+static Py_tss_t last_call_allocs_key = Py_tss_NEEDS_INIT;
 
 static double to_radians(double degrees) {
     return degrees * (M_PI / 180.0);
 }
 
-static double haversine_miles(double lat1, double lng1, double lat2, double lng2) {
-    const double radius_miles = 3959.0;
-    double dlat = to_radians(lat2 - lat1);
-    double dlng = to_radians(lng2 - lng1);
+/*
+ * Distance from the user to every candidate, or -1 for candidates that are
+ * certainly outside the radius.  Inputs are radians and cos(latitude) that
+ * the caller precomputes once per dataset.
+ *
+ * Pass 1 is a branch-free single-precision equirectangular screen, cheap
+ * enough to vectorize across the whole set.  Pass 2 computes the exact
+ * double-precision haversine only for the survivors.  Both passes split
+ * across OpenMP threads for large sets; no Python objects are touched, so
+ * this runs with the GIL released.
+ */
+static void compute_distances(const double *lat_rad, const double *lng_rad, const double *cos_lat,
+                              Py_ssize_t count, double user_lat_rad, double user_lng_rad,
+                              double radius, double *distances) {
+    const double cos_user = cos(user_lat_rad);
+
+    if (radius <= PREFILTER_MAX_RADIUS_MILES) {
+        const float cos_user_f = (float)cos_user;
+        const float limit = (float)(radius / EARTH_RADIUS_MILES) * PREFILTER_SLACK;
+        const float limit_sq = limit * limit;
+
+#if defined(_OPENMP) && _OPENMP >= 201307
+#pragma omp parallel for simd if (count >= PARALLEL_MIN_CANDIDATES)
+#elif defined(_OPENMP)
+#pragma omp parallel for if (count >= PARALLEL_MIN_CANDIDATES)
+#endif
+        for (Py_ssize_t i = 0; i < count; ++i) {
+            /*
+             * Subtract in double: rounding absolute coordinates (~1.5 rad) to
+             * float first costs ~1e-7 rad, more than the slack at radii of a
+             * few feet.  The small differences lose nothing as floats.
+             */
+            float dlat = (float)(lat_rad[i] - user_lat_rad);
+            float x = (float)(lng_rad[i] - user_lng_rad) * 0.5f * (cos_user_f + (float)cos_lat[i]);
+            distances[i] = (x * x + dlat * dlat) <= limit_sq ? 0.0 : -1.0;
+        }
+    } else {
+        for (Py_ssize_t i = 0; i < count; ++i) {
+            distances[i] = 0.0;
+        }
+    }
 
-    double a = pow(sin(dlat / 2.0), 2.0) +
-               cos(to_radians(lat1)) * cos(to_radians(lat2)) * pow(sin(dlng / 2.0), 2.0);
-    double c = 2.0 * asin(fmin(1.0, sqrt(a)));
-    return radius_miles * c;
+#ifdef _OPENMP
+#pragma omp parallel for schedule(static) if (count >= PARALLEL_MIN_CANDIDATES)
+#endif
+    for (Py_ssize_t i = 0; i < count; ++i) {
+        if (distances[i] < 0.0) {
+            continue;
+        }
+        double sin_dlat = sin((lat_rad[i] - user_lat_rad) * 0.5);
+        double sin_dlng = sin((lng_rad[i] - user_lng_rad) * 0.5);
+        double a = sin_dlat * sin_dlat + cos_user * cos_lat[i] * sin_dlng * sin_dlng;
+        distances[i] = EARTH_RADIUS_MILES * 2.0 * asin(fmin(1.0, sqrt(a)));
+    }
 }
 
-static int compare_results(const void *a, const void *b) {
-    const nearest_result_t *ra = (const nearest_result_t *)a;
-    const nearest_result_t *rb = (const nearest_result_t *)b;
+static int compare_scored(const void *a, const void *b) {
+    const scored_result_t *ra = (const scored_result_t *)a;
+    const scored_result_t *rb = (const scored_result_t *)b;
 
-    if (ra->risk_score < rb->risk_score) {
+    if (ra->rank_score < rb->rank_score) {
         return -1;
     }
-    if (ra->risk_score > rb->risk_score) {
+    if (ra->rank_score > rb->rank_score) {
         return 1;
     }
     if (ra->distance < rb->distance) {
@@ -57,207 +146,302 @@ static int compare_results(const void *a, const void *b) {
     return 0;
 }
 
-static PyObject *build_python_result(const nearest_result_t *result) {
-    PyObject *entry = PyDict_New();
-    if (!entry) {
-        return NULL;
+static scratch_arena_t *acquire_arena(void) {
+    PyThread_acquire_lock(arena_lock, WAIT_LOCK);
+    scratch_arena_t *arena = free_arenas;
+    if (arena) {
+        free_arenas = arena->next_free;
+    } else {
+        arena = PyMem_RawCalloc(1, sizeof(scratch_arena_t));
+        if (arena) {
+            arena->next_all = all_arenas;
+            all_arenas = arena;
+            arena_count++;
+        }
     }
+    PyThread_release_lock(arena_lock);
 
-    PyObject *location_str = result->location ? result->location : PyUnicode_FromString("");
-    if (!location_str) {
-        Py_DECREF(entry);
-        return NULL;
+    if (arena) {
+        arena->allocations = 0;
+        arena->call_needed = 0;
+        arena->next_free = NULL;
     }
+    return arena;
+}
 
-    PyDict_SetItemString(entry, "location", location_str);
-    PyDict_SetItemString(entry, "lat", PyFloat_FromDouble(result->lat));
-    PyDict_SetItemString(entry, "lng", PyFloat_FromDouble(result->lng));
-    PyDict_SetItemString(entry, "distance", PyFloat_FromDouble(result->distance));
-    PyDict_SetItemString(entry, "violationCount", PyLong_FromLong(result->violation_count));
-    PyDict_SetItemString(entry, "avgFine", PyFloat_FromDouble(result->avg_fine));
-    PyDict_SetItemString(entry, "violationTypes", PyLong_FromLong(result->violation_types));
-    PyDict_SetItemString(entry, "riskScore", PyFloat_FromDouble(result->risk_score));
+static size_t arena_bytes(const scratch_arena_t *arena) {
+    return (size_t)arena->scored_capacity * sizeof(scored_result_t)
+        + (size_t)arena->distances_capacity * sizeof(double);
+}
+
+/* Reallocate a buffer down to target entries; on failure the larger buffer is kept. */
+static size_t shrink_buffer(void **buffer, Py_ssize_t *capacity, Py_ssize_t target, size_t item_size) {
+    if (*capacity <= target) {
+        return 0;
+    }
+    void *new_buffer = PyMem_RawRealloc(*buffer, item_size * target);
+    if (!new_buffer) {
+        return 0;
+    }
+    size_t released = item_size * (size_t)(*capacity - target);
+    *buffer = new_buffer;
+    *capacity = target;
+    return released;
+}
 
-    const char *risk_level = "Low";
-    if (result->risk_score > 0.66) {
-        risk_level = "High";
-    } else if (result->risk_score > 0.33) {
-        risk_level = "Medium";
+/* Shrink an arena that has stayed far below its capacity since a spike.  Caller owns the arena. */
+static size_t maybe_shrink_arena(scratch_arena_t *arena) {
+    Py_ssize_t capacity = arena->scored_capacity;
+    if (arena->distances_capacity > capacity) {
+        capacity = arena->distances_capacity;
     }
-    PyDict_SetItemString(entry, "riskLevel", PyUnicode_FromString(risk_level));
 
-    if (!result->location) {
-        Py_DECREF(location_str);
+    if (capacity < SHRINK_MIN_CAPACITY || arena->call_needed * SHRINK_RATIO >= capacity) {
+        arena->small_calls = 0;
+        return 0;
+    }
+    if (++arena->small_calls < SHRINK_AFTER_CALLS) {
+        return 0;
     }
 
-    return entry;
+    arena->small_calls = 0;
+    Py_ssize_t target = MIN_BUFFER_CAPACITY;
+    while (target < arena->call_needed * 2) {
+        target *= 2;
+    }
+    return shrink_buffer((void **)&arena->scored, &arena->scored_capacity, target, sizeof(scored_result_t))
+        + shrink_buffer((void **)&arena->distances, &arena->distances_capacity, target, sizeof(double));
 }
 
-static void release_locations(Py_ssize_t count) {
-    if (!result_buffer) {
-        return;
-    }
+static void release_arena(scratch_arena_t *arena) {
+    PyThread_tss_set(&last_call_allocs_key, (void *)(intptr_t)arena->allocations);
+    size_t released = maybe_shrink_arena(arena);
 
-    for (Py_ssize_t i = 0; i < count; ++i) {
-        if (result_buffer[i].location) {
-            Py_DECREF(result_buffer[i].location);
-            result_buffer[i].location = NULL;
-        }
+    PyThread_acquire_lock(arena_lock, WAIT_LOCK);
+    hot_path_allocs_total += arena->allocations;
+    if (released) {
+        shrink_total += 1;
+        released_bytes_total += released;
     }
+    arena->next_free = free_arenas;
+    free_arenas = arena;
+    PyThread_release_lock(arena_lock);
 }
 
-static int ensure_capacity(Py_ssize_t needed) {
-    if (needed <= result_capacity) {
+static int grow_buffer(scratch_arena_t *arena, void **buffer, Py_ssize_t *capacity, Py_ssize_t needed, size_t item_size) {
+    if (needed > arena->call_needed) {
+        arena->call_needed = needed;
+    }
+    if (needed <= *capacity) {
         return 0;
     }
 
-    Py_ssize_t new_capacity = result_capacity > 0 ? result_capacity : 1024;
+    Py_ssize_t new_capacity = *capacity > 0 ? *capacity : MIN_BUFFER_CAPACITY;
     while (new_capacity < needed) {
         new_capacity *= 2;
     }
 
-    nearest_result_t *new_buffer = PyMem_Realloc(result_buffer, sizeof(nearest_result_t) * new_capacity);
+    void *new_buffer = PyMem_RawRealloc(*buffer, item_size * new_capacity);
     if (!new_buffer) {
         return -1;
     }
 
-    result_buffer = new_buffer;
-    result_capacity = new_capacity;
-    hot_path_allocs_last += 1;
-    hot_path_allocs_total += 1;
+    *buffer = new_buffer;
+    *capacity = new_capacity;
+    arena->allocations += 1;
     return 0;
 }
 
-static PyObject *filter_rank(PyObject *self, PyObject *args) {
-    double user_lat, user_lng, radius;
-    PyObject *candidates_obj;
-    Py_ssize_t limit;
-
-    if (!PyArg_ParseTuple(args, "dddOn", &user_lat, &user_lng, &radius, &candidates_obj, &limit)) {
-        return NULL;
-    }
-
-    if (limit < 1) {
-        limit = 1;
+static int get_double_column(PyObject *obj, Py_buffer *view, Py_ssize_t expected, const char *name) {
+    if (PyObject_GetBuffer(obj, view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) != 0) {
+        return -1;
     }
 
-    hot_path_allocs_last = 0;
-
-    PyObject *seq = PySequence_Fast(candidates_obj, "candidates must be a sequence");
-    if (!seq) {
-        return NULL;
+    if (view->itemsize != sizeof(double) || !view->format || strcmp(view->format, "d") != 0) {
+        PyErr_Format(PyExc_TypeError, "%s must be a contiguous float64 buffer", name);
+        PyBuffer_Release(view);
+        return -1;
     }
 
-    Py_ssize_t candidate_count = PySequence_Fast_GET_SIZE(seq);
-    if (candidate_count == 0) {
-        Py_DECREF(seq);
-        return PyList_New(0);
+    Py_ssize_t length = view->len / view->itemsize;
+    if (expected >= 0 && length != expected) {
+        PyErr_Format(PyExc_ValueError, "%s has %zd entries, expected %zd", name, length, expected);
+        PyBuffer_Release(view);
+        return -1;
     }
+    return 0;
+}
 
-    if (ensure_capacity(candidate_count) != 0) {
-        Py_DECREF(seq);
-        return PyErr_NoMemory();
-    }
-    nearest_result_t *results = result_buffer;
+/* Distances, normalisation, scoring and sort for score_rank; runs without the GIL. */
+static Py_ssize_t score_candidates(scratch_arena_t *arena, Py_ssize_t candidate_count,
+                                   const double *lat_rad, const double *lng_rad, const double *cos_lat,
+                                   const double *counts, const double *fines, const double *likelihoods,
+                                   double user_lat, double user_lng, double radius, const double *weights) {
+    const double count_weight = weights[0];
+    const double fine_weight = weights[1];
+    const double time_weight = weights[2];
+    const double distance_weight = weights[3];
+    const double distance_decay = weights[4];
+    scored_result_t *results = arena->scored;
+    double *distances = arena->distances;
+
+    compute_distances(lat_rad, lng_rad, cos_lat, candidate_count, to_radians(user_lat), to_radians(user_lng),
+                      radius, distances);
 
     Py_ssize_t kept = 0;
     for (Py_ssize_t i = 0; i < candidate_count; ++i) {
-        PyObject *item = PySequence_Fast_GET_ITEM(seq, i);
-        if (!PyTuple_Check(item) || PyTuple_GET_SIZE(item) != 6) {
-            Py_DECREF(seq);
-            release_locations(kept);
-            PyErr_SetString(PyExc_TypeError, "candidate entries must be 6-tuples");
-            return NULL;
+        if (distances[i] < 0.0 || distances[i] > radius) {
+            continue;
         }
+        results[kept].index = i;
+        results[kept].distance = distances[i];
+        kept++;
+    }
 
-        PyObject *lat_obj = PyTuple_GET_ITEM(item, 0);
-        PyObject *lng_obj = PyTuple_GET_ITEM(item, 1);
-        PyObject *count_obj = PyTuple_GET_ITEM(item, 2);
-        PyObject *avg_obj = PyTuple_GET_ITEM(item, 3);
-        PyObject *types_obj = PyTuple_GET_ITEM(item, 4);
-        PyObject *location_obj = PyTuple_GET_ITEM(item, 5);
-
-        double lat = PyFloat_AsDouble(lat_obj);
-        double lng = PyFloat_AsDouble(lng_obj);
-        long violation_count = PyLong_AsLong(count_obj);
-        double avg_fine = PyFloat_AsDouble(avg_obj);
-        long violation_types = PyLong_AsLong(types_obj);
-
-        if (PyErr_Occurred()) {
-            Py_DECREF(seq);
-            release_locations(kept);
-            return NULL;
-        }
+    if (kept == 0) {
+        return 0;
+    }
 
-        double distance = haversine_miles(user_lat, user_lng, lat, lng);
-        if (distance > radius) {
-            continue;
+    double min_count = counts[results[0].index];
+    double max_count = min_count;
+    double max_expected_fine = 0.0;
+    double max_likelihood = 0.0;
+    for (Py_ssize_t k = 0; k < kept; ++k) {
+        Py_ssize_t i = results[k].index;
+        double expected_fine = counts[i] * fines[i];
+        if (counts[i] < min_count) {
+            min_count = counts[i];
+        }
+        if (counts[i] > max_count) {
+            max_count = counts[i];
         }
+        if (expected_fine > max_expected_fine) {
+            max_expected_fine = expected_fine;
+        }
+        if (likelihoods[i] > max_likelihood) {
+            max_likelihood = likelihoods[i];
+        }
+    }
 
-        nearest_result_t *slot = &results[kept];
-        slot->lat = lat;
-        slot->lng = lng;
-        slot->distance = distance;
-        slot->avg_fine = avg_fine;
-        slot->violation_count = violation_count;
-        slot->violation_types = violation_types;
-
-        if (PyUnicode_Check(location_obj)) {
-            Py_INCREF(location_obj);
-            slot->location = location_obj;
-        } else {
-            slot->location = NULL;
+    double count_span = max_count - min_count;
+    if (count_span < 1e-9) {
+        count_span = 1.0;
+    }
+    double weight_total = count_weight + fine_weight + time_weight;
+
+    for (Py_ssize_t k = 0; k < kept; ++k) {
+        Py_ssize_t i = results[k].index;
+        double risk = 0.0;
+        if (weight_total > 0.0) {
+            double count_component = (counts[i] - min_count) / count_span;
+            double fine_component = max_expected_fine > 0.0 ? (counts[i] * fines[i]) / max_expected_fine : 0.0;
+            double time_component = max_likelihood > 0.0 ? likelihoods[i] / max_likelihood : 0.0;
+            risk = (count_weight * count_component + fine_weight * fine_component + time_weight * time_component) / weight_total;
         }
+        results[k].risk_score = risk;
+        results[k].rank_score = risk + distance_weight * (1.0 - exp(-results[k].distance / distance_decay));
+    }
 
-        kept++;
+    qsort(results, kept, sizeof(scored_result_t), compare_scored);
+    return kept;
+}
+
+/*
+ * Filter and rank columnar candidates by a weighted risk score.
+ *
+ * Every column is a float64 buffer with one entry per candidate; positions
+ * are given as latitude/longitude in radians plus cos(latitude), which the
+ * caller computes once per dataset rather than once per request.  The risk
+ * score blends three components normalised within the radius:
+ *   count  - (count - min) / (max - min)
+ *   fine   - expected fine (count * avg_fine) relative to the largest one
+ *   time   - share of the location's tickets in the requested day/hour window,
+ *            relative to the largest share
+ * and the ranking score adds a distance penalty 1 - exp(-distance / decay).
+ * Returns (index, distance, risk_score, rank_score) tuples for the best
+ * `limit` candidates, ordered by rank_score then distance.
+ */
+static PyObject *score_rank(PyObject *self, PyObject *args) {
+    double user_lat, user_lng, radius;
+    Py_ssize_t limit;
+    PyObject *lat_rad_obj, *lng_rad_obj, *cos_lat_obj, *counts_obj, *fines_obj, *likelihood_obj;
+    double weights[5];
+
+    if (!PyArg_ParseTuple(args, "dddnOOOOOO(ddddd)", &user_lat, &user_lng, &radius, &limit,
+                          &lat_rad_obj, &lng_rad_obj, &cos_lat_obj, &counts_obj, &fines_obj, &likelihood_obj,
+                          &weights[0], &weights[1], &weights[2], &weights[3], &weights[4])) {
+        return NULL;
     }
 
-    Py_DECREF(seq);
-    if (kept == 0) {
-        release_locations(kept);
-        return PyList_New(0);
+    if (limit < 1) {
+        limit = 1;
+    }
+    if (weights[4] <= 0.0) {
+        weights[4] = 0.25;
     }
 
-    long min_count = results[0].violation_count;
-    long max_count = results[0].violation_count;
-    for (Py_ssize_t i = 1; i < kept; ++i) {
-        if (results[i].violation_count < min_count) {
-            min_count = results[i].violation_count;
+    Py_buffer views[6];
+    PyObject *columns[6] = {lat_rad_obj, lng_rad_obj, cos_lat_obj, counts_obj, fines_obj, likelihood_obj};
+    const char *names[6] = {"lat_rad", "lng_rad", "cos_lat", "counts", "fines", "likelihoods"};
+    Py_ssize_t candidate_count = -1;
+    int acquired = 0;
+    for (; acquired < 6; ++acquired) {
+        if (get_double_column(columns[acquired], &views[acquired], candidate_count, names[acquired]) != 0) {
+            break;
         }
-        if (results[i].violation_count > max_count) {
-            max_count = results[i].violation_count;
+        candidate_count = views[acquired].len / (Py_ssize_t)sizeof(double);
+    }
+    if (acquired < 6) {
+        for (int i = 0; i < acquired; ++i) {
+            PyBuffer_Release(&views[i]);
         }
+        return NULL;
     }
 
-    double span = (double)(max_count - min_count);
-    if (span < 1e-9) {
-        span = 1.0;
+    PyObject *out_list = NULL;
+    scratch_arena_t *arena = acquire_arena();
+    if (!arena) {
+        PyErr_NoMemory();
+        goto release_views;
     }
 
-    for (Py_ssize_t i = 0; i < kept; ++i) {
-        results[i].risk_score = (results[i].violation_count - min_count) / span;
+    Py_ssize_t needed = candidate_count > 0 ? candidate_count : 1;
+    if (grow_buffer(arena, (void **)&arena->scored, &arena->scored_capacity, needed, sizeof(scored_result_t)) != 0 ||
+        grow_buffer(arena, (void **)&arena->distances, &arena->distances_capacity, needed, sizeof(double)) != 0) {
+        PyErr_NoMemory();
+        goto done;
     }
 
-    qsort(results, kept, sizeof(nearest_result_t), compare_results);
-    Py_ssize_t final_count = kept < limit ? kept : limit;
+    Py_ssize_t kept;
+    Py_BEGIN_ALLOW_THREADS
+    kept = score_candidates(arena, candidate_count,
+                            (const double *)views[0].buf, (const double *)views[1].buf, (const double *)views[2].buf,
+                            (const double *)views[3].buf, (const double *)views[4].buf, (const double *)views[5].buf,
+                            user_lat, user_lng, radius, weights);
+    Py_END_ALLOW_THREADS
 
-    PyObject *out_list = PyList_New(final_count);
+    Py_ssize_t final_count = kept < limit ? kept : limit;
+    out_list = PyList_New(final_count);
     if (!out_list) {
-        release_locations(kept);
-        return NULL;
+        goto done;
     }
-
-    for (Py_ssize_t i = 0; i < final_count; ++i) {
-        PyObject *entry = build_python_result(&results[i]);
+    for (Py_ssize_t k = 0; k < final_count; ++k) {
+        const scored_result_t *result = &arena->scored[k];
+        PyObject *entry = Py_BuildValue("(nddd)", result->index, result->distance,
+                                        result->risk_score, result->rank_score);
         if (!entry) {
-            Py_DECREF(out_list);
-            release_locations(kept);
-            return NULL;
+            Py_CLEAR(out_list);
+            goto done;
         }
-        PyList_SET_ITEM(out_list, i, entry);
+        PyList_SET_ITEM(out_list, k, entry);
     }
 
-    release_locations(kept);
+done:
+    release_arena(arena);
+release_views:
+    for (int i = 0; i < 6; ++i) {
+        PyBuffer_Release(&views[i]);
+    }
     return out_list;
 }
 
@@ -267,15 +451,78 @@ static PyObject *get_hot_path_stats(PyObject *self, PyObject *Py_UNUSED(args)) {
         return NULL;
     }
 
-    PyDict_SetItemString(stats, "allocations_last_call", PyLong_FromLong(hot_path_allocs_last));
-    PyDict_SetItemString(stats, "total_reallocations", PyLong_FromLong(hot_path_allocs_total));
-    PyDict_SetItemString(stats, "buffer_capacity", PyLong_FromSsize_t(result_capacity));
+    Py_ssize_t scored_capacity = 0;
+    Py_ssize_t distances_capacity = 0;
+    Py_ssize_t idle_arenas = 0;
+    size_t buffer_bytes = 0;
+    Py_ssize_t arenas;
+    long total_allocations;
+    long shrinks;
+    size_t released_bytes;
+
+    PyThread_acquire_lock(arena_lock, WAIT_LOCK);
+    for (scratch_arena_t *arena = all_arenas; arena; arena = arena->next_all) {
+        scored_capacity += arena->scored_capacity;
+        distances_capacity += arena->distances_capacity;
+        buffer_bytes += arena_bytes(arena);
+    }
+    for (scratch_arena_t *arena = free_arenas; arena; arena = arena->next_free) {
+        idle_arenas++;
+    }
+    arenas = arena_count;
+    total_allocations = hot_path_allocs_total;
+    shrinks = shrink_total;
+    released_bytes = released_bytes_total;
+    PyThread_release_lock(arena_lock);
+
+    long last_call = (long)(intptr_t)PyThread_tss_get(&last_call_allocs_key);
+
+    PyDict_SetItemString(stats, "allocations_last_call", PyLong_FromLong(last_call));
+    PyDict_SetItemString(stats, "total_reallocations", PyLong_FromLong(total_allocations));
+    PyDict_SetItemString(stats, "scored_buffer_capacity", PyLong_FromSsize_t(scored_capacity));
+    PyDict_SetItemString(stats, "distance_buffer_capacity", PyLong_FromSsize_t(distances_capacity));
+    PyDict_SetItemString(stats, "arena_count", PyLong_FromSsize_t(arenas));
+    PyDict_SetItemString(stats, "idle_arenas", PyLong_FromSsize_t(idle_arenas));
+    PyDict_SetItemString(stats, "buffer_bytes", PyLong_FromSize_t(buffer_bytes));
+    PyDict_SetItemString(stats, "shrinks", PyLong_FromLong(shrinks));
+    PyDict_SetItemString(stats, "released_bytes", PyLong_FromSize_t(released_bytes));
+#ifdef _OPENMP
+    PyDict_SetItemString(stats, "openmp_threads", PyLong_FromLong(omp_get_max_threads()));
+#else
+    PyDict_SetItemString(stats, "openmp_threads", PyLong_FromLong(0));
+#endif
+    PyDict_SetItemString(stats, "parallel_min_candidates", PyLong_FromLong(PARALLEL_MIN_CANDIDATES));
     return stats;
 }
 
+/* Free the buffers of every idle arena; arenas in use are left alone.  Returns the bytes released. */
+static PyObject *trim_buffers(PyObject *self, PyObject *Py_UNUSED(args)) {
+    size_t released = 0;
+
+    PyThread_acquire_lock(arena_lock, WAIT_LOCK);
+    for (scratch_arena_t *arena = free_arenas; arena; arena = arena->next_free) {
+        released += arena_bytes(arena);
+        PyMem_RawFree(arena->scored);
+        PyMem_RawFree(arena->distances);
+        arena->scored = NULL;
+        arena->distances = NULL;
+        arena->scored_capacity = 0;
+        arena->distances_capacity = 0;
+        arena->small_calls = 0;
+    }
+    if (released) {
+        shrink_total += 1;
+        released_bytes_total += released;
+    }
+    PyThread_release_lock(arena_lock);
+
+    return PyLong_FromSize_t(released);
+}
+
 static PyMethodDef module_methods[] = {
-    {"filter_rank", filter_rank, METH_VARARGS, "Filter and rank nearest parking violations."},
-    {"hot_path_stats", (PyCFunction)get_hot_path_stats, METH_NOARGS, "Get allocation stats for the native hot path."},
+    {"score_rank", score_rank, METH_VARARGS, "Filter and rank columnar candidates with weighted, time-aware risk scores."},
+    {"hot_path_stats", (PyCFunction)get_hot_path_stats, METH_NOARGS, "Get allocation stats for the native hot path (last-call count is per thread)."},
+    {"trim_buffers", (PyCFunction)trim_buffers, METH_NOARGS, "Free the scratch buffers of idle arenas and return the number of bytes released."},
     {NULL, NULL, 0, NULL}
 };
 
@@ -288,5 +535,14 @@ static struct PyModuleDef module_definition = {
 };
 
 PyMODINIT_FUNC PyInit_c_nearest(void) {
+    if (!arena_lock) {
+        arena_lock = PyThread_allocate_lock();
+        if (!arena_lock) {
+            return PyErr_NoMemory();
+        }
+    }
+    if (!PyThread_tss_is_created(&last_call_allocs_key) && PyThread_tss_create(&last_call_allocs_key) != 0) {
+        return PyErr_NoMemory();
+    }
     return PyModule_Create(&module_definition);
 }
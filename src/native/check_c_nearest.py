@@ -0,0 +1,76 @@
+"""Check c_nearest.score_rank's radius filter against a pure-Python haversine.
+
+    python setup.py build_ext --inplace && python check_c_nearest.py
+
+Candidates are placed just inside (0.995 x radius) and just outside
+(1.005 x radius) the search circle in 360 directions around a few Chicago
+points, at radii down to a few feet.  The native kernel must keep exactly
+the candidates the haversine keeps; the single-precision prefilter must not
+drop any of them.  Exits with status 1 on any mismatch.
+"""
+import math
+import sys
+
+import numpy as np
+
+import c_nearest
+
+EARTH_RADIUS_MILES = 3959.0
+RADII_MILES = (0.001, 0.002, 0.005, 0.01, 0.1, 1.0, 25.0, 100.0)
+CENTERS = ((41.8781, -87.6298), (42.0190, -87.6727), (41.6445, -87.5400))
+DIRECTIONS = 360
+
+
+def destination(lat, lng, bearing, distance):
+    """(lat, lng) in degrees reached from lat/lng along bearing (radians) after distance miles."""
+    lat_rad, lng_rad = math.radians(lat), math.radians(lng)
+    angle = distance / EARTH_RADIUS_MILES
+    dest_lat = math.asin(math.sin(lat_rad) * math.cos(angle) + math.cos(lat_rad) * math.sin(angle) * math.cos(bearing))
+    dest_lng = lng_rad + math.atan2(
+        math.sin(bearing) * math.sin(angle) * math.cos(lat_rad),
+        math.cos(angle) - math.sin(lat_rad) * math.sin(dest_lat)
+    )
+    return math.degrees(dest_lat), math.degrees(dest_lng)
+
+
+def haversine_miles(user_lat, user_lng, lat_rad, lng_rad, cos_lat):
+    user_lat_rad = math.radians(user_lat)
+    sin_dlat = np.sin((lat_rad - user_lat_rad) * 0.5)
+    sin_dlng = np.sin((lng_rad - math.radians(user_lng)) * 0.5)
+    a = sin_dlat * sin_dlat + math.cos(user_lat_rad) * cos_lat * sin_dlng * sin_dlng
+    return EARTH_RADIUS_MILES * 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def main():
+    failures = 0
+    for radius in RADII_MILES:
+        checked = 0
+        mismatched = 0
+        for user_lat, user_lng in CENTERS:
+            points = [
+                destination(user_lat, user_lng, 2 * math.pi * step / DIRECTIONS, radius * scale)
+                for step in range(DIRECTIONS)
+                for scale in (0.995, 1.005)
+            ]
+            lat_rad = np.radians([lat for lat, _ in points])
+            lng_rad = np.radians([lng for _, lng in points])
+            cos_lat = np.cos(lat_rad)
+            ones = np.ones(len(points))
+
+            ranked = c_nearest.score_rank(
+                user_lat, user_lng, radius, len(points),
+                lat_rad, lng_rad, cos_lat, ones, ones, ones, (1.0, 0.0, 0.0, 0.0, 0.25)
+            )
+            native = {index for index, _, _, _ in ranked}
+            expected = set(np.flatnonzero(haversine_miles(user_lat, user_lng, lat_rad, lng_rad, cos_lat) <= radius).tolist())
+            checked += len(expected)
+            mismatched += len(native ^ expected)
+
+        status = 'ok' if not mismatched else 'FAIL'
+        print(f"radius {radius:g} mi: {checked} in radius, {mismatched} mismatched ... {status}")
+        failures += mismatched
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
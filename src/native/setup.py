@@ -1,17 +1,63 @@
 import os
+import shutil
+import tempfile
+
 from setuptools import Extension, setup
+from setuptools.command.build_ext import build_ext
+
+# Opt-in, e.g. PARKWISE_NATIVE_ARCH=native, for builds that only run on the build machine.
+native_arch = os.environ.get("PARKWISE_NATIVE_ARCH")
+
+
+def compiler_accepts(compiler, compile_args, link_args):
+    """Return True if a tiny OpenMP program compiles and links with the given flags."""
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        source = os.path.join(tmp_dir, "openmp_check.c")
+        with open(source, "w") as fp:
+            fp.write("#include <omp.h>\nint main(void) { return omp_get_max_threads() > 0 ? 0 : 1; }\n")
+        objects = compiler.compile([source], output_dir=tmp_dir, extra_postargs=compile_args)
+        compiler.link_executable(objects, "openmp_check", output_dir=tmp_dir, extra_postargs=link_args)
+        return True
+    except Exception:
+        return False
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+class BuildExt(build_ext):
+    """Pick optimisation flags per compiler and enable OpenMP only where it works."""
+
+    def build_extensions(self):
+        if self.compiler.compiler_type == "msvc":
+            compile_args = ["/O2", "/fp:precise"]
+            openmp_compile, openmp_link = ["/openmp"], []
+        else:
+            # -fno-math-errno lets sqrt/sin vectorize without changing results.
+            compile_args = ["-O3", "-fno-math-errno"]
+            if native_arch:
+                compile_args.append(f"-march={native_arch}")
+            openmp_compile, openmp_link = ["-fopenmp"], ["-fopenmp"]
+
+        use_openmp = compiler_accepts(self.compiler, openmp_compile, openmp_link)
+        print(f"c_nearest: OpenMP {'enabled' if use_openmp else 'not available, building single-threaded'}")
+
+        for ext in self.extensions:
+            ext.extra_compile_args = compile_args + (openmp_compile if use_openmp else [])
+            ext.extra_link_args = openmp_link if use_openmp else []
+
+        super().build_extensions()
 
-extra_args = ["/O2"] if os.name == "nt" else ["-O3"]
 
 module = Extension(
     "c_nearest",
-    sources=["c_nearest.c"],
-    extra_compile_args=extra_args
+    sources=["c_nearest.c"]
 )
 
 setup(
     name="c_nearest",
     version="0.1.0",
     description="Native helpers for ParkWise nearest-violation queries",
-    ext_modules=[module]
+    ext_modules=[module],
+    cmdclass={"build_ext": BuildExt}
 )
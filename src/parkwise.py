@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+"""ParkWise command line.
+
+    python parkwise.py build [--data-dir DIR] [--workers N] [--partitions PKL] [--force]
+
+``build`` produces every serving artifact from the source data so the server
+starts warm instead of querying and geocoding on first use:
+
+* the time partitions snapshot (heatmap_time_partitions.pkl),
+* geocoded coordinates for every location (locations.pkl),
+* the per-location and citywide trend series (trends.npz),
+* the overall aggregate and all 7 x 24 weekday/hour slices, plus the 7
+  weekday-only and 24 hour-only slices, each as an aggregate frame, a
+  pre-serialized JSON payload and a pickled RiskQuadtree,
+* a statistics snapshot (statistics.json),
+
+then writes build_manifest.json, which the server loads at startup.
+
+Slices are computed from the partitions snapshot in a process pool.  Each
+artifact's input hash covers only the partition rows it reads, so after new
+tickets arrive only the weekday/hour slices they fall into are rebuilt.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import artifacts
+import queries
+import trends
+from spatial_index import RiskQuadtree
+from time_partitions import PARTITION_COLUMNS, PARTITION_QUERY, TimePartitionIndex
+
+# Part of every input hash; bump when the way an artifact is computed changes.
+BUILD_VERSION = 3
+SLICE_DIR = 'slices'
+LOCATIONS_PATH = 'locations.pkl'
+TRENDS_PATH = 'trends.npz'
+STATISTICS_PATH = 'statistics.json'
+
+_worker_index = None
+_worker_data_dir = None
+
+
+def _slot_digests(partitions):
+    """SHA-256 per weekday*24 + hour slot over that slot's partition rows, independent of row order."""
+    day_number = pd.to_numeric(partitions['day_number'], errors='coerce')
+    hour = pd.to_numeric(partitions['hour'], errors='coerce')
+    valid = (day_number.notna() & hour.notna()).to_numpy()
+    row_hashes = pd.util.hash_pandas_object(partitions[PARTITION_COLUMNS], index=False).to_numpy()[valid]
+    slots = (day_number.to_numpy()[valid].astype(np.int64) % 7) * 24 + hour.to_numpy()[valid].astype(np.int64)
+
+    order = np.lexsort((row_hashes, slots))
+    row_hashes = row_hashes[order]
+    bounds = np.searchsorted(slots[order], np.arange(7 * 24 + 1))
+    return [
+        artifacts.digest(row_hashes[bounds[slot]:bounds[slot + 1]].tobytes().hex())
+        for slot in range(7 * 24)
+    ]
+
+
+def _heatmap_plan(slot_digests, weekday_names, slice_limit, overall_limit, thinning):
+    """(name, weekday, hour, limit, input_hash) for the overall summary and every single day/hour slice.
+
+    thinning is the payload thinning configuration, which the stored payloads depend on.
+    """
+    days = [None] + list(range(7))
+    hours = [None] + list(range(24))
+    plan = []
+    for weekday in days:
+        for hour in hours:
+            slots = [
+                day * 24 + hour_value
+                for day in (range(7) if weekday is None else [weekday])
+                for hour_value in (range(24) if hour is None else [hour])
+            ]
+            limit = overall_limit if weekday is None and hour is None else slice_limit
+            name = artifacts.heatmap_artifact_name(None if weekday is None else weekday_names[weekday], hour)
+            input_hash = artifacts.digest(BUILD_VERSION, name, limit, *thinning, *(slot_digests[slot] for slot in slots))
+            plan.append((name, weekday, hour, limit, input_hash))
+    return plan
+
+
+def _heatmap_paths(name, overall_path, payload_path):
+    if name == artifacts.heatmap_artifact_name(None, None):
+        # The overall aggregate keeps the paths the server has always read.
+        return overall_path, payload_path, 'overall.quadtree.pkl'
+    _, day, hour = name.split('/')
+    stem = f"{SLICE_DIR}/{day.lower()}-{hour}"
+    return f"{stem}.frame.pkl", f"{stem}.payload.json", f"{stem}.quadtree.pkl"
+
+
+def _init_worker(partitions_path, data_dir):
+    global _worker_index, _worker_data_dir
+    import app
+    _worker_index = TimePartitionIndex(pd.read_pickle(partitions_path), app._location_dictionary)
+    _worker_data_dir = Path(data_dir)
+
+
+def _build_heatmap_artifacts(specs):
+    """Worker task: aggregate, serialize and index a group of slices from the partitions snapshot."""
+    import app
+    thinning = [app.HEATMAP_MAX_POINTS, app.HEATMAP_COVERAGE]
+    results = []
+    for name, weekday, hour, limit, input_hash in specs:
+        frame = _worker_index.aggregate(
+            weekdays=None if weekday is None else [weekday],
+            hours=None if hour is None else [hour],
+            limit=limit
+        )
+        # A capped overall frame is the 'summary' the server prefers when a cap is configured.
+        overall_path = app.HEATMAP_SUMMARY_PATH if app.HEATMAP_DB_LIMIT is not None else app.HEATMAP_OVERALL_PATH
+        frame_path, payload_path, quadtree_path = _heatmap_paths(
+            name, overall_path.name, app.HEATMAP_OVERALL_PAYLOAD_PATH.name
+        )
+
+        # IDs are only stable per process, so the frame is stored with location strings.
+        stored = frame.drop(columns=['location_id'])
+        stored.insert(0, 'violation_location', app._location_dictionary.labels(frame['location_id']))
+        payload = app.build_heatmap_payload(app.thin_heatmap_frame(frame), app._heatmap_max_count(frame))
+        columns = app._candidate_columns(frame)
+        tree = RiskQuadtree(columns['lat'], columns['lng'], columns['count'], columns['avg_fine'])
+
+        def write_payload(temp_path):
+            with open(temp_path, 'w', encoding='utf-8') as fp:
+                json.dump(payload, fp, separators=(',', ':'), sort_keys=True)
+
+        results.append((name, {
+            'kind': 'heatmap',
+            'inputHash': input_hash,
+            'rows': len(frame),
+            'records': len(payload),
+            # The server serves the frame and payload only while its own row limit
+            # and thinning match.
+            'limit': limit,
+            'thinning': thinning,
+            'files': {
+                'frame': artifacts.write_file(_worker_data_dir, frame_path, stored.to_pickle),
+                'payload': artifacts.write_file(_worker_data_dir, payload_path, write_payload),
+                'quadtree': artifacts.write_file(_worker_data_dir, quadtree_path, lambda temp_path: pd.to_pickle(tree, temp_path))
+            }
+        }))
+    return results
+
+
+def _build_location_artifact(input_hash):
+    """Worker task: geocode every location in the partitions snapshot."""
+    import app
+    location_ids = np.unique(_worker_index.location_id)
+    coords = app.geocode_location_ids(location_ids)
+    frame = pd.DataFrame({
+        'violation_location': app._location_dictionary.labels(location_ids),
+        'lat': coords[:, 0],
+        'lng': coords[:, 1]
+    })
+    return [('locations', {
+        'kind': 'locations',
+        'inputHash': input_hash,
+        'rows': len(frame),
+        'files': {'coordinates': artifacts.write_file(_worker_data_dir, LOCATIONS_PATH, frame.to_pickle)}
+    })]
+
+
+def _build_trend_artifact(input_hash):
+    """Worker task: condense the partitions snapshot into the trend series."""
+    import app
+    trend_index = trends.TrendIndex.from_partitions(_worker_index)
+    return [('trends', {
+        'kind': 'trends',
+        'inputHash': input_hash,
+        'rows': len(trend_index),
+        'files': {
+            'series': artifacts.write_file(
+                _worker_data_dir, TRENDS_PATH,
+                lambda temp_path: trend_index.save(temp_path, app._location_dictionary)
+            )
+        }
+    })]
+
+
+def _read_partitions(app, partitions_path):
+    if partitions_path is not None:
+        return pd.read_pickle(partitions_path)
+    conn = app.get_db_connection()
+    try:
+        return queries.read_sql(conn, 'time_partitions', PARTITION_QUERY)
+    finally:
+        conn.close()
+
+
+def _build_statistics(app, data_dir, previous_entry):
+    """Query the statistics snapshot; its input hash is the hash of the results themselves."""
+    conn = app.get_db_connection()
+    try:
+        stats = app.query_statistics(conn)
+    finally:
+        conn.close()
+
+    body = json.dumps(stats, sort_keys=True)
+    input_hash = artifacts.digest(BUILD_VERSION, 'statistics', body)
+    if previous_entry is not None and previous_entry.get('inputHash') == input_hash and artifacts.files_present(data_dir, previous_entry):
+        return previous_entry, False
+
+    def writer(temp_path):
+        with open(temp_path, 'w', encoding='utf-8') as fp:
+            fp.write(body)
+
+    return {
+        'kind': 'statistics',
+        'inputHash': input_hash,
+        'files': {'snapshot': artifacts.write_file(data_dir, STATISTICS_PATH, writer)}
+    }, True
+
+
+def build(data_dir=None, workers=None, partitions_path=None, force=False, statistics=True):
+    """Build every serving artifact into data_dir and write its manifest.  Returns the manifest."""
+    import app
+
+    start = time.perf_counter()
+    data_dir = Path(data_dir or app.DATA_DIR)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    previous = None if force else artifacts.load_manifest(data_dir)
+    previous_artifacts = previous['artifacts'] if previous else {}
+
+    def unchanged(name, input_hash):
+        entry = previous_artifacts.get(name)
+        return entry is not None and entry.get('inputHash') == input_hash and artifacts.files_present(data_dir, entry)
+
+    partitions = _read_partitions(app, partitions_path)
+    slot_digests = _slot_digests(partitions)
+    source_hash = artifacts.digest(*slot_digests)
+    print(f"[DEBUG] build: {len(partitions)} partition rows, source {source_hash[:12]}")
+
+    manifest_artifacts = {}
+    built = 0
+
+    # First/last day let the server resolve window= without loading the partitions.
+    day_number = pd.to_numeric(partitions['day_number'], errors='coerce').dropna()
+    partition_days = [int(day_number.min()), int(day_number.max())] if len(day_number) else None
+    partitions_hash = artifacts.digest(BUILD_VERSION, 'partitions', source_hash)
+    if unchanged('partitions', partitions_hash):
+        manifest_artifacts['partitions'] = dict(previous_artifacts['partitions'], days=partition_days)
+    else:
+        manifest_artifacts['partitions'] = {
+            'kind': 'partitions',
+            'inputHash': partitions_hash,
+            'rows': len(partitions),
+            'days': partition_days,
+            'files': {'partitions': artifacts.write_file(data_dir, app.HEATMAP_PARTITIONS_PATH.name, partitions.to_pickle)}
+        }
+        built += 1
+    partitions_file = data_dir / manifest_artifacts['partitions']['files']['partitions']['path']
+    del partitions
+
+    # One task per weekday (and one for the 'all days' row) keeps tasks even and
+    # lets each worker aggregate from its own copy of the index.
+    tasks = []
+    pending_slices = {}
+    thinning = (app.HEATMAP_MAX_POINTS, app.HEATMAP_COVERAGE)
+    for spec in _heatmap_plan(slot_digests, app.WEEKDAY_NAMES, app.HEATMAP_QUERY_RESULT_LIMIT, app.HEATMAP_DB_LIMIT, thinning):
+        name, weekday, _, _, input_hash = spec
+        if unchanged(name, input_hash):
+            manifest_artifacts[name] = previous_artifacts[name]
+        else:
+            pending_slices.setdefault(weekday, []).append(spec)
+    tasks.extend((_build_heatmap_artifacts, specs) for specs in pending_slices.values())
+
+    locations_hash = artifacts.digest(BUILD_VERSION, 'locations', source_hash)
+    if unchanged('locations', locations_hash):
+        manifest_artifacts['locations'] = previous_artifacts['locations']
+    else:
+        tasks.append((_build_location_artifact, locations_hash))
+
+    trends_hash = artifacts.digest(BUILD_VERSION, 'trends', source_hash, trends.FORECAST_RECENT_WEEKS)
+    if unchanged('trends', trends_hash):
+        manifest_artifacts['trends'] = previous_artifacts['trends']
+    else:
+        tasks.append((_build_trend_artifact, trends_hash))
+
+    if tasks:
+        workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(str(partitions_file), str(data_dir))) as pool:
+            futures = [pool.submit(task, argument) for task, argument in tasks]
+            for future in as_completed(futures):
+                for name, entry in future.result():
+                    manifest_artifacts[name] = entry
+                    built += 1
+
+    if statistics:
+        try:
+            entry, rebuilt = _build_statistics(app, data_dir, previous_artifacts.get('statistics'))
+            manifest_artifacts['statistics'] = entry
+            built += rebuilt
+        except Exception as stats_err:
+            print(f"[WARN] Statistics snapshot not built: {stats_err}")
+            if 'statistics' in previous_artifacts:
+                manifest_artifacts['statistics'] = previous_artifacts['statistics']
+
+    manifest = {
+        'version': artifacts.MANIFEST_VERSION,
+        'builtAt': datetime.utcnow().isoformat() + 'Z',
+        'source': {'sha256': source_hash},
+        'artifacts': manifest_artifacts
+    }
+    manifest_path = artifacts.write_manifest(data_dir, manifest)
+    skipped = len(manifest_artifacts) - built
+    print(f"Built {built} artifacts, skipped {skipped} unchanged, in {time.perf_counter() - start:.1f}s -> {manifest_path}")
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='parkwise', description='ParkWise command line.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = commands.add_parser('build', help='Precompute every serving artifact and write the build manifest.')
+    build_parser.add_argument('--data-dir', help='Output directory (default: PARKWISE_DATA_DIR or src/data)')
+    build_parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    build_parser.add_argument('--partitions', help='Build from a time partitions pickle instead of querying the database')
+    build_parser.add_argument('--force', action='store_true', help='Rebuild every artifact even if its inputs are unchanged')
+    build_parser.add_argument('--no-statistics', dest='statistics', action='store_false',
+                              help='Skip the statistics snapshot (it needs a database connection)')
+
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        build(args.data_dir, args.workers, args.partitions, args.force, args.statistics)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,285 @@
+"""On-demand sampling profiler for the Flask app.
+
+Nothing runs until a capture is started: a daemon thread then walks
+``sys._current_frames()`` every few milliseconds and folds each stack into a
+counter, so request threads pay no per-call tracing cost.  A capture either
+runs for a fixed number of seconds or follows the next K requests whose path
+starts with a route prefix.
+
+Native extension calls are invisible to frame walking, so callers wrap them
+in ``native_section(label)``; samples taken inside get a ``[native] label``
+leaf frame.  Results are exported as collapsed stacks (flamegraph.pl,
+speedscope, inferno) or as a speedscope JSON document.
+"""
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+MIN_INTERVAL_SECONDS = 0.001
+MAX_INTERVAL_SECONDS = 0.1
+MAX_CAPTURE_SECONDS = 300
+COMPLETED_CAPTURE_LIMIT = 8
+SCOPES = ('requests', 'all')
+
+
+class ProfilerBusyError(RuntimeError):
+    pass
+
+
+class Capture:
+    def __init__(self, capture_id, seconds, route, request_limit, interval, scope):
+        self.id = capture_id
+        self.seconds = seconds
+        self.route = route
+        self.request_limit = request_limit
+        self.interval = interval
+        self.scope = scope
+        self.started = time.time()
+        self.ended = None
+        self.deadline = time.perf_counter() + seconds
+        self.requests_seen = 0
+        self.sample_count = 0
+        # stack tuple (root first) -> [sample count, seconds]
+        self.stacks = {}
+        self.done = threading.Event()
+        # Guards stacks/sample_count; done is only set while holding it, so no
+        # sample lands after a capture finishes.
+        self.lock = threading.Lock()
+
+    def snapshot(self):
+        """Copy of stacks that exporters can iterate while sampling continues."""
+        with self.lock:
+            return {stack: list(totals) for stack, totals in self.stacks.items()}
+
+    @property
+    def state(self):
+        return 'complete' if self.done.is_set() else 'running'
+
+    def describe(self):
+        return {
+            'id': self.id,
+            'state': self.state,
+            'seconds': self.seconds,
+            'route': self.route,
+            'requests': self.request_limit,
+            'requestsSeen': self.requests_seen,
+            'intervalMs': round(self.interval * 1000, 3),
+            'scope': self.scope,
+            'samples': self.sample_count,
+            'startedAt': self.started,
+            'endedAt': self.ended
+        }
+
+
+def _frame_label(frame_key):
+    name, filename, line = frame_key
+    if not filename:
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+class SamplingProfiler:
+    """Process-wide profiler; at most one capture runs at a time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._capture = None
+        self._completed = OrderedDict()
+        self._ids = itertools.count(1)
+        # thread id -> request label, only maintained while a capture runs
+        self._request_threads = {}
+        self._native_sections = {}
+
+    @property
+    def active(self):
+        return self._capture is not None
+
+    def start(self, seconds=None, route=None, request_limit=None, interval=0.005, scope='requests'):
+        """Begin a capture for `seconds`, or for the next `request_limit` requests under `route`.
+
+        In route mode `seconds` is the longest the capture waits for those
+        requests.  Raises ValueError for bad arguments and ProfilerBusyError
+        if a capture is already running.
+        """
+        if scope not in SCOPES:
+            raise ValueError(f"scope must be one of: {', '.join(SCOPES)}")
+        if route is not None and (request_limit is None or request_limit < 1):
+            raise ValueError('requests must be a positive integer when route is given')
+        if route is None and request_limit is not None:
+            raise ValueError('route is required when requests is given')
+        if route is None and seconds is None:
+            raise ValueError('either seconds or route and requests is required')
+        seconds = MAX_CAPTURE_SECONDS if seconds is None else seconds
+        if not 0 < seconds <= MAX_CAPTURE_SECONDS:
+            raise ValueError(f"seconds must be between 0 and {MAX_CAPTURE_SECONDS}")
+        interval = min(max(interval, MIN_INTERVAL_SECONDS), MAX_INTERVAL_SECONDS)
+
+        with self._lock:
+            if self._capture is not None:
+                raise ProfilerBusyError(f"capture {self._capture.id} is still running")
+            capture = Capture(next(self._ids), seconds, route, request_limit, interval, scope)
+            self._capture = capture
+
+        threading.Thread(target=self._sample_loop, args=(capture,), name='profiler-sampler', daemon=True).start()
+        return capture
+
+    def stop(self):
+        capture = self._capture
+        if capture is not None:
+            self._finish(capture)
+        return capture
+
+    def get(self, capture_id):
+        with self._lock:
+            if self._capture is not None and self._capture.id == capture_id:
+                return self._capture
+            return self._completed.get(capture_id)
+
+    def request_started(self, method, path):
+        capture = self._capture
+        if capture is None:
+            return
+        if capture.route is not None and not path.startswith(capture.route):
+            return
+        self._request_threads[threading.get_ident()] = f"{method} {path}"
+
+    def request_finished(self):
+        if self._request_threads.pop(threading.get_ident(), None) is None:
+            return
+        capture = self._capture
+        if capture is None or capture.route is None:
+            return
+        with self._lock:
+            capture.requests_seen += 1
+            finished = capture.requests_seen >= capture.request_limit
+        if finished:
+            self._finish(capture)
+
+    @contextmanager
+    def native_section(self, label):
+        """Mark the current thread as inside native code for the duration of the block."""
+        if self._capture is None:
+            yield
+            return
+        thread_id = threading.get_ident()
+        self._native_sections[thread_id] = label
+        try:
+            yield
+        finally:
+            self._native_sections.pop(thread_id, None)
+
+    def _finish(self, capture):
+        with self._lock:
+            if capture.done.is_set():
+                return
+            with capture.lock:
+                capture.ended = time.time()
+                capture.done.set()
+            if self._capture is capture:
+                self._capture = None
+            self._request_threads.clear()
+            self._native_sections.clear()
+            self._completed[capture.id] = capture
+            while len(self._completed) > COMPLETED_CAPTURE_LIMIT:
+                self._completed.popitem(last=False)
+
+    def _fold(self, frame, thread_id, request_label):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        stack.reverse()
+        if request_label is not None:
+            stack.insert(0, (request_label, '', 0))
+        native_label = self._native_sections.get(thread_id)
+        if native_label is not None:
+            stack.append((f"[native] {native_label}", '', 0))
+        return tuple(stack)
+
+    def _sample_loop(self, capture):
+        own_thread = threading.get_ident()
+        last_sample = time.perf_counter()
+        while not capture.done.is_set():
+            now = time.perf_counter()
+            elapsed = now - last_sample
+            last_sample = now
+
+            request_threads = dict(self._request_threads)
+            sweep = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                request_label = request_threads.get(thread_id)
+                if capture.scope == 'requests' and request_label is None:
+                    continue
+                sweep.append(self._fold(frame, thread_id, request_label))
+
+            with capture.lock:
+                if capture.done.is_set():
+                    break
+                for stack in sweep:
+                    totals = capture.stacks.get(stack)
+                    if totals is None:
+                        capture.stacks[stack] = [1, elapsed]
+                    else:
+                        totals[0] += 1
+                        totals[1] += elapsed
+                capture.sample_count += len(sweep)
+
+            if now >= capture.deadline:
+                self._finish(capture)
+                break
+            capture.done.wait(capture.interval)
+
+
+def to_collapsed(capture):
+    """Brendan Gregg's folded format: 'root;...;leaf count' per distinct stack."""
+    lines = []
+    for stack, (count, _) in sorted(capture.snapshot().items(), key=lambda item: -item[1][0]):
+        lines.append(';'.join(_frame_label(frame).replace(';', ',') for frame in stack) + f" {count}")
+    return '\n'.join(lines) + ('\n' if lines else '')
+
+
+def to_speedscope(capture):
+    """Speedscope 'sampled' profile weighted by wall-clock seconds between samples."""
+    frame_index = {}
+    frames = []
+    samples = []
+    weights = []
+    for stack, (_, seconds) in capture.snapshot().items():
+        indices = []
+        for frame in stack:
+            index = frame_index.get(frame)
+            if index is None:
+                index = frame_index[frame] = len(frames)
+                name, filename, line = frame
+                entry = {'name': _frame_label(frame)}
+                if filename:
+                    entry.update({'file': filename, 'line': line})
+                frames.append(entry)
+            indices.append(index)
+        samples.append(indices)
+        weights.append(seconds)
+
+    total = sum(weights)
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': f"parkwise capture {capture.id}",
+        'exporter': 'parkwise-profiler',
+        'activeProfileIndex': 0,
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': capture.route or 'all requests',
+            'unit': 'seconds',
+            'startValue': 0,
+            'endValue': total,
+            'samples': samples,
+            'weights': weights
+        }]
+    }
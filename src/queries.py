@@ -0,0 +1,176 @@
+"""SQL for the API endpoints, specialised per filter shape.
+
+Weekday and hour filters read the persisted computed columns issue_weekday and
+issue_hour (see Additional_Objects.sql), so SQL Server can seek the covering
+indexes instead of evaluating DATENAME/DATEPART for every row.  Each filter
+combination gets its own statement rather than a catch-all "? IS NULL OR ..."
+predicate, so every shape compiles to its own cached plan.  Databases without
+the computed columns fall back to equivalent expressions.
+
+Every statement runs through read_sql, which logs its duration and row count.
+"""
+import threading
+import time
+
+import pandas as pd
+
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+COMPUTED_TIME_COLUMNS = ('t.issue_weekday', 't.issue_hour')
+# The same values without the computed columns.  Day 0 (1900-01-01) was a
+# Monday, so unlike DATEPART(WEEKDAY, ...) this does not depend on SET DATEFIRST.
+EXPRESSION_TIME_COLUMNS = ('(DATEDIFF(DAY, 0, t.issue_date) % 7)', 'DATEPART(HOUR, t.issue_date)')
+
+_computed_columns_available = None
+_computed_columns_lock = threading.Lock()
+
+
+def read_sql(conn, name, sql, params=None):
+    """pd.read_sql with a [SQL] log line giving the statement's name, rows and duration."""
+    start = time.perf_counter()
+    try:
+        df = pd.read_sql(sql, conn, params=params)
+    except Exception as query_err:
+        print(f"[SQL] {name} failed after {(time.perf_counter() - start) * 1000:.1f}ms: {query_err}")
+        raise
+    print(f"[SQL] {name} rows={len(df)} duration={(time.perf_counter() - start) * 1000:.1f}ms")
+    return df
+
+
+def has_computed_time_columns(conn):
+    """Whether Ticket has issue_weekday/issue_hour; probed once per process."""
+    global _computed_columns_available
+    if _computed_columns_available is not None:
+        return _computed_columns_available
+
+    with _computed_columns_lock:
+        if _computed_columns_available is None:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT TOP 1 issue_weekday, issue_hour FROM Ticket")
+                cursor.fetchall()
+                _computed_columns_available = True
+            except Exception:
+                _computed_columns_available = False
+                print("[WARN] Ticket.issue_weekday/issue_hour are missing; time filters will scan. "
+                      "Run the computed column section of Additional_Objects.sql to enable index seeks.")
+            finally:
+                cursor.close()
+    return _computed_columns_available
+
+
+def time_columns(conn):
+    """(weekday, hour) column expressions for the connected database."""
+    return COMPUTED_TIME_COLUMNS if has_computed_time_columns(conn) else EXPRESSION_TIME_COLUMNS
+
+
+def weekday_number(day_name):
+    """Monday == 0 for a weekday name (any case); -1, which matches nothing, for anything else."""
+    lowered = [name.lower() for name in WEEKDAY_NAMES]
+    name = str(day_name).strip().lower()
+    return lowered.index(name) if name in lowered else -1
+
+
+def heatmap_query(conn, day_filter, hour_filter, limit):
+    """(name, sql, params) for the locations of one day/hour slice, busiest first.
+
+    Only the predicates the slice needs are emitted, giving four statement
+    shapes: all, weekday, hour and weekday_hour.  limit=None returns every
+    location.
+    """
+    weekday_column, hour_column = time_columns(conn)
+    predicates = ['t.violation_location IS NOT NULL']
+    params = []
+    shape = []
+    if day_filter is not None:
+        predicates.append(f"{weekday_column} = ?")
+        params.append(weekday_number(day_filter))
+        shape.append('weekday')
+    if hour_filter is not None:
+        predicates.append(f"{hour_column} = ?")
+        params.append(int(hour_filter))
+        shape.append('hour')
+
+    where_clause = '\n            AND '.join(predicates)
+    top = f"TOP {int(limit)} " if limit is not None else ''
+    sql = f"""
+        SELECT {top}
+            t.violation_location,
+            COUNT(*) as violation_count,
+            AVG(CAST(v.Cost as FLOAT)) as avg_fine,
+            COUNT(DISTINCT t.violation_code) as violation_types
+        FROM Ticket t
+        JOIN Violation v ON t.violation_code = v.Code
+        WHERE {where_clause}
+        GROUP BY t.violation_location
+        ORDER BY COUNT(*) DESC
+        """
+    return 'heatmap.' + ('_'.join(shape) or 'all'), sql, params
+
+
+TOTAL_TICKETS_QUERY = "SELECT COUNT(*) as total FROM Ticket"
+
+TOP_VIOLATIONS_QUERY = """
+        SELECT TOP 5
+            v.Description as violation_type,
+            COUNT(*) as count,
+            v.Cost as fine
+        FROM Ticket t
+        JOIN Violation v ON t.violation_code = v.Code
+        GROUP BY v.Description, v.Cost
+        ORDER BY COUNT(*) DESC
+        """
+
+HOT_LOCATIONS_QUERY = """
+            SELECT TOP 10
+                violation_location,
+                COUNT(*) as count
+            FROM Ticket
+            WHERE violation_location IS NOT NULL
+            GROUP BY violation_location
+            ORDER BY COUNT(*) DESC
+        """
+
+
+def peak_hours_query(conn):
+    _, hour_column = time_columns(conn)
+    return f"""
+        SELECT TOP 5
+            {hour_column} as hour,
+            COUNT(*) as count
+        FROM Ticket t
+        WHERE t.issue_date IS NOT NULL
+        GROUP BY {hour_column}
+        ORDER BY COUNT(*) DESC
+        """
+
+
+def location_patterns_query(conn):
+    """Weekday/hour breakdown for one location; a seek on IX_Ticket_location_weekday_hour."""
+    weekday_column, hour_column = time_columns(conn)
+    return f"""
+        SELECT
+            {weekday_column} as weekday,
+            {hour_column} as hour,
+            COUNT(*) as count,
+            AVG(CAST(v.Cost as FLOAT)) as avg_fine
+        FROM Ticket t
+        JOIN Violation v ON t.violation_code = v.Code
+        WHERE t.violation_location = ?
+            AND t.issue_date IS NOT NULL
+        GROUP BY {weekday_column}, {hour_column}
+        ORDER BY COUNT(*) DESC
+        """
+
+
+LOCATION_TYPES_QUERY = """
+        SELECT
+            v.Description as violation_type,
+            COUNT(*) as count,
+            v.Cost as fine
+        FROM Ticket t
+        JOIN Violation v ON t.violation_code = v.Code
+        WHERE t.violation_location = ?
+        GROUP BY v.Description, v.Cost
+        ORDER BY COUNT(*) DESC
+        """
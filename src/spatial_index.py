@@ -0,0 +1,242 @@
+"""Quadtree over candidate locations for adaptive "safer spot" searches.
+
+Points are reordered so every node covers a contiguous slice, and each node
+keeps its tight lat/lng box plus the minimum of every risk component over its
+subtree.  A best-first traversal orders nodes by a lower bound on the ranking
+score (smallest possible risk plus the distance penalty at the nearest edge
+of the box), so it expands outward from the user and stops as soon as no
+remaining node can beat the K-th best result.  Work therefore grows with K
+and local density, not with the number of locations in the city.
+
+Risk components are normalised against the whole candidate set rather than
+the points inside a radius, which is what makes them bounded per node.
+"""
+import heapq
+import math
+
+import numpy as np
+
+EARTH_RADIUS_MILES = 3959.0
+LEAF_CAPACITY = 32
+MAX_DEPTH = 16
+# Clamping the user into a node's lat/lng box can overshoot the great-circle
+# distance to the box very slightly off-meridian; shrink the bound to stay safe.
+DISTANCE_BOUND_SLACK = 0.995
+# Guards pruning against rounding differences between bounds and exact scores.
+SCORE_EPSILON = 1e-12
+TIME_BOUND_CACHE_LIMIT = 8
+
+
+def _haversine_miles(lat1, lng1, lat2, lng2):
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    sin_dlat = math.sin((lat2_rad - lat1_rad) * 0.5)
+    sin_dlng = math.sin(math.radians(lng2 - lng1) * 0.5)
+    a = sin_dlat * sin_dlat + math.cos(lat1_rad) * math.cos(lat2_rad) * sin_dlng * sin_dlng
+    return EARTH_RADIUS_MILES * 2.0 * math.asin(min(1.0, math.sqrt(a)))
+
+
+class RiskQuadtree:
+    """Static quadtree over candidate columns with per-node risk-component minima."""
+
+    def __init__(self, lat, lng, counts, fines):
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        counts = np.asarray(counts, dtype=np.float64)
+        fines = np.asarray(fines, dtype=np.float64)
+
+        self.size = len(lat)
+        self.order = np.empty(self.size, dtype=np.int64)
+        self._starts = []
+        self._ends = []
+        self._children = []
+        self._bounds = []
+        self._cursor = 0
+        self._source_lat = lat
+        self._source_lng = lng
+        if self.size:
+            self._build(np.arange(self.size, dtype=np.int64), 0)
+        del self._source_lat, self._source_lng
+
+        self.starts = np.asarray(self._starts, dtype=np.int64)
+        self.ends = np.asarray(self._ends, dtype=np.int64)
+        self.children = self._children
+        self.bounds = self._bounds
+
+        # Point columns in tree order.
+        self.lat = lat[self.order]
+        self.lng = lng[self.order]
+        self.lat_rad = np.radians(self.lat)
+        self.lng_rad = np.radians(self.lng)
+        self.cos_lat = np.cos(self.lat_rad)
+
+        ordered_counts = counts[self.order]
+        if self.size:
+            count_span = ordered_counts.max() - ordered_counts.min()
+            self.count_component = (ordered_counts - ordered_counts.min()) / (count_span if count_span >= 1e-9 else 1.0)
+            expected_fines = ordered_counts * fines[self.order]
+            max_expected_fine = expected_fines.max()
+            self.fine_component = expected_fines / max_expected_fine if max_expected_fine > 0 else np.zeros(self.size)
+        else:
+            self.count_component = np.zeros(0)
+            self.fine_component = np.zeros(0)
+        self.count_min = self._node_minima(self.count_component)
+        self.fine_min = self._node_minima(self.fine_component)
+        self._time_bounds = {}
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def node_count(self):
+        return len(self.starts)
+
+    def _build(self, indices, depth):
+        node = len(self._starts)
+        self._starts.append(self._cursor)
+        self._ends.append(self._cursor)
+        self._children.append(())
+
+        lat = self._source_lat[indices]
+        lng = self._source_lng[indices]
+        min_lat, max_lat, min_lng, max_lng = lat.min(), lat.max(), lng.min(), lng.max()
+        self._bounds.append((float(min_lat), float(max_lat), float(min_lng), float(max_lng)))
+
+        if len(indices) <= LEAF_CAPACITY or depth >= MAX_DEPTH or (min_lat == max_lat and min_lng == max_lng):
+            self.order[self._cursor:self._cursor + len(indices)] = indices
+            self._cursor += len(indices)
+        else:
+            north = lat >= (min_lat + max_lat) * 0.5
+            east = lng >= (min_lng + max_lng) * 0.5
+            children = []
+            for quadrant in (~north & ~east, ~north & east, north & ~east, north & east):
+                if quadrant.any():
+                    children.append(self._build(indices[quadrant], depth + 1))
+            self._children[node] = tuple(children)
+
+        self._ends[node] = self._cursor
+        return node
+
+    def _node_minima(self, values):
+        """Minimum of a tree-ordered point column over every node's subtree."""
+        minima = np.empty(self.node_count, dtype=np.float64)
+        # Nodes are numbered in preorder, so children are filled before their parent.
+        for node in range(self.node_count - 1, -1, -1):
+            children = self.children[node]
+            if children:
+                minima[node] = min(minima[child] for child in children)
+            else:
+                minima[node] = values[self.starts[node]:self.ends[node]].min()
+        return minima
+
+    def _time_component(self, likelihoods, time_key):
+        """Tree-ordered time component and its node minima, cached per time filter."""
+        if time_key is not None:
+            cached = self._time_bounds.get(time_key)
+            if cached is not None:
+                return cached
+
+        ordered = np.asarray(likelihoods, dtype=np.float64)[self.order]
+        max_likelihood = ordered.max() if self.size else 0.0
+        component = ordered / max_likelihood if max_likelihood > 0 else np.zeros(self.size)
+        result = (component, self._node_minima(component))
+
+        if time_key is not None:
+            self._time_bounds[time_key] = result
+            if len(self._time_bounds) > TIME_BOUND_CACHE_LIMIT:
+                self._time_bounds.pop(next(iter(self._time_bounds)))
+        return result
+
+    def _distance_lower_bound(self, node, user_lat, user_lng):
+        min_lat, max_lat, min_lng, max_lng = self.bounds[node]
+        nearest_lat = min(max(user_lat, min_lat), max_lat)
+        nearest_lng = min(max(user_lng, min_lng), max_lng)
+        if nearest_lat == user_lat and nearest_lng == user_lng:
+            return 0.0
+        return _haversine_miles(user_lat, user_lng, nearest_lat, nearest_lng) * DISTANCE_BOUND_SLACK
+
+    def search(self, user_lat, user_lng, limit, weights, likelihoods, time_key=None, max_radius=1.0, max_risk=1.0):
+        """Best `limit` locations within max_radius whose risk is at most max_risk.
+
+        weights is the (count, fine, time, distance, decay) tuple used by the
+        radius search.  Returns ((index, distance, risk_score, rank_score)
+        tuples ordered by rank score then distance, with indices into the
+        original columns, plus traversal stats.
+        """
+        count_weight, fine_weight, time_weight, distance_weight, distance_decay = weights
+        if distance_decay <= 0:
+            distance_decay = 0.25
+        limit = max(int(limit), 1)
+        weight_total = count_weight + fine_weight + time_weight
+        stats = {'nodesVisited': 0, 'pointsEvaluated': 0, 'totalNodes': self.node_count, 'totalPoints': self.size}
+        if not self.size:
+            return [], stats
+
+        time_component, time_min = self._time_component(likelihoods, time_key)
+        if weight_total > 0:
+            node_risk = (count_weight * self.count_min + fine_weight * self.fine_min + time_weight * time_min) / weight_total
+        else:
+            node_risk = np.zeros(self.node_count)
+
+        user_lat_rad = math.radians(user_lat)
+        user_lng_rad = math.radians(user_lng)
+        cos_user = math.cos(user_lat_rad)
+
+        def node_entry(node):
+            risk_bound = node_risk[node]
+            if risk_bound > max_risk + SCORE_EPSILON:
+                return None
+            distance_bound = self._distance_lower_bound(node, user_lat, user_lng)
+            if distance_bound > max_radius:
+                return None
+            score_bound = risk_bound + distance_weight * (1.0 - math.exp(-distance_bound / distance_decay))
+            return (score_bound - SCORE_EPSILON, distance_bound, node)
+
+        # Max-heap of the best results so far, keyed on (-rank, -distance).
+        best = []
+        frontier = []
+        root = node_entry(0)
+        if root is not None:
+            frontier.append(root)
+
+        while frontier:
+            score_bound, distance_bound, node = heapq.heappop(frontier)
+            if len(best) == limit:
+                worst_rank, worst_distance = -best[0][0], -best[0][1]
+                if score_bound > worst_rank or (score_bound == worst_rank and distance_bound >= worst_distance):
+                    break
+            stats['nodesVisited'] += 1
+
+            children = self.children[node]
+            if children:
+                for child in children:
+                    entry = node_entry(child)
+                    if entry is not None:
+                        heapq.heappush(frontier, entry)
+                continue
+
+            start, end = int(self.starts[node]), int(self.ends[node])
+            stats['pointsEvaluated'] += end - start
+            sin_dlat = np.sin((self.lat_rad[start:end] - user_lat_rad) * 0.5)
+            sin_dlng = np.sin((self.lng_rad[start:end] - user_lng_rad) * 0.5)
+            a = sin_dlat * sin_dlat + cos_user * self.cos_lat[start:end] * sin_dlng * sin_dlng
+            distances = EARTH_RADIUS_MILES * 2.0 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+            if weight_total > 0:
+                risks = (
+                    count_weight * self.count_component[start:end]
+                    + fine_weight * self.fine_component[start:end]
+                    + time_weight * time_component[start:end]
+                ) / weight_total
+            else:
+                risks = np.zeros(end - start)
+            ranks = risks + distance_weight * (1.0 - np.exp(-distances / distance_decay))
+
+            for offset in np.flatnonzero((distances <= max_radius) & (risks <= max_risk)):
+                entry = (-float(ranks[offset]), -float(distances[offset]), int(self.order[start + offset]), float(risks[offset]))
+                if len(best) < limit:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+
+        ranked = sorted(best, key=lambda entry: (-entry[0], -entry[1]))
+        return [(index, -distance, risk, -rank) for rank, distance, index, risk in ranked], stats
@@ -2,6 +2,9 @@
 let map;
 let heatmapLayer;
 let currentData = [];
+let currentSlice = null;
+let currentDataByLocation = new Map();
+let heatmapMarkersByLocation = new Map();
 let peakHoursChart;
 
 let selectedLocation = null;
@@ -566,28 +569,25 @@ async function updateHeatmap() {
     showLoading();
     
     try {
+        // Moving between slices only needs the points that changed
+        if (currentSlice && currentDataByLocation.size && (currentSlice.day !== day || currentSlice.hour !== hour)) {
+            const applied = await updateHeatmapFromDelta(day, hour);
+            if (applied) {
+                showSliceMessage(currentData.length, day, hour);
+                return;
+            }
+        }
+
         const response = await fetch(`/api/heatmap-data?day=${day}&hour=${hour}`);
         const result = await response.json();
         
         if (result.status === 'success') {
             currentData = result.data;
+            currentDataByLocation = new Map(result.data.map(location => [location.location, location]));
+            currentSlice = { day, hour };
             updateHeatmapLayer(result.data);
             updateHotspotCount(result.data.length);
-
-            const dayLabel = day === 'all' ? 'all days' : day;
-            let hourPhrase;
-            if (hour === 'all') {
-                hourPhrase = 'across all hours';
-            } else {
-                const hourNumber = Number(hour);
-                const formattedHour = Number.isFinite(hourNumber)
-                    ? `${hourNumber.toString().padStart(2, '0')}:00`
-                    : `${hour}:00`;
-                hourPhrase = `at ${formattedHour}`;
-            }
-
-            const message = `Showing ${result.data.length} high-risk locations for ${dayLabel} ${hourPhrase}`.trim();
-            showSuccessMessage(message);
+            showSliceMessage(result.data.length, day, hour);
         } else {
             showErrorMessage('Failed to load heatmap data');
         }
@@ -599,6 +599,150 @@ async function updateHeatmap() {
     }
 }
 
+function showSliceMessage(count, day, hour) {
+    const dayLabel = day === 'all' ? 'all days' : day;
+    let hourPhrase;
+    if (hour === 'all') {
+        hourPhrase = 'across all hours';
+    } else {
+        const hourNumber = Number(hour);
+        const formattedHour = Number.isFinite(hourNumber)
+            ? `${hourNumber.toString().padStart(2, '0')}:00`
+            : `${hour}:00`;
+        hourPhrase = `at ${formattedHour}`;
+    }
+
+    const message = `Showing ${count} high-risk locations for ${dayLabel} ${hourPhrase}`.trim();
+    showSuccessMessage(message);
+}
+
+// Fetch only added/removed/changed points relative to the slice on screen and patch them in place
+async function updateHeatmapFromDelta(day, hour) {
+    const params = new URLSearchParams({
+        baseDay: currentSlice.day,
+        baseHour: currentSlice.hour,
+        day,
+        hour
+    });
+
+    try {
+        const response = await fetch(`/api/heatmap-delta?${params.toString()}`);
+        const result = await response.json();
+        if (result.status !== 'success' || !result.data) {
+            return false;
+        }
+
+        const { added = [], removed = [], changed = [] } = result.data;
+        removed.forEach(location => {
+            currentDataByLocation.delete(location);
+            removeHeatmapMarker(location);
+        });
+        added.forEach(entry => {
+            currentDataByLocation.set(entry.location, entry);
+        });
+        changed.forEach(entry => {
+            const existing = currentDataByLocation.get(entry.location);
+            if (existing) {
+                Object.assign(existing, entry);
+            }
+        });
+
+        // Intensities are not sent per point: rescale every location against the target slice's maxCount
+        const maxCount = Number(result.metadata && result.metadata.maxCount) || 1;
+        const changedLocations = new Set(changed.map(entry => entry.location));
+        currentDataByLocation.forEach(location => {
+            const intensity = Math.min((Number(location.count) || 0) / maxCount, 1);
+            if (intensity !== location.intensity || changedLocations.has(location.location)) {
+                location.intensity = intensity;
+                syncHeatmapMarker(location);
+            }
+        });
+
+        currentData = Array.from(currentDataByLocation.values());
+        currentSlice = { day, hour };
+        setHeatmapPoints(currentData);
+        updateHotspotCount(currentData.length);
+        console.log(`[DEBUG] Applied heatmap delta: +${added.length} -${removed.length} ~${changed.length}`);
+        return true;
+    } catch (error) {
+        console.warn('Heatmap delta failed, falling back to a full reload:', error);
+        return false;
+    }
+}
+
+function heatmapIntensity(location, maxCount) {
+    const intensity = Number(location.intensity);
+    const value = Number.isFinite(intensity) ? intensity : (Number(location.count) || 0) / maxCount;
+    return Math.max(Math.min(value, 1), 0.01);
+}
+
+function setHeatmapPoints(data) {
+    if (!heatmapLayer) {
+        return;
+    }
+
+    const validLocations = data.filter(location => Number.isFinite(location.lat) && Number.isFinite(location.lng));
+    const MAX_HEATMAP_POINTS = 3000;
+    let sampledLocations = validLocations;
+    if (validLocations.length > MAX_HEATMAP_POINTS) {
+        const step = Math.ceil(validLocations.length / MAX_HEATMAP_POINTS);
+        sampledLocations = validLocations.filter((_, index) => index % step === 0).slice(0, MAX_HEATMAP_POINTS);
+    }
+
+    const maxCount = sampledLocations.reduce((max, location) => Math.max(max, Number(location.count) || 0), 0) || 1;
+    heatmapLayer.setLatLngs(sampledLocations.map(location => [
+        Number(location.lat),
+        Number(location.lng),
+        heatmapIntensity(location, maxCount)
+    ]));
+}
+
+function removeHeatmapMarker(location) {
+    const marker = heatmapMarkersByLocation.get(location);
+    if (marker) {
+        window._pwMarkerLayer.removeLayer(marker);
+        heatmapMarkersByLocation.delete(location);
+    }
+}
+
+function heatmapMarkerPopup(raw) {
+    return `
+        <div style="color: #333;">
+            <strong>${raw.location}</strong><br>
+            Violations: ${raw.count}<br>
+            Avg Fine: $${raw.avgFine.toFixed(2)}<br>
+            <button onclick="showLocationDetails('${encodeURIComponent(raw.location)}')">View Details</button>
+        </div>
+    `;
+}
+
+// Create, restyle or drop the marker for one location to match its current data
+function syncHeatmapMarker(raw) {
+    if ((raw.count || 0) <= 50 || !Number.isFinite(raw.lat) || !Number.isFinite(raw.lng)) {
+        removeHeatmapMarker(raw.location);
+        return;
+    }
+
+    const normalized = heatmapIntensity(raw, 1);
+    const existing = heatmapMarkersByLocation.get(raw.location);
+    if (existing) {
+        existing.setStyle({ fillColor: getMarkerColor(normalized) });
+        existing.setPopupContent(heatmapMarkerPopup(raw));
+        return;
+    }
+
+    const marker = L.circleMarker([raw.lat, raw.lng], {
+        radius: 8,
+        fillColor: getMarkerColor(normalized),
+        color: '#ffffff',
+        weight: 2,
+        opacity: 1,
+        fillOpacity: 0.7
+    }).addTo(window._pwMarkerLayer);
+    marker.bindPopup(heatmapMarkerPopup(raw));
+    heatmapMarkersByLocation.set(raw.location, marker);
+}
+
 // Update the heatmap layer
 function updateHeatmapLayer(data) {
     console.log('[DEBUG] updateHeatmapLayer called with', data.length, 'locations');
@@ -615,34 +759,12 @@ function updateHeatmapLayer(data) {
 
     if (!validLocations.length) {
         window._pwMarkerLayer.clearLayers();
+        heatmapMarkersByLocation.clear();
         console.warn('[DEBUG] No valid locations to render on heatmap.');
         return;
     }
 
-    const MAX_HEATMAP_POINTS = 3000;
-    let sampledLocations = validLocations;
-    if (validLocations.length > MAX_HEATMAP_POINTS) {
-        const step = Math.ceil(validLocations.length / MAX_HEATMAP_POINTS);
-        sampledLocations = validLocations.filter((_, index) => index % step === 0).slice(0, MAX_HEATMAP_POINTS);
-        console.log(`[DEBUG] Downsampled heatmap points from ${validLocations.length} to ${sampledLocations.length}`);
-    }
-
-    const maxCount = sampledLocations.reduce((max, location) => Math.max(max, Number(location.count) || 0), 0) || 1;
-
-    const heatmapPoints = sampledLocations.map(location => {
-        const normalized = Math.max(Math.min((Number(location.count) || 0) / maxCount, 1), 0.01);
-        return {
-            coords: [Number(location.lat), Number(location.lng), normalized],
-            normalized,
-            raw: location
-        };
-    });
-
-    console.log('[DEBUG] Heatmap data prepared:', heatmapPoints.slice(0, 5));
-    console.log('[DEBUG] Data format check - first point:', heatmapPoints[0]);
-    console.log('[DEBUG] Heatmap maxCount:', maxCount);
-
-    heatmapLayer.setLatLngs(heatmapPoints.map(point => point.coords));
+    setHeatmapPoints(validLocations);
 
     heatmapLayer.setOptions({
         max: 1,
@@ -656,7 +778,7 @@ function updateHeatmapLayer(data) {
         console.log('[DEBUG] Called redraw on heatmap layer');
     }
 
-    console.log(`Heatmap updated with ${heatmapPoints.length} points`);
+    console.log(`Heatmap updated with ${validLocations.length} points`);
 
     if (heatmapLayer._canvas) {
         console.log('[DEBUG] Heatmap canvas exists:', heatmapLayer._canvas);
@@ -666,29 +788,9 @@ function updateHeatmapLayer(data) {
     }
 
     window._pwMarkerLayer.clearLayers();
+    heatmapMarkersByLocation.clear();
 
-    heatmapPoints.forEach(point => {
-        const { raw, normalized, coords } = point;
-        if ((raw.count || 0) > 50) {
-            const marker = L.circleMarker([coords[0], coords[1]], {
-                radius: 8,
-                fillColor: getMarkerColor(normalized),
-                color: '#ffffff',
-                weight: 2,
-                opacity: 1,
-                fillOpacity: 0.7
-            }).addTo(window._pwMarkerLayer);
-
-            marker.bindPopup(`
-                <div style="color: #333;">
-                    <strong>${raw.location}</strong><br>
-                    Violations: ${raw.count}<br>
-                    Avg Fine: $${raw.avgFine.toFixed(2)}<br>
-                    <button onclick="showLocationDetails('${encodeURIComponent(raw.location)}')">View Details</button>
-                </div>
-            `);
-        }
-    });
+    validLocations.forEach(syncHeatmapMarker);
 }
 
 // Get marker color based on intensity
@@ -0,0 +1,282 @@
+"""Day-partitioned ticket aggregates for time-range heatmap queries.
+
+Each row of the partition frame is one (day, hour, location, violation code)
+bucket, with locations stored as IDs from a shared LocationDictionary.  Rows
+are kept sorted by day and ``day_offsets`` holds the prefix offsets of every
+day, so a date range maps to a contiguous slice of rows in O(1).  Short
+ranges are aggregated from that slice directly.
+
+Ranges holding more buckets than there are (location, violation code,
+weekday/hour slot) keys are summed from running per-key day totals instead:
+each key's total over [start, end] is the difference of two prefix sums found
+by binary search, so the cost no longer grows with the length of the range.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from location_dictionary import LocationDictionary
+
+# Day numbers count days since 1900-01-01, matching SQL Server's
+# DATEDIFF(DAY, 0, issue_date).  That date was a Monday, so day_number % 7
+# gives the weekday with Monday == 0, the same convention as date.weekday().
+DAY_ZERO = date(1900, 1, 1)
+
+PARTITION_COLUMNS = ['day_number', 'hour', 'violation_location', 'violation_code', 'violation_count', 'fine_total']
+
+PARTITION_QUERY = """
+SELECT
+    DATEDIFF(DAY, 0, t.issue_date) as day_number,
+    DATEPART(HOUR, t.issue_date) as hour,
+    t.violation_location,
+    t.violation_code,
+    COUNT(*) as violation_count,
+    SUM(CAST(v.Cost as FLOAT)) as fine_total
+FROM Ticket t
+JOIN Violation v ON t.violation_code = v.Code
+WHERE t.violation_location IS NOT NULL
+    AND t.issue_date IS NOT NULL
+GROUP BY DATEDIFF(DAY, 0, t.issue_date), DATEPART(HOUR, t.issue_date), t.violation_location, t.violation_code
+"""
+
+# First and last day covered by PARTITION_QUERY, without reading the buckets.
+PARTITION_DAYS_QUERY = """
+SELECT
+    MIN(DATEDIFF(DAY, 0, t.issue_date)) as first_day,
+    MAX(DATEDIFF(DAY, 0, t.issue_date)) as last_day
+FROM Ticket t
+JOIN Violation v ON t.violation_code = v.Code
+WHERE t.violation_location IS NOT NULL
+    AND t.issue_date IS NOT NULL
+"""
+
+# A range is summed from the running totals only when its row slice is longer
+# than RANGE_SUM_MIN_ROWS and than RANGE_SUM_KEY_COST times the number of keys
+# in the requested slots; each key costs two binary searches, a row one mask.
+RANGE_SUM_MIN_ROWS = 1 << 16
+RANGE_SUM_KEY_COST = 3
+
+
+def date_to_day_number(value):
+    return (value - DAY_ZERO).days
+
+
+def day_number_to_date(day_number):
+    return DAY_ZERO + timedelta(days=int(day_number))
+
+
+def _slot_lookup(weekdays=None, hours=None):
+    """Boolean mask over the 168 weekday * 24 + hour slots; None selects every weekday or hour."""
+    lookup = np.zeros((7, 24), dtype=bool)
+    lookup[np.ix_(
+        list(weekdays) if weekdays is not None else range(7),
+        list(hours) if hours is not None else range(24)
+    )] = True
+    return lookup.reshape(-1)
+
+
+class TimePartitionIndex:
+    """Columnar, day-sorted partition buckets with per-day prefix offsets.
+
+    Pass the application's location dictionary so that aggregates and
+    likelihoods are indexed by the same location IDs as every other cache.
+    """
+
+    def __init__(self, partitions_df, location_dictionary=None):
+        df = partitions_df[PARTITION_COLUMNS].copy()
+        df['day_number'] = pd.to_numeric(df['day_number'], errors='coerce')
+        df['hour'] = pd.to_numeric(df['hour'], errors='coerce')
+        df = df[df['day_number'].notna() & df['hour'].notna()]
+        df = df.sort_values('day_number', kind='stable')
+
+        self.location_dictionary = location_dictionary if location_dictionary is not None else LocationDictionary()
+        self.location_id = self.location_dictionary.encode(df['violation_location'].to_numpy())
+        # Bincounts over location IDs are sized to the largest ID present.
+        self.location_span = int(self.location_id.max()) + 1 if len(self.location_id) else 0
+        violation_codes, violation_uniques = pd.factorize(df['violation_code'], sort=False)
+
+        self.day_number = df['day_number'].to_numpy(dtype=np.int32)
+        self.hour = df['hour'].to_numpy(dtype=np.int8)
+        self.violation_code = violation_codes.astype(np.int32, copy=False)
+        self.violation_count = pd.to_numeric(df['violation_count'], errors='coerce').fillna(0).to_numpy(dtype=np.int32)
+        self.fine_total = pd.to_numeric(df['fine_total'], errors='coerce').fillna(0.0).to_numpy(dtype=np.float64)
+        self.violation_code_count = max(len(violation_uniques), 1)
+
+        if len(self.day_number):
+            self.first_day = int(self.day_number[0])
+            self.last_day = int(self.day_number[-1])
+            day_range = np.arange(self.first_day, self.last_day + 2, dtype=np.int32)
+            self.day_offsets = np.searchsorted(self.day_number, day_range, side='left')
+        else:
+            self.first_day = self.last_day = 0
+            self.day_offsets = np.zeros(1, dtype=np.int64)
+
+        self._time_profile = None
+        self._range_sums = None
+
+    def __len__(self):
+        return len(self.day_number)
+
+    @property
+    def first_date(self):
+        return day_number_to_date(self.first_day) if len(self) else None
+
+    @property
+    def last_date(self):
+        return day_number_to_date(self.last_day) if len(self) else None
+
+    def _location_time_profile(self):
+        """Sparse per-location histogram over the 168 weekday/hour slots of the full history."""
+        if self._time_profile is None:
+            slots = (self.day_number % 7).astype(np.int64) * 24 + self.hour
+            keys = self.location_id.astype(np.int64) * 168 + slots
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+            slot_counts = np.bincount(inverse, weights=self.violation_count)
+            profile_location = (unique_keys // 168).astype(np.int32)
+            totals = np.bincount(profile_location, weights=slot_counts, minlength=self.location_span)
+            self._time_profile = (profile_location, (unique_keys % 168).astype(np.int16), slot_counts, totals)
+        return self._time_profile
+
+    def time_likelihood(self, weekdays=None, hours=None):
+        """Fraction of each location's tickets that fall inside the weekday/hour window.
+
+        Indexed by location ID up to location_span; locations with no history get 0.
+        """
+        profile_location, profile_slot, slot_counts, totals = self._location_time_profile()
+        selected = _slot_lookup(weekdays, hours)[profile_slot]
+
+        in_window = np.bincount(profile_location[selected], weights=slot_counts[selected], minlength=self.location_span)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(totals > 0, in_window / totals, 0.0)
+
+    def _range_sum_tables(self):
+        """Running day totals per (location, violation code, weekday/hour slot) key.
+
+        Returns (key_location, key_pair, key_slot, slot_keys, position,
+        cumulative_count, cumulative_fine), where slot_keys counts the keys in
+        each of the 168 slots.  Buckets are ordered by key then day, and position is
+        key * day_span + day offset, so a key's buckets in a day range lie
+        between two searchsorted bounds.  The cumulative columns carry a leading
+        zero and run across the whole table, which makes the total of any
+        contiguous run a difference of two entries.
+        """
+        if self._range_sums is None:
+            slots = (self.day_number % 7).astype(np.int64) * 24 + self.hour
+            pairs = self.location_id.astype(np.int64) * self.violation_code_count + self.violation_code
+            unique_keys, key_index = np.unique(pairs * 168 + slots, return_inverse=True)
+            day_span = self.last_day - self.first_day + 1
+            position = key_index.astype(np.int64) * day_span + (self.day_number - self.first_day)
+            order = np.argsort(position, kind='stable')
+            key_pair = unique_keys // 168
+            self._range_sums = (
+                (key_pair // self.violation_code_count).astype(np.int32),
+                key_pair,
+                (unique_keys % 168).astype(np.int16),
+                np.bincount(unique_keys % 168, minlength=168),
+                position[order],
+                np.concatenate(([0], np.cumsum(self.violation_count[order], dtype=np.int64))),
+                np.concatenate(([0.0], np.cumsum(self.fine_total[order], dtype=np.float64)))
+            )
+        return self._range_sums
+
+    def release_range_sums(self):
+        """Drop the running totals (rebuilt on the next long range).  Returns bytes freed."""
+        tables, self._range_sums = self._range_sums, None
+        return sum(array.nbytes for array in tables) if tables is not None else 0
+
+    def _row_bounds(self, start_day, end_day):
+        """Row slice covering [start_day, end_day] using the per-day prefix offsets."""
+        if not len(self):
+            return 0, 0
+
+        start_day = self.first_day if start_day is None else max(int(start_day), self.first_day)
+        end_day = self.last_day if end_day is None else min(int(end_day), self.last_day)
+        if start_day > end_day:
+            return 0, 0
+
+        return int(self.day_offsets[start_day - self.first_day]), int(self.day_offsets[end_day - self.first_day + 1])
+
+    def _selected_keys(self, weekdays, hours):
+        slot_keys = self._range_sum_tables()[3]
+        return int(slot_keys[_slot_lookup(weekdays, hours)].sum())
+
+    def _scan_rows(self, lo, hi, weekdays, hours):
+        """Per-location (counts, fines, distinct codes) from the bucket rows lo:hi."""
+        location_id = self.location_id[lo:hi]
+        violation_count = self.violation_count[lo:hi]
+        fine_total = self.fine_total[lo:hi]
+        violation_code = self.violation_code[lo:hi]
+
+        mask = None
+        if weekdays is not None:
+            weekday_lookup = np.zeros(7, dtype=bool)
+            weekday_lookup[list(weekdays)] = True
+            mask = weekday_lookup[self.day_number[lo:hi] % 7]
+        if hours is not None:
+            hour_lookup = np.zeros(24, dtype=bool)
+            hour_lookup[list(hours)] = True
+            hour_mask = hour_lookup[self.hour[lo:hi]]
+            mask = hour_mask if mask is None else (mask & hour_mask)
+        if mask is not None:
+            location_id = location_id[mask]
+            violation_count = violation_count[mask]
+            fine_total = fine_total[mask]
+            violation_code = violation_code[mask]
+
+        location_total = self.location_span
+        counts = np.bincount(location_id, weights=violation_count, minlength=location_total)
+        fines = np.bincount(location_id, weights=fine_total, minlength=location_total)
+
+        distinct_pairs = np.unique(location_id.astype(np.int64) * self.violation_code_count + violation_code)
+        types = np.bincount((distinct_pairs // self.violation_code_count).astype(np.int64), minlength=location_total)
+
+        return counts, fines, types
+
+    def _sum_range(self, start_day, end_day, weekdays, hours):
+        """Per-location (counts, fines, distinct codes) from the running per-key day totals."""
+        key_location, key_pair, key_slot, _, position, cumulative_count, cumulative_fine = self._range_sum_tables()
+        start_day = self.first_day if start_day is None else max(int(start_day), self.first_day)
+        end_day = self.last_day if end_day is None else min(int(end_day), self.last_day)
+
+        keys = np.flatnonzero(_slot_lookup(weekdays, hours)[key_slot])
+
+        base = keys.astype(np.int64) * (self.last_day - self.first_day + 1)
+        lo = np.searchsorted(position, base + (start_day - self.first_day), side='left')
+        hi = np.searchsorted(position, base + (end_day - self.first_day), side='right')
+        location_id = key_location[keys]
+
+        location_total = self.location_span
+        counts = np.bincount(location_id, weights=cumulative_count[hi] - cumulative_count[lo], minlength=location_total)
+        fines = np.bincount(location_id, weights=cumulative_fine[hi] - cumulative_fine[lo], minlength=location_total)
+        # Keys are ordered by (location, code) pair first, so pairs come out sorted.
+        pairs = key_pair[keys][hi > lo]
+        distinct_pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))] if len(pairs) else pairs
+        types = np.bincount((distinct_pairs // self.violation_code_count).astype(np.int64), minlength=location_total)
+        return counts, fines, types
+
+    def aggregate(self, start_day=None, end_day=None, weekdays=None, hours=None, limit=None):
+        """Sum the buckets in a day range, optionally restricted to weekdays/hours.
+
+        Returns a frame shaped like the interned SQL heatmap aggregate: one row
+        per location_id with violation_count, avg_fine and violation_types,
+        ordered by count descending.
+        """
+        lo, hi = self._row_bounds(start_day, end_day)
+        if hi - lo > RANGE_SUM_MIN_ROWS and hi - lo > RANGE_SUM_KEY_COST * self._selected_keys(weekdays, hours):
+            counts, fines, types = self._sum_range(start_day, end_day, weekdays, hours)
+        else:
+            counts, fines, types = self._scan_rows(lo, hi, weekdays, hours)
+
+        present = np.flatnonzero(counts > 0)
+        if limit is not None and len(present) > limit:
+            top = np.argpartition(-counts[present], limit - 1)[:limit]
+            present = present[top]
+        order = present[np.argsort(-counts[present], kind='stable')]
+
+        return pd.DataFrame({
+            'location_id': order.astype(np.int32),
+            'violation_count': counts[order].astype(np.int32),
+            'avg_fine': (fines[order] / counts[order]).astype(np.float32),
+            'violation_types': types[order].astype(np.int16)
+        })
@@ -0,0 +1,206 @@
+"""Precomputed time series behind the trends and forecast endpoint.
+
+A TrendIndex condenses the time partitions into three compressed sparse
+row tables keyed by location: daily ticket counts, weekday/hour slot counts
+over the whole history, and the same slot counts over the most recent
+weeks.  Each location's rows are contiguous, so a location's monthly,
+weekly or hourly series is a bincount over a few hundred entries.
+Citywide series come from dense per-day and per-slot totals.  Nothing is
+grouped at query time.
+
+The forecast for a weekday/hour blends the recent weekly average of that
+slot with its long-run average.  The long-run average acts as a prior worth
+FORECAST_PRIOR_WEEKS weeks of observations, so locations with little recent
+history lean on their long-run pattern.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from time_partitions import day_number_to_date
+
+GRANULARITIES = ('month', 'week', 'hour')
+FORECAST_RECENT_WEEKS = 12
+FORECAST_PRIOR_WEEKS = 4
+SLOT_COUNT = 7 * 24
+
+Forecast = namedtuple('Forecast', [
+    'expected', 'recent_average', 'historical_average', 'recent_weeks', 'history_weeks'
+])
+
+_ARRAY_NAMES = (
+    'location_ids', 'day_offsets', 'day', 'day_count',
+    'slot_offsets', 'slot', 'slot_count',
+    'recent_offsets', 'recent_slot', 'recent_count',
+    'city_daily', 'city_slots', 'city_recent_slots'
+)
+
+
+def _csr(rows, columns, weights, row_count, column_count):
+    """Sum weights per (row, column) and return (offsets, columns, sums) sorted by row then column."""
+    keys, inverse = np.unique(rows * column_count + columns, return_inverse=True)
+    sums = np.bincount(inverse, weights=weights).astype(np.int32)
+    offsets = np.searchsorted(keys // column_count, np.arange(row_count + 1)).astype(np.int64)
+    return offsets, (keys % column_count).astype(np.int32), sums
+
+
+def _weekday_occurrences(first_day, last_day, weekday):
+    """Number of days in [first_day, last_day] falling on weekday (Monday == 0)."""
+    if last_day < first_day:
+        return 0
+    return (last_day - weekday) // 7 - (first_day - 1 - weekday) // 7
+
+
+class TrendIndex:
+    """Compact per-location and citywide ticket time series.
+
+    Rows are keyed by IDs from the application's LocationDictionary, like
+    every other per-location structure.
+    """
+
+    def __init__(self, arrays, first_day, last_day, recent_weeks):
+        for name in _ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        self.first_day = int(first_day)
+        self.last_day = int(last_day)
+        self.recent_weeks = int(recent_weeks)
+        self.recent_first_day = max(self.first_day, self.last_day - 7 * self.recent_weeks + 1)
+
+        # Location ID -> row, -1 for locations without tickets.
+        span = int(self.location_ids.max()) + 1 if len(self.location_ids) else 0
+        self._row_of = np.full(span, -1, dtype=np.int32)
+        self._row_of[self.location_ids] = np.arange(len(self.location_ids), dtype=np.int32)
+
+        day_count = len(self.city_daily)
+        calendar = np.datetime64(day_number_to_date(self.first_day).isoformat()) + np.arange(day_count)
+        months = calendar.astype('datetime64[M]')
+        self._month_of_day = (months - months[0]).astype(np.int32) if day_count else np.zeros(0, dtype=np.int32)
+        self._month_labels = [str(month) for month in np.unique(months)]
+        first_week = self.first_day // 7
+        self._week_of_day = ((self.first_day + np.arange(day_count)) // 7 - first_week).astype(np.int32)
+        week_total = int(self._week_of_day[-1]) + 1 if day_count else 0
+        # Day numbers count from a Monday, so week starts are multiples of 7.
+        self._week_labels = [day_number_to_date((first_week + week) * 7).isoformat() for week in range(week_total)]
+
+    @classmethod
+    def from_partitions(cls, index, recent_weeks=FORECAST_RECENT_WEEKS):
+        """Build from a TimePartitionIndex."""
+        day_total = index.last_day - index.first_day + 1 if len(index) else 0
+        day = (index.day_number - index.first_day).astype(np.int64)
+        slot = (index.day_number % 7).astype(np.int64) * 24 + index.hour
+        counts = index.violation_count.astype(np.float64)
+        location_ids, location_row = np.unique(index.location_id, return_inverse=True)
+        location_row = location_row.astype(np.int64)
+        recent = index.day_number > index.last_day - 7 * recent_weeks
+
+        arrays = {'location_ids': location_ids.astype(np.int32)}
+        arrays['day_offsets'], arrays['day'], arrays['day_count'] = _csr(
+            location_row, day, counts, len(location_ids), max(day_total, 1))
+        arrays['slot_offsets'], arrays['slot'], arrays['slot_count'] = _csr(
+            location_row, slot, counts, len(location_ids), SLOT_COUNT)
+        arrays['recent_offsets'], arrays['recent_slot'], arrays['recent_count'] = _csr(
+            location_row[recent], slot[recent], counts[recent], len(location_ids), SLOT_COUNT)
+        arrays['city_daily'] = np.bincount(day, weights=counts, minlength=day_total).astype(np.int64)
+        arrays['city_slots'] = np.bincount(slot, weights=counts, minlength=SLOT_COUNT).astype(np.int64)
+        arrays['city_recent_slots'] = np.bincount(slot[recent], weights=counts[recent], minlength=SLOT_COUNT).astype(np.int64)
+        return cls(arrays, index.first_day, index.last_day, recent_weeks)
+
+    def save(self, path, location_dictionary):
+        """Write the arrays to an .npz file, with location labels since IDs are only stable per process."""
+        arrays = {name: getattr(self, name) for name in _ARRAY_NAMES if name != 'location_ids'}
+        with open(path, 'wb') as fp:
+            np.savez(
+                fp,
+                locations=np.array(location_dictionary.labels(self.location_ids), dtype=str),
+                days=np.array([self.first_day, self.last_day, self.recent_weeks], dtype=np.int64),
+                **arrays
+            )
+
+    @classmethod
+    def load(cls, path, location_dictionary):
+        with np.load(path, allow_pickle=False) as stored:
+            arrays = {name: stored[name] for name in _ARRAY_NAMES if name != 'location_ids'}
+            arrays['location_ids'] = location_dictionary.encode(stored['locations'])
+            first_day, last_day, recent_weeks = (int(value) for value in stored['days'])
+        return cls(arrays, first_day, last_day, recent_weeks)
+
+    def __len__(self):
+        return len(self.location_ids)
+
+    def has_location(self, location_id):
+        return self._row(location_id) >= 0
+
+    def _row(self, location_id):
+        if location_id is None or not 0 <= location_id < len(self._row_of):
+            return -1
+        return int(self._row_of[location_id])
+
+    def periods(self, granularity):
+        """(labels, days) per period: 'YYYY-MM' months, Monday week starts, or hours 0-23.
+
+        days is how many days of history each month or week covers; the first
+        and last periods are usually partial.
+        """
+        if granularity == 'month':
+            return self._month_labels, np.bincount(self._month_of_day, minlength=len(self._month_labels))
+        if granularity == 'week':
+            return self._week_labels, np.bincount(self._week_of_day, minlength=len(self._week_labels))
+        if granularity == 'hour':
+            return list(range(24)), None
+        raise ValueError(f"Unknown granularity '{granularity}'")
+
+    def weekday_days(self, weekdays=None):
+        """Days of history falling on the given weekdays (all days by default)."""
+        if not len(self.city_daily):
+            return 0
+        return sum(
+            _weekday_occurrences(self.first_day, self.last_day, weekday)
+            for weekday in (range(7) if weekdays is None else weekdays)
+        )
+
+    def counts(self, granularity, location_id=None, weekdays=None):
+        """Ticket counts per period for one location, or citywide when location_id is None.
+
+        weekdays restricts the hour series to those weekdays.
+        """
+        if granularity == 'hour':
+            slot_counts = self._slot_counts(location_id, recent=False).reshape(7, 24)
+            return slot_counts[list(weekdays)].sum(axis=0) if weekdays is not None else slot_counts.sum(axis=0)
+
+        labels, _ = self.periods(granularity)
+        period_of_day = self._month_of_day if granularity == 'month' else self._week_of_day
+        if location_id is None:
+            return np.bincount(period_of_day, weights=self.city_daily, minlength=len(labels)).astype(np.int64)
+        row = self._row(location_id)
+        if row < 0:
+            return np.zeros(len(labels), dtype=np.int64)
+        lo, hi = self.day_offsets[row], self.day_offsets[row + 1]
+        return np.bincount(period_of_day[self.day[lo:hi]], weights=self.day_count[lo:hi], minlength=len(labels)).astype(np.int64)
+
+    def _slot_counts(self, location_id, recent):
+        if location_id is None:
+            return self.city_recent_slots if recent else self.city_slots
+        slot_counts = np.zeros(SLOT_COUNT, dtype=np.int64)
+        row = self._row(location_id)
+        if row >= 0:
+            offsets, slots, counts = (
+                (self.recent_offsets, self.recent_slot, self.recent_count) if recent
+                else (self.slot_offsets, self.slot, self.slot_count)
+            )
+            lo, hi = offsets[row], offsets[row + 1]
+            slot_counts[slots[lo:hi]] = counts[lo:hi]
+        return slot_counts
+
+    def forecast(self, weekday, hour, location_id=None):
+        """Expected tickets in one upcoming weekday/hour, for a location or citywide."""
+        slot = weekday * 24 + hour
+        history_weeks = _weekday_occurrences(self.first_day, self.last_day, weekday) if len(self.city_daily) else 0
+        recent_weeks = _weekday_occurrences(self.recent_first_day, self.last_day, weekday) if len(self.city_daily) else 0
+        history_total = float(self._slot_counts(location_id, recent=False)[slot])
+        recent_total = float(self._slot_counts(location_id, recent=True)[slot])
+
+        historical_average = history_total / history_weeks if history_weeks else 0.0
+        recent_average = recent_total / recent_weeks if recent_weeks else 0.0
+        weight = recent_weeks + FORECAST_PRIOR_WEEKS
+        expected = (recent_total + FORECAST_PRIOR_WEEKS * historical_average) / weight if history_weeks else 0.0
+        return Forecast(expected, recent_average, historical_average, recent_weeks, history_weeks)